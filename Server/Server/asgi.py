@@ -2,6 +2,8 @@
 ASGI config for Server project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Raw-body uploads to /data_processing/upload/stream/ are served by an ASGI
+application of their own, so their bodies are spooled while they arrive.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
@@ -13,4 +15,13 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Server.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported once Django is set up, as they load models
+from data_processing.recovery import recover_jobs  # noqa: E402
+from data_processing.routing import with_streaming_uploads  # noqa: E402
+
+application = with_streaming_uploads(django_application)
+
+# Background uploads interrupted by the previous shutdown are picked up again
+recover_jobs()
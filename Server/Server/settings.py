@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -69,6 +70,7 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
   'corsheaders.middleware.CorsMiddleware',  # add CORS middleware
     'django.middleware.security.SecurityMiddleware',
+    'data_processing.middleware.InstrumentationMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -100,22 +102,131 @@ WSGI_APPLICATION = 'Server.wsgi.application'
 # REST framework settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',  
+        'data_processing.authentication.CachedTokenAuthentication',  
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',  
     ],
 }
 
+# Authenticated API tokens are cached with their users for this many seconds (0 looks every request
+# up in the database), keeping at most AUTH_TOKEN_CACHE_SIZE of them per process; naming an entry of
+# CACHES in AUTH_TOKEN_SHARED_CACHE (e.g. a file or memcached cache) shares them between processes
+AUTH_TOKEN_CACHE_SECONDS = 60
+AUTH_TOKEN_CACHE_SIZE = 10_000
+AUTH_TOKEN_SHARED_CACHE = None
+
+# Data processing settings
+# Import the upload and inference stack (pandas, pyarrow, openpyxl) and run a tiny upload through it
+# at startup, instead of during the first upload; the API-only profile is Server/settings_api.py
+DATA_PROCESSING_WARM_UP = os.environ.get('DATA_PROCESSING_WARM_UP') == '1'
+# Worker processes used to infer column types of large uploads. Parallel inference is opt-in: the
+# default of 1 keeps it serial, as every server process spawns a pool of this many processes; raise
+# it on deployments with cores to spare per server process
+INFERENCE_MAX_WORKERS = 1
+# Uploads with fewer rows than this are always inferred serially
+INFERENCE_PARALLEL_MIN_ROWS = 100_000
+# Rows parsed and converted at a time when reading uploaded CSV files
+UPLOAD_CHUNK_ROWS = 100_000
+# CSV parser used for uploads: 'c' (pandas, chunked) or 'pyarrow' (multithreaded, needs pyarrow);
+# clients can override it per upload with ?parser=
+CSV_PARSER_BACKEND = 'c'
+# Shrink inferred columns to their smallest lossless dtypes (unsigned, nullable, float16, category),
+# optionally storing text as Arrow strings (needs pyarrow)
+UPLOAD_OPTIMIZE_MEMORY = True
+UPLOAD_ARROW_STRINGS = False
+# Per-column statistics (nulls, distinct counts, numeric quantiles and histograms, date ranges,
+# top values) collected while uploads are converted, returned with the data types and stored
+UPLOAD_COLUMN_STATISTICS = True
+# Rows serialized per chunk when the upload response is streamed (?stream=1 or NDJSON)
+UPLOAD_RESPONSE_BATCH_ROWS = 10_000
+# Directory where processed datasets are stored, with their segment compression (None or 'zlib')
+DATASET_STORAGE_DIR = BASE_DIR / 'datasets'
+DATASET_COMPRESSION = 'zlib'
+# Keep every processed upload as an UploadedData dataset, and keep a gzipped copy of the original file
+DATASET_PERSIST_UPLOADS = True
+DATASET_KEEP_RAW_UPLOADS = True
+# Rows returned with a paginated upload (?paginate=1) and the maximum page size of the rows endpoint
+UPLOAD_PREVIEW_ROWS = 100
+DATASET_PAGE_MAX_ROWS = 10_000
+# Out-of-core uploads: CSV files of at least UPLOAD_OUT_OF_CORE_MIN_BYTES (None: only when asked for
+# with ?out_of_core=1) are spilled in chunks to a scratch store in UPLOAD_JOB_SPOOL_DIR, inferred from
+# per-column profiles and stored chunk by chunk, holding about UPLOAD_MEMORY_BUDGET_BYTES of rows at once;
+# such uploads are always stored and answered with their first page
+UPLOAD_OUT_OF_CORE_MIN_BYTES = 1024 ** 3
+UPLOAD_MEMORY_BUDGET_BYTES = 256 * 1024 ** 2
+# Background uploads (?async=1): worker threads, maximum queued or running jobs, and spool directory
+UPLOAD_JOB_WORKERS = 2
+UPLOAD_JOB_QUEUE_LIMIT = 16
+UPLOAD_JOB_SPOOL_DIR = BASE_DIR / 'uploads'
+# Running jobs renew a lease of UPLOAD_JOB_LEASE_SECONDS; when a server process starts, jobs whose
+# lease expired (their process died) are requeued, leaving jobs of live processes alone
+UPLOAD_JOB_RECOVER_ON_STARTUP = True
+UPLOAD_JOB_LEASE_SECONDS = 300
+# Raw-body uploads served by the ASGI application (/data_processing/upload/stream/): worker threads
+# parsing and inferring, maximum uploads admitted at once, and the largest accepted body
+ASYNC_UPLOAD_WORKERS = 2
+ASYNC_UPLOAD_QUEUE_LIMIT = 16
+ASYNC_UPLOAD_MAX_BYTES = 1024 ** 3
+# Batch uploads (/data_processing/upload/batch/): worker threads processing the files of all batches,
+# and the most files and extracted archive bytes one batch may hold
+BATCH_UPLOAD_WORKERS = 2
+BATCH_UPLOAD_MAX_FILES = 100
+BATCH_UPLOAD_MAX_BYTES = 4 * 1024 ** 3
+# Cache of processed uploads keyed by file content and inference parameters
+UPLOAD_CACHE_ENABLED = True
+UPLOAD_CACHE_DIR = BASE_DIR / 'upload_cache'
+UPLOAD_CACHE_MAX_BYTES = 2 * 1024 ** 3
+# Per-request stage timings, reported as a Server-Timing header, a structured log record and the
+# histograms of /data_processing/metrics/; tracing memory adds each stage's peak allocation (slower)
+INSTRUMENTATION_ENABLED = True
+INSTRUMENTATION_TRACE_MEMORY = False
+# Client addresses allowed to read the metrics endpoint
+METRICS_ALLOWED_IPS = ['127.0.0.1', '::1']
+# Sampling profiler: share of requests profiled (0 disables it), sampling interval, and the latency
+# above which a profiled request's stacks are written to PROFILE_DIR in collapsed flame graph format
+PROFILE_SAMPLE_RATE = 0.0
+PROFILE_INTERVAL_SECONDS = 0.005
+PROFILE_THRESHOLD_SECONDS = 2.0
+PROFILE_DIR = BASE_DIR / 'profiles'
+
+# Data processing logs are written as one JSON object per line
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'json': {'()': 'data_processing.utils.instrumentation.JsonFormatter'},
+    },
+    'handlers': {
+        'json_console': {'class': 'logging.StreamHandler', 'formatter': 'json'},
+    },
+    'loggers': {
+        'data_processing': {
+            'handlers': ['json_console'],
+            'level': os.environ.get('DATA_PROCESSING_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+    },
+}
+
 
 
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
+# SQLite runs in WAL mode so reads do not wait for writers, waits up to 20 seconds for a lock instead
+# of failing with "database is locked", takes write locks when a transaction begins so concurrent
+# writers queue rather than deadlock, and connections are kept for a minute instead of reopened per request
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'CONN_MAX_AGE': 60,
+        'OPTIONS': {
+            'init_command': 'PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL',
+            'timeout': 20,
+            'transaction_mode': 'IMMEDIATE',
+        },
     }
 }
 
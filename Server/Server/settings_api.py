@@ -0,0 +1,32 @@
+"""
+API-only settings profile: the regular settings without the admin, sessions, messages and
+static files, for workers that only serve the JSON API.
+
+Clients authenticate with API tokens, so without session cookies CSRF protection has nothing
+to guard and its middleware goes too, as do templates and DRF's browsable API. Select it with
+DJANGO_SETTINGS_MODULE=Server.settings_api.
+"""
+from Server.settings import *  # noqa: F401,F403
+from Server.settings import INSTALLED_APPS, MIDDLEWARE, REST_FRAMEWORK
+
+INSTALLED_APPS = [app for app in INSTALLED_APPS if app not in (
+    'django.contrib.admin',
+    'django.contrib.sessions',
+    'django.contrib.messages',
+    'django.contrib.staticfiles',
+)]
+
+MIDDLEWARE = [middleware for middleware in MIDDLEWARE if middleware not in (
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'django.middleware.csrf.CsrfViewMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+)]
+
+TEMPLATES = []
+
+REST_FRAMEWORK = {
+    **REST_FRAMEWORK,
+    'DEFAULT_RENDERER_CLASSES': ['rest_framework.renderers.JSONRenderer'],
+}
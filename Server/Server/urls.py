@@ -14,12 +14,16 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
-from django.contrib import admin
+from django.apps import apps
 from django.urls import path, include
 
 
 urlpatterns = [
-    path('admin/', admin.site.urls),
     path('data_processing/', include('data_processing.urls')),  # 包含 data_processing 的 URL
     
 ]
+
+# The API-only settings profile does not install the admin
+if apps.is_installed('django.contrib.admin'):
+    from django.contrib import admin
+    urlpatterns.insert(0, path('admin/', admin.site.urls))
@@ -14,3 +14,9 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Server.settings')
 
 application = get_wsgi_application()
+
+# Imported once Django is set up, as it loads models; background uploads interrupted by the
+# previous shutdown are picked up again
+from data_processing.recovery import recover_jobs  # noqa: E402
+
+recover_jobs()
@@ -0,0 +1,18 @@
+"""
+Settings for the authentication load test: the regular settings on the database file named by
+AUTH_BENCH_DB. With AUTH_BENCH_BASELINE=1 tokens are not cached and SQLite keeps its defaults
+(rollback journal, 5 second busy timeout, a connection per request), as before the tuning.
+"""
+import os
+
+from Server.settings import *  # noqa: F401,F403
+from Server.settings import DATABASES
+
+DEBUG = False
+ALLOWED_HOSTS = ['127.0.0.1', 'localhost']
+LOGGING = {'version': 1, 'disable_existing_loggers': False}
+DATABASES = {'default': {**DATABASES['default'], 'NAME': os.environ['AUTH_BENCH_DB']}}
+
+if os.environ.get('AUTH_BENCH_BASELINE') == '1':
+    AUTH_TOKEN_CACHE_SECONDS = 0
+    DATABASES['default'] = {'ENGINE': 'django.db.backends.sqlite3', 'NAME': os.environ['AUTH_BENCH_DB']}
@@ -0,0 +1,59 @@
+"""
+Micro-benchmark for datetime format detection.
+
+Times the original format cascade against sample-based detection, and
+against a second call that hits the per-column format cache, on columns of
+date strings in a listed format, an unlisted format and a non-date column.
+
+Usage (from the Server/ directory):
+    python -m benchmarks.bench_dates --rows 1000000
+"""
+import argparse
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from data_processing.utils.infer_data_types import convert_to_datetime_with_formats
+from benchmarks.legacy import legacy_convert_to_datetime_with_formats
+
+
+def make_columns(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    dates = pd.Timestamp('2000-01-01') + pd.to_timedelta(rng.integers(0, 9000, size=rows), unit='D')
+    return {
+        'dd-Mon-yyyy': pd.Series(dates.strftime('%d-%b-%Y'), dtype=object),
+        'iso datetime': pd.Series(dates.strftime('%Y-%m-%d %H:%M:%S'), dtype=object),
+        'not a date': pd.Series(np.char.add('Person_', np.arange(rows).astype(str)), dtype=object),
+    }
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--skip-legacy', action='store_true', help='Skip the slow original cascade.')
+    args = parser.parse_args()
+    warnings.simplefilter('ignore')
+
+    print(f"Rows: {args.rows:,}")
+    print(f"{'column':<14} {'legacy':>10} {'detected':>10} {'cached':>10}  parsed")
+    for name, series in make_columns(args.rows).items():
+        cache_key = ('bench', name)
+        converted, detected_time = timed(convert_to_datetime_with_formats, series, cache_key=cache_key)
+        _, cached_time = timed(convert_to_datetime_with_formats, series, cache_key=cache_key)
+        legacy_time = float('nan')
+        if not args.skip_legacy:
+            _, legacy_time = timed(legacy_convert_to_datetime_with_formats, series)
+        print(f"{name:<14} {legacy_time:>9.3f}s {detected_time:>9.3f}s {cached_time:>9.3f}s"
+              f"  {converted.notna().mean():.0%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""
+Benchmark for Excel ingestion.
+
+Writes a workbook and reads it with `pd.read_excel` plus inference and with
+the read-only streaming reader. Each reader runs in a fresh process so its
+peak RSS can be measured on its own.
+
+Usage (from the Server/ directory):
+    python -m benchmarks.bench_excel --rows 200000 --columns 10
+"""
+import argparse
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+import warnings
+
+import pandas as pd
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def write_workbook(path, rows, columns, seed=0):
+    from benchmarks.bench_parallel import write_csv
+
+    csv_path = path + '.csv'
+    write_csv(csv_path, rows, columns, seed=seed)
+    pd.read_csv(csv_path).to_excel(path, index=False)
+    os.remove(csv_path)
+
+
+def run_reader(mode, path, batch_rows, queue):
+    warnings.simplefilter('ignore')
+    from data_processing.utils.infer_data_types import infer_and_convert_data_types
+    from data_processing.utils.ingestion import read_excel_streaming
+
+    baseline = peak_rss_mb()
+    start = time.perf_counter()
+    if mode == 'read_excel':
+        df = infer_and_convert_data_types(pd.read_excel(path))
+    else:
+        df, _ = read_excel_streaming(path, chunksize=batch_rows)
+    queue.put((mode, time.perf_counter() - start, peak_rss_mb() - baseline))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=200_000)
+    parser.add_argument('--columns', type=int, default=10)
+    parser.add_argument('--batch-rows', type=int, default=10_000)
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context('spawn')
+    queue = context.Queue()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'workbook.xlsx')
+        # Write the workbook in its own process; a child's peak RSS starts from the RSS of its parent
+        writer = context.Process(target=write_workbook, args=(path, args.rows, args.columns))
+        writer.start()
+        writer.join()
+        print(f"Workbook: {args.rows:,} rows x {args.columns} columns, {os.path.getsize(path) / 1e6:.0f} MB")
+        print(f"{'reader':<12} {'time':>8} {'extra RSS':>11}")
+        for mode in ('read_excel', 'streaming'):
+            process = context.Process(target=run_reader, args=(mode, path, args.batch_rows, queue))
+            process.start()
+            mode, elapsed, rss = queue.get()
+            process.join()
+            print(f"{mode:<12} {elapsed:>7.2f}s {rss:>8.0f} MB")
+
+
+if __name__ == '__main__':
+    main()
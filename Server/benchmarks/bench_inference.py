@@ -0,0 +1,93 @@
+"""
+Benchmark for column type inference on large frames.
+
+Compares the vectorized profiler in `infer_and_convert_data_types` with the
+original chunked loop and checks that both pick the same dtypes when the
+legacy code runs on its whole-column path.
+
+Usage (from the Server/ directory):
+    python -m benchmarks.bench_inference --rows 1000000
+    python -m benchmarks.bench_inference --rows 1000000 --sample-size 10000 --skip-legacy
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from data_processing.utils.infer_data_types import infer_and_convert_data_types
+from benchmarks.legacy import legacy_infer_and_convert_data_types
+
+
+def make_frame(rows, seed=0):
+    """
+    Builds a frame shaped like a freshly parsed CSV upload.
+
+    Args:
+    - rows (int): Number of rows to generate.
+    - seed (int, optional): Seed for the random generator.
+
+    Returns:
+    - pd.DataFrame: Mixed numeric, dirty numeric, text and categorical columns.
+    """
+    rng = np.random.default_rng(seed)
+    ints = rng.integers(0, 30000, size=rows)
+    dirty = ints.astype(str).astype(object)
+    dirty[rng.random(rows) < 0.05] = 'n/a'
+    return pd.DataFrame({
+        'id': np.arange(rows),
+        'amount': rng.normal(100, 25, size=rows),
+        'quantity': dirty,
+        'grade': rng.choice(['A', 'B', 'C', 'D', 'F'], size=rows).astype(object),
+        'name': np.char.add('Person_', np.arange(rows).astype(str)).astype(object),
+    })
+
+
+def timed(func, df, **kwargs):
+    start = time.perf_counter()
+    result = func(df.copy(), **kwargs)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--skip-legacy', action='store_true', help='Only time the new profiler.')
+    parser.add_argument('--sample-size', type=int, default=None,
+                        help='Also time sample-then-verify inference with this many random rows.')
+    args = parser.parse_args()
+
+    df = make_frame(args.rows)
+    print(f"Rows: {args.rows:,}  Columns: {len(df.columns)}")
+    headers = ['vectorized'] + (['sampled'] if args.sample_size else [])
+    headers += [] if args.skip_legacy else ['legacy whole', 'legacy chunked']
+    print(f"{'column':<10} " + ' '.join(f"{header:>13}" for header in headers))
+
+    mismatched = {}
+    totals = [0.0] * len(headers)
+    for col in df.columns:
+        frame = df[[col]]
+        new_df, new_time = timed(infer_and_convert_data_types, frame)
+        row = [new_time]
+        if args.sample_size:
+            sampled_df, sampled_time = timed(infer_and_convert_data_types, frame, sample_size=args.sample_size)
+            row.append(sampled_time)
+            if sampled_df[col].dtype != new_df[col].dtype:
+                mismatched[col] = (str(new_df[col].dtype), str(sampled_df[col].dtype))
+        if not args.skip_legacy:
+            # The legacy whole-column path only runs when the frame fits in one chunk
+            legacy_df, legacy_time = timed(legacy_infer_and_convert_data_types, frame, chunk_size=len(df))
+            _, chunked_time = timed(legacy_infer_and_convert_data_types, frame)
+            row += [legacy_time, chunked_time]
+            if legacy_df[col].dtype != new_df[col].dtype:
+                mismatched[col] = (str(legacy_df[col].dtype), str(new_df[col].dtype))
+        totals = [total + value for total, value in zip(totals, row)]
+        print(f"{col:<10} " + ' '.join(f"{value:>12.3f}s" for value in row))
+
+    print(f"{'total':<10} " + ' '.join(f"{value:>12.3f}s" for value in totals))
+    if len(headers) > 1:
+        print("dtype decisions match" if not mismatched else f"dtype mismatches: {mismatched}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""
+Benchmark for out-of-core CSV processing.
+
+Writes one CSV and processes it into a stored dataset twice: in memory (the streaming reader,
+then the dataset writer) and out of core with a memory budget. Each run happens in a fresh
+process so its peak RSS can be measured on its own; the out-of-core run should stay near the
+budget whatever the file size.
+
+Usage (from the Server/ directory):
+    python -m benchmarks.bench_out_of_core --rows 2000000 --budget-mb 64
+"""
+import argparse
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+import warnings
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def write_upload(path, rows):
+    from benchmarks.generators import write_csv
+
+    write_csv(path, rows)
+
+
+def run_mode(mode, path, budget_bytes, queue):
+    warnings.simplefilter('ignore')
+    from data_processing.utils.column_statistics import FrameStatistics
+    from data_processing.utils.dataset_store import save_dataset
+    from data_processing.utils.ingestion import read_csv_streaming
+    from data_processing.utils.out_of_core import read_csv_out_of_core
+
+    root = os.path.dirname(path)
+    baseline = peak_rss_mb()
+    start = time.perf_counter()
+    if mode == 'in-memory':
+        statistics = FrameStatistics()
+        df, schema = read_csv_streaming(path, statistics=statistics)
+        save_dataset(df, root, schema=schema, compression='zlib')
+    else:
+        read_csv_out_of_core(path, root, root, budget_bytes, compression='zlib', statistics=FrameStatistics())
+    queue.put((mode, time.perf_counter() - start, peak_rss_mb() - baseline))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=2_000_000)
+    parser.add_argument('--budget-mb', type=int, default=64)
+    parser.add_argument('--skip-in-memory', action='store_true', help='Only run the out-of-core mode')
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context('spawn')
+    queue = context.Queue()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'upload.csv')
+        # Write the file in its own process; a child's peak RSS starts from the RSS of its parent
+        writer = context.Process(target=write_upload, args=(path, args.rows))
+        writer.start()
+        writer.join()
+        print(f"CSV: {args.rows:,} rows, {os.path.getsize(path) / 1e6:.0f} MB; budget {args.budget_mb} MB")
+        print(f"{'mode':<12} {'time':>8} {'extra RSS':>11}")
+        modes = ('out-of-core',) if args.skip_in_memory else ('in-memory', 'out-of-core')
+        for mode in modes:
+            process = context.Process(target=run_mode, args=(mode, path, args.budget_mb * 1024 * 1024, queue))
+            process.start()
+            mode, elapsed, rss = queue.get()
+            process.join()
+            print(f"{mode:<12} {elapsed:>7.2f}s {rss:>8.0f} MB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""
+Benchmark for parallel per-column inference.
+
+Writes a wide CSV, reads it back the way the upload view does and times
+`infer_and_convert_data_types` with an increasing number of worker processes.
+
+Usage (from the Server/ directory):
+    python -m benchmarks.bench_parallel --rows 1000000 --columns 100 --workers 1 2 4 8 16 32
+"""
+import argparse
+import os
+import tempfile
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from data_processing.utils.infer_data_types import infer_and_convert_data_types
+
+
+def write_csv(path, rows, columns, seed=0):
+    """
+    Writes a CSV whose columns cycle through integers, floats, dirty numbers, dates and text.
+    """
+    rng = np.random.default_rng(seed)
+    dates = pd.Timestamp('2000-01-01') + pd.to_timedelta(rng.integers(0, 9000, size=rows), unit='D')
+    generators = [
+        lambda: rng.integers(0, 1000, size=rows),
+        lambda: rng.normal(0, 1, size=rows).round(4),
+        lambda: np.where(rng.random(rows) < 0.05, 'n/a', rng.integers(0, 30000, size=rows).astype(str)),
+        lambda: dates.strftime('%d/%m/%Y'),
+        lambda: rng.choice(['red', 'green', 'blue', 'yellow'], size=rows),
+    ]
+    frame = pd.DataFrame({f'col_{i}': generators[i % len(generators)]() for i in range(columns)})
+    frame.to_csv(path, index=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--columns', type=int, default=100)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8, os.cpu_count() or 1])
+    parser.add_argument('--sample-size', type=int, default=None)
+    args = parser.parse_args()
+    warnings.simplefilter('ignore')
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'wide.csv')
+        write_csv(path, args.rows, args.columns)
+        print(f"CSV: {args.rows:,} rows x {args.columns} columns, {os.path.getsize(path) / 1e6:.0f} MB")
+        df = pd.read_csv(path)
+
+    baseline = None
+    for workers in sorted(set(args.workers)):
+        # Warm the pool up first so worker start-up is not counted
+        infer_and_convert_data_types(df.head(1000).copy(), max_workers=workers, parallel_min_rows=0)
+        start = time.perf_counter()
+        infer_and_convert_data_types(df.copy(), sample_size=args.sample_size,
+                                     max_workers=workers, parallel_min_rows=0)
+        elapsed = time.perf_counter() - start
+        baseline = baseline or elapsed
+        print(f"workers={workers:<3} {elapsed:8.2f}s  speedup {baseline / elapsed:5.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""
+Benchmark for the CSV parsing backends.
+
+Writes one CSV and reads it with every available engine, first inferring the
+schema and then again with that schema passed in as dtype hints. Parse and
+inference time are reported separately for the inferring read.
+
+Usage (from the Server/ directory):
+    python -m benchmarks.bench_parsers --rows 1000000 --columns 20
+"""
+import argparse
+import os
+import tempfile
+import time
+import warnings
+
+import pandas as pd
+
+from benchmarks.bench_parallel import write_csv
+from data_processing.utils.infer_data_types import infer_and_convert_data_types
+from data_processing.utils.ingestion import (
+    available_csv_engines, iter_csv_chunks, read_csv_streaming, schema_from_frame,
+)
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--columns', type=int, default=20)
+    parser.add_argument('--chunk-rows', type=int, default=100_000)
+    args = parser.parse_args()
+    warnings.simplefilter('ignore')
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'feed.csv')
+        write_csv(path, args.rows, args.columns)
+        print(f"CSV: {args.rows:,} rows x {args.columns} columns, {os.path.getsize(path) / 1e6:.0f} MB")
+        print(f"{'engine':<9} {'parse':>8} {'infer':>8} {'streaming':>10} {'with schema':>12}")
+
+        for engine in available_csv_engines():
+            # Parse and infer as separate steps on the whole file
+            df, parse_time = timed(lambda: pd.concat(iter_csv_chunks(path, engine, args.chunk_rows),
+                                                     ignore_index=True))
+            processed, infer_time = timed(infer_and_convert_data_types, df)
+            schema = schema_from_frame(processed)
+            del df, processed
+
+            # The upload path, without and with the schema of the first read
+            _, streaming_time = timed(read_csv_streaming, path, chunksize=args.chunk_rows, engine=engine)
+            _, hinted_time = timed(read_csv_streaming, path, chunksize=args.chunk_rows, engine=engine,
+                                   schema=schema)
+            print(f"{engine:<9} {parse_time:>7.2f}s {infer_time:>7.2f}s {streaming_time:>9.2f}s "
+                  f"{hinted_time:>11.2f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""
+Benchmark for the upload response encoders.
+
+Compares `to_dict(orient='records')` + `JsonResponse` with the streamed JSON,
+NDJSON and Arrow IPC encoders on an inferred frame. Each encoder runs in a
+fresh process so its peak RSS can be measured on its own; the Arrow encoder
+is skipped when pyarrow is not installed.
+
+Usage (from the Server/ directory):
+    python -m benchmarks.bench_serialize --rows 1000000
+"""
+import argparse
+import multiprocessing
+import os
+import resource
+import time
+
+import numpy as np
+import pandas as pd
+
+
+def make_frame(rows, seed=0):
+    """
+    Builds a frame with the dtypes inference typically produces, including missing values.
+    """
+    rng = np.random.default_rng(seed)
+    amount = rng.normal(100, 25, size=rows).astype('float32')
+    amount[rng.random(rows) < 0.05] = np.nan
+    dates = pd.Series(pd.Timestamp('2000-01-01') + pd.to_timedelta(rng.integers(0, 9000, size=rows), unit='D'))
+    dates[rng.random(rows) < 0.05] = pd.NaT
+    return pd.DataFrame({
+        'id': np.arange(rows, dtype='int32'),
+        'quantity': rng.integers(0, 100, size=rows).astype('int8'),
+        'amount': amount,
+        'date': dates,
+        'grade': pd.Categorical(rng.choice(['A', 'B', 'C', 'D', 'F'], size=rows)),
+        'name': np.char.add('Person_', np.arange(rows).astype(str)).astype(object),
+    })
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_encoder(mode, rows, batch_size, queue):
+    import django
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Server.settings')
+    django.setup()
+    from django.http import JsonResponse
+    from data_processing.utils.arrow_stream import iter_arrow
+    from data_processing.utils.json_stream import iter_json, iter_ndjson
+
+    df = make_frame(rows)
+    data_types = df.dtypes.apply(lambda x: str(x)).to_dict()
+    baseline = peak_rss_mb()
+
+    start = time.perf_counter()
+    if mode == 'to_dict':
+        content = JsonResponse({'data': df.to_dict(orient='records'), 'data_types': data_types}).content
+        first_byte = time.perf_counter() - start
+        size = len(content)
+    else:
+        encoder = {'stream json': iter_json, 'ndjson': iter_ndjson, 'arrow': iter_arrow}[mode]
+        pieces = encoder(df, data_types, batch_size=batch_size)
+        # The header piece is written before any rows, so time the first piece carrying row data
+        size = len(next(pieces))
+        size += len(next(pieces, b''))
+        first_byte = time.perf_counter() - start
+        size += sum(len(piece) for piece in pieces)
+    total = time.perf_counter() - start
+    queue.put((mode, first_byte, total, peak_rss_mb() - baseline, size))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--batch-size', type=int, default=10_000)
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context('spawn')
+    queue = context.Queue()
+    print(f"Rows: {args.rows:,}")
+    print(f"{'encoder':<12} {'first row':>10} {'total':>9} {'extra RSS':>11} {'size':>10}")
+    from data_processing.utils.arrow_stream import pa
+    modes = ('to_dict', 'stream json', 'ndjson') + (('arrow',) if pa is not None else ())
+    for mode in modes:
+        process = context.Process(target=run_encoder, args=(mode, args.rows, args.batch_size, queue))
+        process.start()
+        mode, first_byte, total, rss, size = queue.get()
+        process.join()
+        print(f"{mode:<12} {first_byte:>9.3f}s {total:>8.2f}s {rss:>8.0f} MB {size / 1e6:>7.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+"""
+Startup benchmark: import time and time to first request of a fresh server process.
+
+For each configuration, a fresh interpreter sets Django up and loads the URL configuration
+and the ASGI application under `-X importtime`; the reported import time is the sum of every
+module's own import time, and whether pandas was loaded is shown. Then uvicorn is started
+and polled: time to first request is measured from spawning the process to the first
+response of an account endpoint (GET /data_processing/login/, answered 405), followed by the
+latency of the first request that needs the upload stack (GET /data_processing/cache/stats/).
+
+Configurations: 'full' (Server.settings), 'api' (Server.settings_api, the lean profile) and
+'api+warm-up' (the lean profile with DATA_PROCESSING_WARM_UP=1). Pass --server-dir to time
+another checkout of the Server/ directory, e.g. an older commit for a before/after comparison;
+configurations whose settings module it lacks are skipped.
+
+Usage (from the Server/ directory):
+    python -m benchmarks.bench_startup --repeat 5
+    python -m benchmarks.bench_startup --server-dir /tmp/before/Server
+"""
+import argparse
+import http.client
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+CONFIGURATIONS = {
+    'full': ('Server.settings', '0'),
+    'api': ('Server.settings_api', '0'),
+    'api+warm-up': ('Server.settings_api', '1'),
+}
+
+IMPORT_SCRIPT = (
+    "import django; django.setup(); "
+    "from django.conf import settings; from importlib import import_module; "
+    "import_module(settings.ROOT_URLCONF); import Server.asgi"
+)
+
+
+def environment(settings_module, warm_up):
+    return {**os.environ, 'DJANGO_SETTINGS_MODULE': settings_module, 'DATA_PROCESSING_WARM_UP': warm_up,
+            'PYTHONWARNINGS': 'ignore', 'DATA_PROCESSING_LOG_LEVEL': 'ERROR'}
+
+
+def import_time(server_dir, env):
+    """
+    Returns (seconds spent importing modules, whether pandas was imported) for one fresh interpreter.
+    """
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', IMPORT_SCRIPT], cwd=server_dir, env=env,
+                            capture_output=True, text=True, check=True)
+    total, pandas = 0, False
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, _, name = line[len('import time:'):].split('|')
+        total += int(self_us)
+        pandas = pandas or name.strip() == 'pandas'
+    return total / 1e6, pandas
+
+
+def get(port, path):
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+    connection.request('GET', path)
+    response = connection.getresponse()
+    response.read()
+    connection.close()
+    return response.status
+
+
+def first_requests(server_dir, env, port):
+    """
+    Starts uvicorn and returns (seconds to the first response, latency of the first upload-stack request).
+    """
+    start = time.perf_counter()
+    server = subprocess.Popen([sys.executable, '-m', 'uvicorn', 'Server.asgi:application', '--port', str(port),
+                               '--log-level', 'warning'], cwd=server_dir, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while True:
+            try:
+                get(port, '/data_processing/login/')
+                break
+            except OSError:
+                if server.poll() is not None:
+                    raise RuntimeError('uvicorn exited before serving a request')
+                time.sleep(0.01)
+        first_response = time.perf_counter() - start
+        request_start = time.perf_counter()
+        get(port, '/data_processing/cache/stats/')
+        return first_response, time.perf_counter() - request_start
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--repeat', type=int, default=5, help='Fresh processes per measurement; medians are shown')
+    parser.add_argument('--server-dir', default=os.getcwd(), help='Server/ directory of the checkout to time')
+    parser.add_argument('--port', type=int, default=8768)
+    args = parser.parse_args()
+
+    print(f"{'config':<12} {'imports':>9} {'pandas':>7} {'first request':>14} {'first upload-stack request':>27}")
+    for name, (settings_module, warm_up) in CONFIGURATIONS.items():
+        module_path = os.path.join(args.server_dir, *settings_module.split('.')) + '.py'
+        if not os.path.exists(module_path):
+            print(f"{name:<12} skipped: {settings_module} not found")
+            continue
+        env = environment(settings_module, warm_up)
+        imports = [import_time(args.server_dir, env) for _ in range(args.repeat)]
+        requests = [first_requests(args.server_dir, env, args.port) for _ in range(args.repeat)]
+        print(f"{name:<12} {statistics.median(seconds for seconds, _ in imports):>8.2f}s "
+              f"{'yes' if imports[0][1] else 'no':>7} "
+              f"{statistics.median(first for first, _ in requests):>13.2f}s "
+              f"{statistics.median(latency for _, latency in requests):>26.2f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""
+Seeded generators of synthetic uploads for the benchmark suite.
+
+Every column kind mimics something real uploads contain: numbers with junk
+mixed in, dates in more than one format, and text with few or many distinct
+values. The same seed always produces the same file.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+# Share of values replaced by junk in dirty columns
+DIRTY_SHARE = 0.05
+
+# Rows generated and written at a time, so 10M-row files do not have to fit in memory as objects
+WRITE_BLOCK_ROWS = 500_000
+
+
+def integers(rng, rows):
+    return rng.integers(0, 100_000, size=rows)
+
+
+def floats(rng, rows):
+    values = rng.normal(100, 25, size=rows).round(3)
+    values[rng.random(rows) < DIRTY_SHARE] = np.nan
+    return values
+
+
+def dirty_numerics(rng, rows):
+    values = rng.integers(-5_000, 5_000, size=rows).astype(str).astype(object)
+    junk = rng.random(rows) < DIRTY_SHARE
+    values[junk] = rng.choice(['n/a', '', '-', 'unknown', '#REF!'], size=int(junk.sum()))
+    return values
+
+
+def mixed_dates(rng, rows):
+    dates = pd.Timestamp('2000-01-01') + pd.to_timedelta(rng.integers(0, 9000, size=rows), unit='D')
+    values = dates.strftime('%d/%m/%Y').to_numpy(dtype=object)
+    iso = rng.random(rows) < 0.2
+    values[iso] = dates[iso].strftime('%Y-%m-%d')
+    values[rng.random(rows) < DIRTY_SHARE] = 'not a date'
+    return values
+
+
+def low_cardinality(rng, rows):
+    return rng.choice(['north', 'south', 'east', 'west', 'central', 'overseas', 'online', 'other'], size=rows)
+
+
+def high_cardinality(rng, rows):
+    ids = rng.integers(0, rows * 10, size=rows).astype(str).astype(object)
+    return 'customer_' + ids + '@example.com'
+
+
+# Column kinds in the order they are cycled through
+COLUMN_KINDS = {
+    'integer': integers,
+    'float': floats,
+    'dirty_numeric': dirty_numerics,
+    'mixed_dates': mixed_dates,
+    'low_cardinality': low_cardinality,
+    'high_cardinality': high_cardinality,
+}
+
+# Number of columns of each frame shape; tall frames hold one column per kind
+SHAPES = {
+    'tall': len(COLUMN_KINDS),
+    'wide': 10 * len(COLUMN_KINDS),
+}
+
+
+def frame_from_rng(rng, rows, shape):
+    kinds = list(COLUMN_KINDS.items())
+    data = {}
+    for i in range(SHAPES[shape]):
+        name, generator = kinds[i % len(kinds)]
+        data[f'{name}_{i}'] = generator(rng, rows)
+    return pd.DataFrame(data)
+
+
+def make_frame(rows, shape='tall', seed=0):
+    """
+    Builds a raw frame whose columns cycle through `COLUMN_KINDS`.
+
+    Args:
+    - rows (int): Number of rows.
+    - shape (str, optional): One of `SHAPES`.
+    - seed (int, optional): Seed for the random generator.
+
+    Returns:
+    - pd.DataFrame: The raw values, as a CSV reader would see them before inference.
+    """
+    return frame_from_rng(np.random.default_rng(seed), rows, shape)
+
+
+def write_csv(path, rows, shape='tall', seed=0):
+    """
+    Writes a synthetic upload block by block and returns its size in bytes.
+    """
+    rng = np.random.default_rng(seed)
+    with open(path, 'w', newline='') as csv_file:
+        for start in range(0, rows, WRITE_BLOCK_ROWS):
+            block = frame_from_rng(rng, min(WRITE_BLOCK_ROWS, rows - start), shape)
+            block.to_csv(csv_file, index=False, header=start == 0)
+    return os.path.getsize(path)
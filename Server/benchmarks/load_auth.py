@@ -0,0 +1,148 @@
+"""
+Load test of token-authenticated requests with and without the token cache and SQLite tuning.
+
+Reader clients repeatedly list their datasets with an API token, the cheapest authenticated
+request, while writer clients keep registering and logging in new users, so reads contend
+with writes for the SQLite file lock. Each configuration is served by Django's threaded
+runserver on its own freshly migrated database (`benchmarks.auth_settings`): 'baseline' has
+no token cache and SQLite's defaults, 'tuned' the settings in Server/settings.py.
+Throughput, p50/p99 latency and failed requests are reported for readers and writers.
+
+Usage (from the Server/ directory):
+    python -m benchmarks.load_auth --readers 8 --writers 2 --seconds 10
+"""
+import argparse
+import http.client
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from .load_upload import percentile, wait_until_up
+
+CONFIGURATIONS = {'baseline': '1', 'tuned': '0'}
+
+
+def request(netloc, method, path, body=None, token=None):
+    """
+    Sends one request and reads the response; returns (status, parsed JSON body or None, latency).
+    """
+    headers = {'Content-Type': 'application/json'}
+    if token:
+        headers['Authorization'] = f'Token {token}'
+    connection = http.client.HTTPConnection(netloc, timeout=60)
+    start = time.perf_counter()
+    connection.request(method, path, body=json.dumps(body) if body is not None else None, headers=headers)
+    response = connection.getresponse()
+    content = response.read()
+    seconds = time.perf_counter() - start
+    connection.close()
+    try:
+        return response.status, json.loads(content), seconds
+    except ValueError:
+        return response.status, None, seconds
+
+
+def start_server(port, database, baseline):
+    env = {**os.environ, 'DJANGO_SETTINGS_MODULE': 'benchmarks.auth_settings', 'PYTHONWARNINGS': 'ignore',
+           'AUTH_BENCH_DB': database, 'AUTH_BENCH_BASELINE': baseline}
+    server = subprocess.Popen([sys.executable, 'manage.py', 'runserver', '--noreload', '--skip-checks',
+                               f'127.0.0.1:{port}'], env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    wait_until_up(f'http://127.0.0.1:{port}')
+    return server
+
+
+def run_load(netloc, tokens, writers, seconds):
+    results = {'read': [], 'write': []}
+    failures = {'read': 0, 'write': 0}
+    lock = threading.Lock()
+    deadline = time.monotonic() + seconds
+
+    def record(kind, status, latency):
+        with lock:
+            if status == 200 or status == 201:
+                results[kind].append(latency)
+            else:
+                failures[kind] += 1
+
+    def reader(token):
+        while time.monotonic() < deadline:
+            try:
+                status, _, latency = request(netloc, 'GET', '/data_processing/datasets/', token=token)
+            except OSError:
+                status, latency = None, 0.0
+            record('read', status, latency)
+
+    def writer(index):
+        count = 0
+        while time.monotonic() < deadline:
+            credentials = {'username': f'writer-{index}-{count}', 'password': 'secret'}
+            count += 1
+            try:
+                status, _, latency = request(netloc, 'POST', '/data_processing/register/', credentials)
+                record('write', status, latency)
+                status, _, latency = request(netloc, 'POST', '/data_processing/login/', credentials)
+            except OSError:
+                status, latency = None, 0.0
+            record('write', status, latency)
+
+    threads = [threading.Thread(target=reader, args=(token,)) for token in tokens]
+    threads += [threading.Thread(target=writer, args=(index,)) for index in range(writers)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, failures, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--readers', type=int, default=8, help='Clients sending authenticated reads')
+    parser.add_argument('--writers', type=int, default=2, help='Clients registering and logging in users')
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--port', type=int, default=8767)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        template = os.path.join(tmp, 'template.sqlite3')
+        env = {**os.environ, 'DJANGO_SETTINGS_MODULE': 'benchmarks.auth_settings', 'PYTHONWARNINGS': 'ignore',
+               'AUTH_BENCH_DB': template, 'AUTH_BENCH_BASELINE': '1'}
+        subprocess.run([sys.executable, 'manage.py', 'migrate', '--verbosity', '0'], env=env, check=True)
+
+        print(f"{args.readers} readers, {args.writers} writers, {args.seconds:g}s per configuration")
+        print(f"{'config':<9} {'kind':<6} {'req/s':>8} {'p50':>8} {'p99':>8} {'failed':>7}")
+        for name, baseline in CONFIGURATIONS.items():
+            database = os.path.join(tmp, f'{name}.sqlite3')
+            shutil.copy(template, database)
+            server = start_server(args.port, database, baseline)
+            try:
+                netloc = f'127.0.0.1:{args.port}'
+                tokens = []
+                for index in range(args.readers):
+                    _, body, _ = request(netloc, 'POST', '/data_processing/register/',
+                                         {'username': f'reader-{index}', 'password': 'secret'})
+                    tokens.append(body['token'])
+                results, failures, elapsed = run_load(netloc, tokens, args.writers, args.seconds)
+            finally:
+                server.terminate()
+                server.wait()
+            for kind in ('read', 'write'):
+                latencies = results[kind]
+                if not latencies and not failures[kind]:
+                    continue
+                if not latencies:
+                    print(f"{name:<9} {kind:<6} all {failures[kind]} requests failed")
+                    continue
+                print(f"{name:<9} {kind:<6} {len(latencies) / elapsed:>8.1f} "
+                      f"{statistics.median(latencies) * 1000:>6.1f}ms {percentile(latencies, 0.99) * 1000:>6.1f}ms "
+                      f"{failures[kind]:>7}")
+
+
+if __name__ == '__main__':
+    main()
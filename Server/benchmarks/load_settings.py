@@ -0,0 +1,11 @@
+"""
+Settings for the upload load test: the regular settings without storing or caching
+uploads, so every request parses and infers its body and nothing is written to the database.
+"""
+from Server.settings import *  # noqa: F401,F403
+
+DEBUG = False
+ALLOWED_HOSTS = ['127.0.0.1', 'localhost']
+DATASET_PERSIST_UPLOADS = False
+UPLOAD_CACHE_ENABLED = False
+LOGGING = {'version': 1, 'disable_existing_loggers': False}
@@ -0,0 +1,165 @@
+"""
+Load test of the raw-body upload endpoint under ASGI and WSGI.
+
+Concurrent clients POST the same synthetic CSV to /data_processing/upload/stream/
+and read the whole streamed response; optionally each client sends its body at a
+throttled rate, like uploads over slow links. Latency is measured from the first
+byte sent to the last byte received, and p50/p99 latency and throughput are
+reported per server.
+
+With --serve, the servers are started with `benchmarks.load_settings` (nothing is
+stored or cached): uvicorn for ASGI and Django's threaded runserver for WSGI, which
+serves the same path through the `upload_stream` fallback view.
+
+Usage (from the Server/ directory):
+    python -m benchmarks.load_upload --serve --clients 16 --requests 4 --rows 20000
+    python -m benchmarks.load_upload --serve --clients 32 --client-kbps 256
+    python -m benchmarks.load_upload --target asgi=http://127.0.0.1:8000
+"""
+import argparse
+import http.client
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+
+from .generators import write_csv
+
+UPLOAD_PATH = '/data_processing/upload/stream/?name=bench.csv'
+
+# Bytes written per send when a client's upload rate is throttled
+SEND_SLICE_BYTES = 16 * 1024
+
+
+def start_servers(asgi_port, wsgi_port):
+    env = {**os.environ, 'DJANGO_SETTINGS_MODULE': 'benchmarks.load_settings', 'PYTHONWARNINGS': 'ignore'}
+    servers = [
+        subprocess.Popen([sys.executable, '-m', 'uvicorn', 'Server.asgi:application', '--port', str(asgi_port),
+                          '--log-level', 'warning'], env=env),
+        subprocess.Popen([sys.executable, 'manage.py', 'runserver', '--noreload', '--skip-checks',
+                          f'127.0.0.1:{wsgi_port}'], env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL),
+    ]
+    targets = {'asgi': f'http://127.0.0.1:{asgi_port}', 'wsgi': f'http://127.0.0.1:{wsgi_port}'}
+    for url in targets.values():
+        wait_until_up(url)
+    return servers, targets
+
+
+def wait_until_up(url, timeout=60):
+    netloc = urllib.parse.urlsplit(url).netloc
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection(netloc, timeout=5)
+            connection.request('GET', '/data_processing/cache/stats/')
+            connection.getresponse().read()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f'{url} did not start')
+
+
+def post_upload(netloc, body, bytes_per_second):
+    """
+    Sends one upload and reads the whole response; returns its latency in seconds.
+    """
+    connection = http.client.HTTPConnection(netloc, timeout=600)
+    start = time.perf_counter()
+    connection.putrequest('POST', UPLOAD_PATH)
+    connection.putheader('Content-Type', 'text/csv')
+    connection.putheader('Content-Length', str(len(body)))
+    connection.endheaders()
+    if bytes_per_second:
+        for offset in range(0, len(body), SEND_SLICE_BYTES):
+            connection.send(body[offset:offset + SEND_SLICE_BYTES])
+            time.sleep(SEND_SLICE_BYTES / bytes_per_second)
+    else:
+        connection.send(body)
+    response = connection.getresponse()
+    response.read()
+    seconds = time.perf_counter() - start
+    connection.close()
+    if response.status != 200:
+        raise RuntimeError(f'status {response.status}')
+    return seconds
+
+
+def run_load(url, body, clients, requests, bytes_per_second):
+    netloc = urllib.parse.urlsplit(url).netloc
+    latencies, errors = [], []
+    lock = threading.Lock()
+
+    def client():
+        for _ in range(requests):
+            try:
+                seconds = post_upload(netloc, body, bytes_per_second)
+            except (OSError, RuntimeError) as e:
+                with lock:
+                    errors.append(str(e))
+                continue
+            with lock:
+                latencies.append(seconds)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return latencies, errors, elapsed
+
+
+def percentile(values, share):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(share * len(ordered)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=20_000)
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=4, help='Uploads sent by each client')
+    parser.add_argument('--client-kbps', type=float, default=0, help='Throttle each client to this upload rate')
+    parser.add_argument('--serve', action='store_true', help='Start uvicorn and runserver for the test')
+    parser.add_argument('--asgi-port', type=int, default=8765)
+    parser.add_argument('--wsgi-port', type=int, default=8766)
+    parser.add_argument('--target', action='append', default=[], help='name=url of an already running server')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.csv')
+        write_csv(path, args.rows)
+        with open(path, 'rb') as csv_file:
+            body = csv_file.read()
+
+    servers, targets = [], dict(target.split('=', 1) for target in args.target)
+    if args.serve:
+        servers, started = start_servers(args.asgi_port, args.wsgi_port)
+        targets.update(started)
+    try:
+        print(f"{len(body) / 1e6:.1f} MB body, {args.clients} clients x {args.requests} uploads"
+              + (f", {args.client_kbps:g} kB/s per client" if args.client_kbps else ''))
+        print(f"{'server':<8} {'p50':>8} {'p99':>8} {'max':>8} {'uploads/s':>10} {'errors':>7}")
+        for name, url in targets.items():
+            # One upload first so imports and caches are warm on both servers
+            post_upload(urllib.parse.urlsplit(url).netloc, body, 0)
+            latencies, errors, elapsed = run_load(url, body, args.clients, args.requests,
+                                                  args.client_kbps * 1000)
+            if not latencies:
+                print(f"{name:<8} all {len(errors)} uploads failed: {errors[0]}")
+                continue
+            print(f"{name:<8} {statistics.median(latencies):>7.2f}s {percentile(latencies, 0.99):>7.2f}s "
+                  f"{max(latencies):>7.2f}s {len(latencies) / elapsed:>10.2f} {len(errors):>7}")
+    finally:
+        for server in servers:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,232 @@
+"""
+Benchmark suite for the ingestion and inference pipeline.
+
+Times parsing, inference, response serialization and the end-to-end upload
+view separately on seeded synthetic uploads (see `benchmarks.generators`),
+for every shape and size given. Each measurement runs in a fresh process so
+its peak RSS can be recorded on its own. Results are written as JSON, and
+when a baseline file from an earlier run is given, timings or peak memory
+that grew beyond the tolerance are reported as regressions and the run
+exits with status 1.
+
+Usage (from the Server/ directory):
+    python -m benchmarks.suite --rows 10000 100000 --output baseline.json
+    python -m benchmarks.suite --rows 10000 100000 --output current.json --baseline baseline.json
+    python -m benchmarks.suite --rows 10000000 --shapes tall --stages parse infer
+"""
+import argparse
+import datetime
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from .generators import SHAPES, write_csv
+
+STAGES = ('parse', 'infer', 'serialize', 'upload')
+
+# Differences below these floors are noise, whatever the relative change
+MIN_SECONDS_DELTA = 0.01
+MIN_RSS_DELTA_MB = 5
+
+
+def read_status_mb(field):
+    with open('/proc/self/status') as status_file:
+        for line in status_file:
+            if line.startswith(field + ':'):
+                return int(line.split()[1]) / 1024
+    raise OSError(field)
+
+
+def reset_peak_rss():
+    """
+    Starts peak RSS tracking afresh and returns the current RSS in MB.
+
+    On Linux the high-water mark is reset through /proc, so memory used while preparing a
+    stage does not hide the stage's own peak. Elsewhere the process-wide maximum is used.
+    """
+    try:
+        with open('/proc/self/clear_refs', 'w') as clear_refs:
+            clear_refs.write('5')
+        return read_status_mb('VmRSS')
+    except OSError:
+        return peak_rss_mb()
+
+
+def peak_rss_mb():
+    try:
+        return read_status_mb('VmHWM')
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def setup_django():
+    import django
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Server.settings')
+    django.setup()
+
+
+def prepare_stage(stage, path):
+    """
+    Builds the callable timed for one stage; everything it needs is loaded up front.
+    """
+    import pandas as pd
+    from data_processing.utils.infer_data_types import infer_and_convert_data_types
+    from data_processing.utils.ingestion import iter_csv_chunks
+    from data_processing.utils.json_stream import iter_json
+
+    if stage == 'parse':
+        return lambda: sum(len(chunk) for chunk in iter_csv_chunks(path))
+    if stage == 'infer':
+        raw = pd.read_csv(path)
+        return lambda: infer_and_convert_data_types(raw.copy())
+    if stage == 'serialize':
+        df = infer_and_convert_data_types(pd.read_csv(path))
+        data_types = df.dtypes.apply(lambda x: str(x)).to_dict()
+        return lambda: sum(len(piece) for piece in iter_json(df, data_types))
+
+    from django.core.files.uploadedfile import SimpleUploadedFile
+    from django.test import Client
+    from django.test.utils import override_settings, setup_test_environment
+    setup_test_environment()
+    override_settings(UPLOAD_CACHE_ENABLED=False, DATASET_PERSIST_UPLOADS=False).enable()
+    with open(path, 'rb') as csv_file:
+        content = csv_file.read()
+    client = Client()
+
+    def upload():
+        response = client.post('/data_processing/upload/?stream=1',
+                               {'file': SimpleUploadedFile('bench.csv', content)})
+        if response.status_code != 200:
+            raise RuntimeError(response.content[:200])
+        return sum(len(piece) for piece in response.streaming_content)
+    return upload
+
+
+def run_stage(stage, path, repeat, queue):
+    import warnings
+    warnings.simplefilter('ignore')
+    setup_django()
+    timed = prepare_stage(stage, path)
+    baseline = reset_peak_rss()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        timed()
+        timings.append(time.perf_counter() - start)
+    queue.put((min(timings), peak_rss_mb() - baseline))
+
+
+def run_in_process(context, target, *args):
+    queue = context.Queue()
+    process = context.Process(target=target, args=(*args, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def write_input(path, rows, shape, queue):
+    queue.put(write_csv(path, rows, shape))
+
+
+def environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = ''
+    import numpy
+    import pandas
+    try:
+        import pyarrow
+        pyarrow_version = pyarrow.__version__
+    except ImportError:
+        pyarrow_version = None
+    return {
+        'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        'commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'pandas': pandas.__version__,
+        'numpy': numpy.__version__,
+        'pyarrow': pyarrow_version,
+    }
+
+
+def find_regressions(results, baseline, tolerance):
+    """
+    Compares results with a baseline run.
+
+    Args:
+    - results (list): Result entries of this run.
+    - baseline (dict): A results document written by an earlier run.
+    - tolerance (float): Allowed relative growth, e.g. 0.2 for 20%.
+
+    Returns:
+    - list: Human-readable descriptions of every metric that regressed.
+    """
+    previous = {entry['name']: entry for entry in baseline['results']}
+    regressions = []
+    for entry in results:
+        old = previous.get(entry['name'])
+        if old is None:
+            continue
+        for metric, floor in (('seconds', MIN_SECONDS_DELTA), ('peak_rss_mb', MIN_RSS_DELTA_MB)):
+            if entry[metric] - old[metric] > max(old[metric] * tolerance, floor):
+                regressions.append(f"{entry['name']} {metric}: {old[metric]:.3f} -> {entry[metric]:.3f}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 100_000])
+    parser.add_argument('--shapes', nargs='+', choices=list(SHAPES), default=list(SHAPES))
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=list(STAGES))
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', help='Write the results to this JSON file')
+    parser.add_argument('--baseline', help='Results JSON of an earlier run to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.2)
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context('spawn')
+    results = []
+    print(f"{'benchmark':<28} {'size':>9} {'time':>9} {'peak RSS':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for shape in args.shapes:
+            for rows in args.rows:
+                path = os.path.join(tmp, f'{shape}_{rows}.csv')
+                # Generated in its own process so the data does not count towards any stage
+                size = run_in_process(context, write_input, path, rows, shape)
+                for stage in args.stages:
+                    seconds, rss = run_in_process(context, run_stage, stage, path, args.repeat)
+                    name = f'{stage}[{shape}-{rows}]'
+                    results.append({'name': name, 'stage': stage, 'shape': shape, 'rows': rows,
+                                     'file_bytes': size, 'seconds': seconds, 'peak_rss_mb': rss})
+                    print(f"{name:<28} {size / 1e6:>6.1f} MB {seconds:>8.3f}s {rss:>7.0f} MB")
+                os.remove(path)
+
+    document = {'environment': environment(), 'results': results}
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            json.dump(document, output_file, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            regressions = find_regressions(results, json.load(baseline_file), args.tolerance)
+        if regressions:
+            print(f"Regressions beyond {args.tolerance:.0%}:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print("No regressions against the baseline")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+from django.http import JsonResponse
+from django.contrib.auth.models import User
+from django.contrib.auth import authenticate
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import AllowAny
+from rest_framework.authtoken.models import Token
+from rest_framework import status
+from rest_framework.response import Response
+
+# API endpoint for user registration
+@api_view(['POST'])
+@permission_classes([AllowAny])
+def register(request):
+    username = request.data.get('username')
+    password = request.data.get('password')
+
+    # Check if the username already exists
+    if User.objects.filter(username=username).exists():
+        return JsonResponse({'error': 'Username already exists'}, status=400)
+
+    # Create a new user and generate an authentication token
+    user = User.objects.create_user(username=username, password=password)
+    token = Token.objects.create(user=user)
+    return Response({'token': token.key}, status=status.HTTP_201_CREATED)
+
+# API endpoint for user login
+@api_view(['POST'])
+@permission_classes([AllowAny])
+def login(request):
+    username = request.data.get('username')
+    password = request.data.get('password')
+
+    # Authenticate the user with provided credentials
+    user = authenticate(username=username, password=password)
+    if user:
+        # Generate or get the existing token for the user
+        token, _ = Token.objects.get_or_create(user=user)
+        return JsonResponse({'token': token.key}, status=200)
+
+    # Return error if credentials are invalid
+    return Response({'error': 'Invalid credentials'}, status=status.HTTP_401_UNAUTHORIZED)
+
+# API endpoint for user logout
+@api_view(['POST'])
+def logout(request):
+    token = request.auth
+
+    # Check if the token is valid and delete it
+    if token:
+        token.delete()
+        return Response({'message': 'Logged out successfully'}, status=status.HTTP_200_OK)
+
+    # Return error if the token is invalid
+    return Response({'error': 'Invalid token'}, status=status.HTTP_400_BAD_REQUEST)
@@ -1,3 +1,16 @@
 from django.contrib import admin
 
 # Register your models here.
+from .models import UploadedData, UploadJob
+
+
+@admin.register(UploadJob)
+class UploadJobAdmin(admin.ModelAdmin):
+    list_display = ('file_name', 'status', 'stage', 'rows_processed', 'created_at')
+    list_filter = ('status',)
+
+
+@admin.register(UploadedData)
+class UploadedDataAdmin(admin.ModelAdmin):
+    list_display = ('file_name', 'owner', 'row_count', 'size_bytes', 'created_at')
+    search_fields = ('file_name', 'content_hash')
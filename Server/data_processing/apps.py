@@ -1,6 +1,16 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class DataProcessingConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'data_processing'
+
+    def ready(self):
+        # Connects the signals that drop cached tokens when they are deleted
+        from . import authentication  # noqa: F401
+
+        # The upload stack is otherwise imported by the first request that needs it
+        if settings.DATA_PROCESSING_WARM_UP:
+            from .warm_up import warm_up
+            warm_up()
@@ -0,0 +1,319 @@
+import asyncio
+import contextvars
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs
+
+from django.conf import settings
+from django.db import close_old_connections
+from rest_framework.exceptions import AuthenticationFailed
+
+from .authentication import CachedTokenAuthentication
+from .pipeline import column_statistics, optimize_upload, read_upload
+from .storage import store_dataset
+from .utils.ingestion import SheetNotFound, available_csv_engines
+from .utils.arrow_stream import ARROW_STREAM_CONTENT_TYPE, iter_arrow, negotiate
+from .utils.instrumentation import Trace, activate, deactivate, metrics
+from .utils.json_stream import NDJSON_CONTENT_TYPE, iter_json, iter_ndjson
+
+logger = logging.getLogger('data_processing.requests')
+
+# Body bytes collected before they are written to the spool file in one call
+SPOOL_WRITE_BYTES = 1024 * 1024
+
+_executor = None
+_executor_lock = threading.Lock()
+_pending = 0
+_pending_lock = threading.Lock()
+
+
+class UploadRejected(Exception):
+    """
+    Raised when a streamed upload cannot be taken; carries the HTTP status and message to return.
+    """
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def get_executor():
+    """
+    Returns the thread pool running parsing, inference and encoding of streamed uploads.
+
+    Its size bounds how many uploads use the CPU at once, so the event loop itself only
+    ever moves bytes and stays responsive however many uploads are in flight.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=settings.ASYNC_UPLOAD_WORKERS,
+                                           thread_name_prefix='async-upload')
+        return _executor
+
+
+def admit_upload():
+    global _pending
+    with _pending_lock:
+        if _pending >= settings.ASYNC_UPLOAD_QUEUE_LIMIT:
+            return False
+        _pending += 1
+        return True
+
+
+def release_upload():
+    global _pending
+    with _pending_lock:
+        _pending -= 1
+
+
+def stream_upload_options(query_string):
+    """
+    Reads the parameters of a streamed upload from its query string.
+
+    The body carries the raw file, so the file name (`name`) and the inference parameters
+    travel in the query string: `parser`, `threshold`, `column_types` (JSON) and `format`
+    ('json' or 'ndjson').
+
+    Raises:
+    - ValueError: If a parameter is missing or invalid.
+    """
+    params = {key: values[-1] for key, values in parse_qs(query_string).items()}
+    options = {
+        'name': params.get('name', ''),
+        'engine': params.get('parser') or settings.CSV_PARSER_BACKEND,
+        'threshold': 0.5,
+        'column_types': None,
+        'format': params.get('format', 'json'),
+    }
+    if not options['name'].endswith(('.csv', '.xlsx')):
+        raise ValueError('name must be the name of a .csv or .xlsx file')
+    if options['engine'] not in available_csv_engines():
+        raise ValueError(f"parser must be one of: {', '.join(available_csv_engines())}")
+    if options['format'] not in ('json', 'ndjson'):
+        raise ValueError("format must be 'json' or 'ndjson'")
+    if params.get('threshold'):
+        try:
+            options['threshold'] = float(params['threshold'])
+        except ValueError:
+            raise ValueError('threshold must be a number')
+    if params.get('column_types'):
+        try:
+            options['column_types'] = json.loads(params['column_types'])
+        except json.JSONDecodeError:
+            options['column_types'] = None
+        if not isinstance(options['column_types'], dict):
+            raise ValueError('column_types must be a JSON object')
+    return options
+
+
+def token_owner(authorization):
+    """
+    Returns the user of a `Token <key>` Authorization header, or None.
+    """
+    keyword, _, key = (authorization or '').partition(' ')
+    if keyword != 'Token' or not key:
+        return None
+    try:
+        return CachedTokenAuthentication().authenticate_credentials(key.strip())[0]
+    except AuthenticationFailed:
+        return None
+
+
+def process_spooled_upload(path, options, owner=None):
+    """
+    Parses, infers and optionally stores a spooled upload.
+
+    Args:
+    - path (str): The spooled file.
+    - options (dict): Parameters as returned by `stream_upload_options`.
+    - owner (User, optional): The user the stored dataset belongs to.
+
+    Returns:
+    - tuple: (processed pd.DataFrame, UploadedData or None, fields to return next to the data types).
+    """
+    statistics = column_statistics()
+    processed_df, schema = read_upload(path, options['name'], column_types=options['column_types'],
+                                       threshold=options['threshold'], engine=options['engine'],
+                                       statistics=statistics)
+    processed_df, schema, _ = optimize_upload(processed_df, schema)
+    uploaded = None
+    if settings.DATASET_PERSIST_UPLOADS:
+        uploaded = store_dataset(processed_df, schema, options['name'], owner=owner, raw_file=path,
+                                 statistics=statistics)
+    extra = {'statistics': statistics.result()} if statistics is not None else {}
+    return processed_df, uploaded, extra
+
+
+def run_spooled_upload(path, options, authorization=None):
+    # Worker threads keep their own database connections, so drop stale ones around each upload
+    close_old_connections()
+    try:
+        owner = token_owner(authorization) if settings.DATASET_PERSIST_UPLOADS else None
+        return process_spooled_upload(path, options, owner)
+    finally:
+        close_old_connections()
+
+
+async def spool_body(receive, suffix):
+    """
+    Writes the request body to a temporary file as it arrives, without blocking the event loop.
+
+    Chunks are collected up to SPOOL_WRITE_BYTES and written from a thread, so a slow client
+    only costs an idle coroutine while its body trickles in.
+
+    Returns:
+    - str: Path of the spooled file.
+
+    Raises:
+    - UploadRejected: If the body exceeds ASYNC_UPLOAD_MAX_BYTES or the client disconnects.
+    """
+    os.makedirs(settings.UPLOAD_JOB_SPOOL_DIR, exist_ok=True)
+    fd, path = tempfile.mkstemp(suffix=suffix, dir=settings.UPLOAD_JOB_SPOOL_DIR)
+    spool_file = os.fdopen(fd, 'wb')
+    buffered, buffered_bytes, size = [], 0, 0
+    try:
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                raise UploadRejected(400, 'Client disconnected')
+            body = message.get('body', b'')
+            size += len(body)
+            if size > settings.ASYNC_UPLOAD_MAX_BYTES:
+                raise UploadRejected(413, 'Upload too large')
+            buffered.append(body)
+            buffered_bytes += len(body)
+            more_body = message.get('more_body', False)
+            if buffered_bytes >= SPOOL_WRITE_BYTES or not more_body:
+                await asyncio.to_thread(spool_file.write, b''.join(buffered))
+                buffered, buffered_bytes = [], 0
+            if not more_body:
+                break
+    except BaseException:
+        spool_file.close()
+        os.remove(path)
+        raise
+    spool_file.close()
+    return path
+
+
+def cors_headers(headers):
+    origin = headers.get('origin')
+    if origin and (settings.CORS_ALLOW_ALL_ORIGINS or origin in settings.CORS_ALLOWED_ORIGINS):
+        return [(b'access-control-allow-origin', origin.encode('latin-1')),
+                (b'access-control-expose-headers', b'x-dataset-id, server-timing')]
+    return []
+
+
+async def send_json(send, status, body, headers=()):
+    content = json.dumps(body).encode('utf-8')
+    await send({'type': 'http.response.start', 'status': status,
+                'headers': [(b'content-type', b'application/json'), *headers]})
+    await send({'type': 'http.response.body', 'body': content})
+
+
+async def streaming_upload(scope, receive, send):
+    """
+    ASGI application taking a raw CSV or Excel body and streaming back the processed rows.
+
+    The body is spooled as it arrives; parsing, inference and JSON encoding run on the
+    bounded executor from `get_executor`, at most ASYNC_UPLOAD_QUEUE_LIMIT uploads are
+    admitted at once, and the response is streamed in batches, as Arrow record batches when the
+    client accepts an Arrow stream. Owners are recognized by
+    API token only; session cookies are not read on this path.
+    """
+    headers = {key.decode('latin-1').lower(): value.decode('latin-1') for key, value in scope['headers']}
+    cors = cors_headers(headers)
+    if scope['method'] == 'OPTIONS':
+        await send({'type': 'http.response.start', 'status': 200, 'headers': [
+            *cors,
+            (b'access-control-allow-methods', b'POST, OPTIONS'),
+            (b'access-control-allow-headers', ', '.join(settings.CORS_ALLOW_HEADERS).encode('latin-1')),
+        ]})
+        await send({'type': 'http.response.body', 'body': b''})
+        return
+    if scope['method'] != 'POST':
+        await send_json(send, 405, {'error': 'Request method must be POST'}, cors)
+        return
+    try:
+        options = stream_upload_options(scope['query_string'].decode('latin-1'))
+    except ValueError as e:
+        await send_json(send, 400, {'error': str(e)}, cors)
+        return
+    response_format = negotiate(headers.get('accept'))
+    if response_format is None:
+        await send_json(send, 406, {'error': f'{ARROW_STREAM_CONTENT_TYPE} responses need pyarrow, '
+                                             'which is not installed'}, cors)
+        return
+    if not admit_upload():
+        await send_json(send, 503, {'error': 'Too many uploads in progress, try again later'},
+                        [*cors, (b'retry-after', b'30')])
+        return
+
+    trace = Trace(scope['path'])
+    token = activate(trace)
+    status = 200
+    # Set once the status line is sent; after that an error can only abort the response
+    started = False
+    loop = asyncio.get_running_loop()
+    try:
+        path = await spool_body(receive, os.path.splitext(options['name'])[1])
+        try:
+            # The copied context carries the trace into the worker thread
+            processed_df, uploaded, extra = await loop.run_in_executor(
+                get_executor(), contextvars.copy_context().run, run_spooled_upload,
+                path, options, headers.get('authorization'),
+            )
+        finally:
+            os.remove(path)
+
+        data_types = processed_df.dtypes.apply(lambda x: str(x)).to_dict()
+        if response_format == 'arrow':
+            encoder, content_type = iter_arrow, ARROW_STREAM_CONTENT_TYPE
+        elif options['format'] == 'ndjson':
+            encoder, content_type = iter_ndjson, NDJSON_CONTENT_TYPE
+        else:
+            encoder, content_type = iter_json, 'application/json'
+        response_headers = [(b'content-type', content_type.encode('latin-1')),
+                            (b'server-timing', trace.server_timing().encode('latin-1')), *cors]
+        if uploaded is not None:
+            response_headers.append((b'x-dataset-id', str(uploaded.id).encode('latin-1')))
+        await send({'type': 'http.response.start', 'status': status, 'headers': response_headers})
+        started = True
+
+        pieces = encoder(processed_df, data_types, batch_size=settings.UPLOAD_RESPONSE_BATCH_ROWS, extra=extra)
+        encode_seconds = 0.0
+        while True:
+            start = time.perf_counter()
+            piece = await loop.run_in_executor(get_executor(), next, pieces, None)
+            encode_seconds += time.perf_counter() - start
+            if piece is None:
+                break
+            await send({'type': 'http.response.body', 'body': piece, 'more_body': True})
+        await send({'type': 'http.response.body', 'body': b''})
+        trace.record('encode', encode_seconds, rows=len(processed_df))
+    except Exception as e:
+        if started:
+            # The server closes the connection, so the client sees a failed rather than a short response
+            status = 500
+            raise
+        if isinstance(e, UploadRejected):
+            status = e.status
+        elif isinstance(e, (ValueError, SheetNotFound)):
+            status = 400
+        else:
+            status = 500
+        await send_json(send, status, {'error': str(e)}, cors)
+    finally:
+        release_upload()
+        deactivate(token)
+        metrics.observe_trace(trace, 'upload_stream')
+        logger.info('request finished', extra={
+            'method': 'POST', 'view': 'upload_stream', 'status': status, 'trace': trace.as_dict(),
+        })
+
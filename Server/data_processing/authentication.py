@@ -0,0 +1,131 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+# Prefix of the token entries kept in the shared cache
+SHARED_KEY_PREFIX = 'data_processing:token:'
+
+
+def shared_cache():
+    """
+    Returns the cache named by AUTH_TOKEN_SHARED_CACHE, or None when tokens are only cached in-process.
+    """
+    alias = settings.AUTH_TOKEN_SHARED_CACHE
+    return caches[alias] if alias else None
+
+
+class TokenCache:
+    """
+    Recently authenticated tokens with their users, so repeated requests skip the Token and User query.
+
+    Entries live for AUTH_TOKEN_CACHE_SECONDS and at most AUTH_TOKEN_CACHE_SIZE are kept, the least
+    recently used going first. When AUTH_TOKEN_SHARED_CACHE names a Django cache, entries are also
+    written there, so the worker processes of one host share their lookups. A deleted token is
+    dropped from this process and from the shared cache at once; other processes' in-process
+    entries expire after at most AUTH_TOKEN_CACHE_SECONDS.
+    """
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """
+        Returns the (user, token) pair cached for `key`, or None.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0], entry[1]
+            self._entries.pop(key, None)
+
+        shared = shared_cache()
+        cached = shared.get(SHARED_KEY_PREFIX + key) if shared is not None else None
+        with self._lock:
+            if cached is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        self._remember(key, *cached)
+        return cached
+
+    def put(self, key, user, token):
+        self._remember(key, user, token)
+        shared = shared_cache()
+        if shared is not None:
+            shared.set(SHARED_KEY_PREFIX + key, (user, token), settings.AUTH_TOKEN_CACHE_SECONDS)
+
+    def _remember(self, key, user, token):
+        with self._lock:
+            self._entries[key] = (user, token, time.monotonic() + settings.AUTH_TOKEN_CACHE_SECONDS)
+            self._entries.move_to_end(key)
+            while len(self._entries) > settings.AUTH_TOKEN_CACHE_SIZE:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+        shared = shared_cache()
+        if shared is not None:
+            shared.delete(SHARED_KEY_PREFIX + key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+
+token_cache = TokenCache()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    DRF token authentication answering repeated tokens from `token_cache` instead of the database.
+
+    Only valid tokens are cached: an unknown key or an inactive user is looked up every time,
+    so a token created after a failed attempt works straight away. Setting
+    AUTH_TOKEN_CACHE_SECONDS to 0 turns the cache off.
+    """
+
+    def authenticate_credentials(self, key):
+        if not settings.AUTH_TOKEN_CACHE_SECONDS:
+            return super().authenticate_credentials(key)
+        cached = token_cache.get(key)
+        if cached is not None:
+            return cached
+        user, token = super().authenticate_credentials(key)
+        token_cache.put(key, user, token)
+        return user, token
+
+
+# Logging out deletes the token, and deleting a user deletes its token along with it
+@receiver(post_delete, sender=Token)
+def forget_deleted_token(sender, instance, **kwargs):
+    token_cache.invalidate(instance.key)
+
+
+# A deactivated or renamed user must not be served from a cached copy
+@receiver(post_save, sender=User)
+def forget_saved_user_tokens(sender, instance, created=False, update_fields=None, **kwargs):
+    if created or update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    for key in Token.objects.filter(user=instance).values_list('key', flat=True):
+        token_cache.invalidate(key)
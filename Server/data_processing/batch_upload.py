@@ -0,0 +1,273 @@
+import contextvars
+import os
+import shutil
+import tarfile
+import tempfile
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.conf import settings
+
+from .pipeline import column_statistics, optimize_upload, read_upload
+from .storage import store_dataset
+from .utils.column_statistics import FrameStatistics
+from .utils.ingestion import concat_chunks, unify_schemas
+from .utils.instrumentation import stage
+
+# Archive names whose members are uploaded one by one
+ZIP_SUFFIXES = ('.zip',)
+TAR_SUFFIXES = ('.tar.gz', '.tgz')
+
+# File types processed inside a batch
+DATA_SUFFIXES = ('.csv', '.xlsx')
+
+# Bytes copied at a time when extracting an archive member
+COPY_BLOCK_BYTES = 1024 * 1024
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+class BatchTooLarge(ValueError):
+    pass
+
+
+def get_executor():
+    """
+    Returns the thread pool parsing and inferring the members of batch uploads.
+
+    The pool is shared by all batches, so BATCH_UPLOAD_WORKERS bounds the files processed at
+    once across requests.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=settings.BATCH_UPLOAD_WORKERS,
+                                           thread_name_prefix='batch-upload')
+        return _executor
+
+
+def is_archive(name):
+    return name.lower().endswith(ZIP_SUFFIXES + TAR_SUFFIXES)
+
+
+def copy_member(source, directory, index, name):
+    """
+    Writes an archive member to `directory` under a generated name, keeping its extension.
+
+    Member paths are never used as file system paths, so names like '../x.csv' cannot escape.
+
+    Returns:
+    - str: Path of the copy.
+    """
+    path = os.path.join(directory, f'{index}{os.path.splitext(name)[1].lower()}')
+    with open(path, 'wb') as target:
+        shutil.copyfileobj(source, target, COPY_BLOCK_BYTES)
+    return path
+
+
+def archive_entries(file, name):
+    """
+    Lists the regular files of a zip or tar.gz archive.
+
+    Yields:
+    - tuple: (member name, size in bytes, callable opening the member for reading).
+    """
+    if name.lower().endswith(ZIP_SUFFIXES):
+        archive = zipfile.ZipFile(file)
+        for info in archive.infolist():
+            if not info.is_dir():
+                yield info.filename, info.file_size, lambda info=info: archive.open(info)
+        return
+    with tarfile.open(fileobj=file, mode='r:gz') as archive:
+        for member in archive:
+            if member.isfile():
+                yield member.name, member.size, lambda member=member: archive.extractfile(member)
+
+
+def expand_batch(files, directory):
+    """
+    Turns the uploaded files of a batch into its members, extracting archives into `directory`.
+
+    Hidden files and macOS resource forks inside archives are skipped; other members that are
+    not CSV or Excel files are listed with an error so the client sees what was left out.
+
+    Args:
+    - files (list): The uploaded files.
+    - directory (str): Where archive members are extracted.
+
+    Returns:
+    - list: (file name, file or path, error or None) tuples in upload order.
+
+    Raises:
+    - BatchTooLarge: If the batch has more than BATCH_UPLOAD_MAX_FILES members or its archives
+      hold more than BATCH_UPLOAD_MAX_BYTES.
+    - ValueError: If an archive cannot be read.
+    """
+    members = []
+    extracted_bytes = 0
+    for file in files:
+        if not is_archive(file.name):
+            members.append((file.name, file, None if file.name.endswith(DATA_SUFFIXES) else 'Unsupported file type'))
+            continue
+        try:
+            for name, size, open_member in archive_entries(file, file.name):
+                base_name = os.path.basename(name)
+                if base_name.startswith('.') or name.startswith('__MACOSX/'):
+                    continue
+                if not name.endswith(DATA_SUFFIXES):
+                    members.append((name, None, 'Unsupported file type'))
+                    continue
+                # Checked against the declared sizes before anything is written, against archive bombs
+                extracted_bytes += size
+                if extracted_bytes > settings.BATCH_UPLOAD_MAX_BYTES:
+                    raise BatchTooLarge('The archives hold more data than a batch may contain')
+                if len(members) >= settings.BATCH_UPLOAD_MAX_FILES:
+                    raise BatchTooLarge(f'A batch may contain at most {settings.BATCH_UPLOAD_MAX_FILES} files')
+                with open_member() as source:
+                    members.append((name, copy_member(source, directory, len(members), name), None))
+        except (zipfile.BadZipFile, tarfile.TarError, EOFError, OSError) as e:
+            raise ValueError(f'{file.name} is not a readable archive: {e}')
+    if len(members) > settings.BATCH_UPLOAD_MAX_FILES:
+        raise BatchTooLarge(f'A batch may contain at most {settings.BATCH_UPLOAD_MAX_FILES} files')
+    return members
+
+
+def process_member(file, name, options):
+    """
+    Parses, infers and shrinks one member of a batch.
+
+    Returns:
+    - tuple: (pd.DataFrame, schema dict, FrameStatistics or None).
+    """
+    statistics = column_statistics()
+    df, schema = read_upload(file, name, column_types=options['column_types'], threshold=options['threshold'],
+                             engine=options['engine'], sheet=options['sheet'], statistics=statistics)
+    df, schema, _ = optimize_upload(df, schema)
+    return df, schema, statistics
+
+
+def merge_members(processed):
+    """
+    Joins the frames of members with the same columns into one, unifying their inferred dtypes.
+
+    Args:
+    - processed (list): (pd.DataFrame, schema dict, FrameStatistics or None) tuples in upload order.
+
+    Returns:
+    - tuple: (pd.DataFrame, schema dict, FrameStatistics or None) of the joined rows.
+    """
+    if len(processed) == 1:
+        return processed[0]
+    schema = unify_schemas([{str(col): spec for col, spec in member_schema.items()}
+                            for _, member_schema, _ in processed])
+    with stage('merge'):
+        df = concat_chunks([df.rename(columns=str) for df, _, _ in processed], schema)
+    df, schema, _ = optimize_upload(df, schema)
+
+    statistics = None
+    if processed[0][2] is not None:
+        statistics = FrameStatistics()
+        try:
+            for _, _, member_statistics in processed:
+                statistics.merge(member_statistics)
+        except ValueError:
+            # A column's kind differs between members; summarize the joined rows instead
+            statistics = FrameStatistics()
+            statistics.update(df)
+        statistics.finish(df)
+    return df, schema, statistics
+
+
+def column_key(df):
+    return tuple(sorted(str(col) for col in df.columns))
+
+
+def process_batch(files, options, owner=None, merge=False):
+    """
+    Processes the files of a batch upload concurrently and stores each result as a dataset.
+
+    Members are parsed and inferred on the pool from `get_executor`; datasets are stored from
+    the calling thread as members finish. With `merge`, members with the same set of columns
+    are joined into one dataset whose dtypes hold every member's values. A member or merged
+    group that fails is reported with its error and does not affect the others.
+
+    A merged dataset comes from several files, so it keeps neither a raw copy nor a content
+    hash; its members' originals are not stored, and uploading one of them again does not
+    match it.
+
+    Args:
+    - files (list): The uploaded files: CSV or Excel files and zip or tar.gz archives of them.
+    - options (dict): Inference parameters as returned by `upload_options`.
+    - owner (User, optional): The user the stored datasets belong to.
+    - merge (bool, optional): Join members with the same columns into one dataset.
+
+    Returns:
+    - dict: `files`, one entry per member in upload order, with its `dataset_id` and data types
+      or its `error`; with `merge`, also `datasets`, one entry per stored dataset with the
+      names of the files it holds.
+
+    Raises:
+    - BatchTooLarge: If the batch exceeds BATCH_UPLOAD_MAX_FILES or BATCH_UPLOAD_MAX_BYTES.
+    - ValueError: If an archive cannot be read.
+    """
+    os.makedirs(settings.UPLOAD_JOB_SPOOL_DIR, exist_ok=True)
+    directory = tempfile.mkdtemp(prefix='batch-', dir=settings.UPLOAD_JOB_SPOOL_DIR)
+    try:
+        members = expand_batch(files, directory)
+        results = [{'file_name': name} for name, _, _ in members]
+        futures = {}
+        for index, (name, file, error) in enumerate(members):
+            if error is not None:
+                results[index]['error'] = error
+                continue
+            # The copied context carries the request's trace into the worker thread
+            future = get_executor().submit(contextvars.copy_context().run, process_member, file, name, options)
+            futures[future] = index
+
+        processed = {}
+        for future in as_completed(futures):
+            index = futures[future]
+            name, file, _ = members[index]
+            try:
+                df, schema, statistics = future.result()
+            except Exception as e:
+                results[index]['error'] = str(e)
+                continue
+            results[index]['row_count'] = len(df)
+            if merge:
+                processed[index] = (df, schema, statistics)
+                continue
+            try:
+                uploaded = store_dataset(df, schema, os.path.basename(name), owner=owner, raw_file=file,
+                                         statistics=statistics)
+            except Exception as e:
+                results[index]['error'] = str(e)
+                continue
+            results[index].update(dataset_id=str(uploaded.id), data_types=df.dtypes.apply(lambda x: str(x)).to_dict())
+        if not merge:
+            return {'files': results}
+
+        groups = {}
+        for index in sorted(processed):
+            groups.setdefault(column_key(processed[index][0]), []).append(index)
+        datasets = []
+        for indexes in groups.values():
+            # A group that cannot be merged or stored is reported on its files, like a failed member
+            try:
+                df, schema, statistics = merge_members([processed.pop(index) for index in indexes])
+                uploaded = store_dataset(df, schema, os.path.basename(members[indexes[0]][0]), owner=owner,
+                                         statistics=statistics)
+            except Exception as e:
+                for index in indexes:
+                    results[index]['error'] = str(e)
+                continue
+            data_types = df.dtypes.apply(lambda x: str(x)).to_dict()
+            for index in indexes:
+                results[index]['dataset_id'] = str(uploaded.id)
+            datasets.append({'dataset_id': str(uploaded.id), 'file_names': [members[i][0] for i in indexes],
+                             'row_count': len(df), 'data_types': data_types})
+        return {'files': results, 'datasets': datasets}
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
@@ -0,0 +1,19 @@
+# data_processing/data_urls.py
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path('upload/', views.upload, name='upload'),
+    path('upload/stream/', views.upload_stream, name='upload_stream'),
+    path('upload/batch/', views.upload_batch, name='upload_batch'),
+    path('datasets/', views.dataset_list, name='dataset_list'),
+    path('datasets/<uuid:dataset_id>/', views.dataset_schema, name='dataset_schema'),
+    path('datasets/<uuid:dataset_id>/raw/', views.dataset_raw, name='dataset_raw'),
+    path('datasets/<uuid:dataset_id>/append/', views.dataset_append, name='dataset_append'),
+    path('datasets/<uuid:dataset_id>/rows/', views.dataset_rows, name='dataset_rows'),
+    path('datasets/<uuid:dataset_id>/query/', views.dataset_query, name='dataset_query'),
+    path('jobs/<uuid:job_id>/', views.job_status, name='job_status'),
+    path('jobs/<uuid:job_id>/result/', views.job_result, name='job_result'),
+    path('cache/stats/', views.cache_stats, name='cache_stats'),
+    path('metrics/', views.metrics_view, name='metrics'),
+]
@@ -0,0 +1,200 @@
+import logging
+import os
+import socket
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.utils import timezone
+
+from .models import UploadJob
+from .pipeline import column_statistics, optimize_upload, read_upload, use_out_of_core
+from .storage import store_dataset, store_upload_out_of_core
+from .utils.instrumentation import Trace, activate, deactivate, metrics
+
+logger = logging.getLogger(__name__)
+
+# Minimum number of rows between two progress writes to the database
+PROGRESS_INTERVAL_ROWS = 100_000
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+class QueueFull(Exception):
+    pass
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=settings.UPLOAD_JOB_WORKERS,
+                                           thread_name_prefix='upload-job')
+        return _executor
+
+
+def spool_upload(file):
+    """
+    Copies an uploaded file to the spool directory chunk by chunk.
+
+    Returns:
+    - str: Path of the spooled copy.
+    """
+    os.makedirs(settings.UPLOAD_JOB_SPOOL_DIR, exist_ok=True)
+    path = os.path.join(settings.UPLOAD_JOB_SPOOL_DIR, f'{uuid.uuid4()}{os.path.splitext(file.name)[1]}')
+    with open(path, 'wb') as spool_file:
+        for chunk in file.chunks():
+            spool_file.write(chunk)
+    return path
+
+
+def enqueue_upload(file, owner=None):
+    """
+    Queues an uploaded file for background processing.
+
+    Args:
+    - file (UploadedFile): The uploaded CSV or Excel file.
+    - owner (User, optional): The uploader, who will own the stored dataset.
+
+    Returns:
+    - UploadJob: The queued job.
+
+    Raises:
+    - QueueFull: If UPLOAD_JOB_QUEUE_LIMIT jobs are already queued or running.
+    """
+    # Spooled before the transaction, so the write lock is not held while the file is copied
+    file_path = spool_upload(file)
+    try:
+        # The count and the insert share a transaction; SQLite begins it IMMEDIATE, taking the
+        # write lock, so concurrent uploads cannot both pass the check
+        with transaction.atomic():
+            pending = UploadJob.objects.filter(
+                status__in=[UploadJob.STATUS_QUEUED, UploadJob.STATUS_RUNNING],
+            ).count()
+            if pending >= settings.UPLOAD_JOB_QUEUE_LIMIT:
+                raise QueueFull()
+            job = UploadJob.objects.create(owner=owner, file_name=file.name, file_path=file_path)
+    except BaseException:
+        os.remove(file_path)
+        raise
+    start_worker()
+    return job
+
+
+def worker_id():
+    # Read on every claim, as server processes may be forked after this module is imported
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+@contextmanager
+def hold_lease(job):
+    """
+    Renews a running job's lease from a background thread until the block exits.
+
+    The lease is renewed three times per UPLOAD_JOB_LEASE_SECONDS, so it only expires when the
+    process running the job has died or stalled.
+    """
+    stop = threading.Event()
+
+    def renew():
+        try:
+            while not stop.wait(settings.UPLOAD_JOB_LEASE_SECONDS / 3):
+                UploadJob.objects.filter(pk=job.pk, status=UploadJob.STATUS_RUNNING).update(
+                    updated_at=timezone.now(),
+                )
+        finally:
+            connection.close()
+
+    thread = threading.Thread(target=renew, name=f'upload-job-lease-{job.pk}', daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def start_worker():
+    get_executor().submit(worker)
+
+
+def worker():
+    # Worker threads open their own database connections, so close them when done
+    close_old_connections()
+    try:
+        run_pending_jobs()
+    finally:
+        close_old_connections()
+
+
+def claim_next_job():
+    """
+    Atomically moves the oldest queued job to running.
+
+    Returns:
+    - UploadJob or None: The claimed job, or None if the queue is empty.
+    """
+    while True:
+        job = UploadJob.objects.filter(status=UploadJob.STATUS_QUEUED).order_by('created_at').first()
+        if job is None:
+            return None
+        claimed = UploadJob.objects.filter(pk=job.pk, status=UploadJob.STATUS_QUEUED).update(
+            status=UploadJob.STATUS_RUNNING, stage='parsing', worker=worker_id(), updated_at=timezone.now(),
+        )
+        if claimed:
+            job.status, job.stage = UploadJob.STATUS_RUNNING, 'parsing'
+            return job
+
+
+def run_pending_jobs():
+    while True:
+        job = claim_next_job()
+        if job is None:
+            return
+        with hold_lease(job):
+            run_job(job)
+
+
+def run_job(job):
+    """
+    Parses, infers and stores one upload, recording progress on the job row.
+    """
+    last_reported = [0]
+
+    def report_progress(rows):
+        if rows - last_reported[0] >= PROGRESS_INTERVAL_ROWS:
+            UploadJob.objects.filter(pk=job.pk).update(rows_processed=rows)
+            last_reported[0] = rows
+
+    trace = Trace(f'job:{job.pk}')
+    token = activate(trace)
+    try:
+        if use_out_of_core(job.file_name, os.path.getsize(job.file_path)):
+            # Rows are stored as they are converted, so the job is storing from the start
+            UploadJob.objects.filter(pk=job.pk).update(stage='storing')
+            uploaded = store_upload_out_of_core(job.file_path, job.file_name, owner=job.owner,
+                                                progress=report_progress)
+        else:
+            statistics = column_statistics()
+            processed_df, schema = read_upload(job.file_path, job.file_name, progress=report_progress,
+                                               statistics=statistics)
+            processed_df, schema, _ = optimize_upload(processed_df, schema)
+            UploadJob.objects.filter(pk=job.pk).update(stage='storing', rows_processed=len(processed_df))
+            uploaded = store_dataset(processed_df, schema, job.file_name, owner=job.owner,
+                                     raw_file=job.file_path, statistics=statistics)
+        UploadJob.objects.filter(pk=job.pk).update(
+            status=UploadJob.STATUS_SUCCEEDED, stage='done', dataset_id=str(uploaded.id),
+            rows_processed=uploaded.row_count,
+        )
+    except Exception as e:
+        UploadJob.objects.filter(pk=job.pk).update(status=UploadJob.STATUS_FAILED, error=str(e))
+    finally:
+        deactivate(token)
+        metrics.observe_trace(trace, 'upload_job')
+        logger.info('job finished', extra={'job_id': str(job.pk), 'trace': trace.as_dict()})
+        if os.path.exists(job.file_path):
+            os.remove(job.file_path)
@@ -0,0 +1,84 @@
+import logging
+import os
+import random
+import time
+import tracemalloc
+
+from django.conf import settings
+
+from .utils.instrumentation import StackSampler, Trace, activate, deactivate, metrics
+
+logger = logging.getLogger('data_processing.requests')
+
+
+class InstrumentationMiddleware:
+    """
+    Collects per-stage timings for every request and reports them three ways: a `Server-Timing`
+    header, one structured log record per request, and the histograms behind the metrics endpoint.
+
+    Streamed responses get the header with the stages done before streaming started; their
+    encoding time is added to the log record and histograms once the last byte is sent.
+    A share of requests (PROFILE_SAMPLE_RATE) also runs under a sampling profiler whose
+    stacks are written to PROFILE_DIR when the request takes longer than PROFILE_THRESHOLD_SECONDS.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.INSTRUMENTATION_ENABLED:
+            return self.get_response(request)
+        if settings.INSTRUMENTATION_TRACE_MEMORY and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+        trace = Trace(request.path)
+        sampler = None
+        if settings.PROFILE_SAMPLE_RATE and random.random() < settings.PROFILE_SAMPLE_RATE:
+            sampler = StackSampler(interval=settings.PROFILE_INTERVAL_SECONDS).start()
+        token = activate(trace)
+        try:
+            response = self.get_response(request)
+        finally:
+            deactivate(token)
+
+        response['Server-Timing'] = trace.server_timing()
+        view = request.resolver_match.url_name if request.resolver_match else 'unresolved'
+        if response.streaming:
+            response.streaming_content = self.finish_after_stream(response.streaming_content, trace, request,
+                                                                  response, view, sampler)
+        else:
+            self.finish(trace, request, response, view, sampler)
+        return response
+
+    def finish_after_stream(self, content, trace, request, response, view, sampler):
+        # Only producing each piece is timed, not the time the server spends sending it
+        reader = iter(content)
+        seconds = 0.0
+        try:
+            while True:
+                start = time.perf_counter()
+                piece = next(reader, None)
+                seconds += time.perf_counter() - start
+                if piece is None:
+                    return
+                yield piece
+        finally:
+            trace.record('encode', seconds)
+            self.finish(trace, request, response, view, sampler)
+
+    def finish(self, trace, request, response, view, sampler):
+        metrics.observe_trace(trace, view)
+        record = trace.as_dict()
+        if sampler is not None:
+            sampler.stop()
+            if trace.elapsed >= settings.PROFILE_THRESHOLD_SECONDS:
+                record['profile'] = self.write_profile(sampler, view)
+        logger.info('request finished', extra={
+            'method': request.method, 'view': view, 'status': response.status_code, 'trace': record,
+        })
+
+    def write_profile(self, sampler, view):
+        os.makedirs(settings.PROFILE_DIR, exist_ok=True)
+        path = os.path.join(settings.PROFILE_DIR, f'{time.strftime("%Y%m%d-%H%M%S")}-{view}-{os.getpid()}.folded')
+        sampler.write(path)
+        return path
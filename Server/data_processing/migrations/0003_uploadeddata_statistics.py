@@ -0,0 +1,18 @@
+# Generated by Django 5.1.2 on 2026-10-18 20:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_processing', '0002_uploadeddata'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='uploadeddata',
+            name='statistics',
+            field=models.JSONField(default=dict),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.2 on 2026-10-18 21:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_processing', '0004_uploadjob_owner'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='uploadjob',
+            name='worker',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+    ]
@@ -1,3 +1,78 @@
+import uuid
+
+from django.conf import settings
 from django.db import models
 
-# Create your models here.
+
+class UploadJob(models.Model):
+    """
+    An upload processed in the background.
+
+    The table doubles as the job queue: workers claim the oldest queued job by flipping
+    its status to running, so no external broker is needed. A running job's `updated_at`
+    is a lease its worker keeps renewing; jobs whose lease expired are requeued.
+    """
+
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_SUCCEEDED = 'succeeded'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, 'Queued'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_SUCCEEDED, 'Succeeded'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    # The uploader, who also owns the stored dataset
+    owner = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.CASCADE,
+                              related_name='upload_jobs')
+    file_name = models.CharField(max_length=255)
+    # Location of the spooled upload while the job is pending
+    file_path = models.CharField(max_length=1024)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_QUEUED, db_index=True)
+    # Host and process running the job; while it runs, `updated_at` is renewed as its lease
+    worker = models.CharField(max_length=255, blank=True)
+    stage = models.CharField(max_length=32, blank=True)
+    rows_processed = models.BigIntegerField(default=0)
+    dataset_id = models.CharField(max_length=36, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['created_at']
+
+    def __str__(self):
+        return f'{self.file_name} ({self.status})'
+
+
+class UploadedData(models.Model):
+    """
+    A processed upload kept for later use.
+
+    The row holds the metadata only. The typed columns are stored as compressed columnar
+    segment files under DATASET_STORAGE_DIR/<id>/, next to a gzipped copy of the original
+    file, so opening a dataset never depends on its row count.
+    """
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    owner = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.CASCADE,
+                              related_name='uploaded_data')
+    file_name = models.CharField(max_length=255)
+    # SHA-256 of the original file
+    content_hash = models.CharField(max_length=64, blank=True, db_index=True)
+    schema = models.JSONField(default=dict)
+    # Per-column summaries as returned by `FrameStatistics.result`
+    statistics = models.JSONField(default=dict)
+    row_count = models.BigIntegerField(default=0)
+    size_bytes = models.BigIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f'{self.file_name} ({self.row_count} rows)'
@@ -0,0 +1,131 @@
+from django.conf import settings
+
+from .utils.column_statistics import FrameStatistics
+from .utils.ingestion import read_csv_streaming, read_excel_sheets, read_excel_streaming
+from .utils.instrumentation import stage
+from .utils.memory_optimizer import optimize_memory
+from .utils.result_cache import ResultCache
+
+
+class UnsupportedFileType(Exception):
+    pass
+
+
+_result_cache = None
+
+
+def get_result_cache():
+    """
+    Returns the process-wide cache of processed uploads configured in settings.
+    """
+    global _result_cache
+    if _result_cache is None:
+        _result_cache = ResultCache(settings.UPLOAD_CACHE_DIR, settings.UPLOAD_CACHE_MAX_BYTES)
+    return _result_cache
+
+
+def inference_options():
+    """
+    Returns the inference keyword arguments configured in settings.
+    """
+    return {
+        'max_workers': settings.INFERENCE_MAX_WORKERS,
+        'parallel_min_rows': settings.INFERENCE_PARALLEL_MIN_ROWS,
+    }
+
+
+def column_statistics():
+    """
+    Returns a collector for the column statistics of an upload, or None when UPLOAD_COLUMN_STATISTICS is off.
+    """
+    return FrameStatistics() if settings.UPLOAD_COLUMN_STATISTICS else None
+
+
+def use_out_of_core(file_name, size, requested=False):
+    """
+    Tells whether an upload is processed out of core: CSV files whose client asked for it, or
+    of at least UPLOAD_OUT_OF_CORE_MIN_BYTES.
+    """
+    if not file_name.endswith('.csv'):
+        return False
+    minimum = settings.UPLOAD_OUT_OF_CORE_MIN_BYTES
+    return requested or minimum is not None and size >= minimum
+
+
+def read_upload(file, file_name, column_types=None, threshold=0.5, progress=None, engine=None, schema=None,
+                sheet=0, statistics=None):
+    """
+    Reads an uploaded CSV or Excel file and infers its data types.
+
+    Args:
+    - file (file-like or str): The uploaded file or a path to it.
+    - file_name (str): The original file name, used to pick the reader.
+    - column_types (dict, optional): A dictionary specifying user-defined types for columns.
+    - threshold (float, optional): The minimum proportion of valid numeric values required to convert a column.
+    - progress (callable, optional): Called with the number of rows processed so far.
+    - engine (str, optional): CSV parsing backend; defaults to CSV_PARSER_BACKEND.
+    - schema (dict, optional): A previously inferred schema used to parse the file without inference.
+    - sheet (str or int, optional): Name or 0-based position of the worksheet read from Excel files.
+    - statistics (FrameStatistics, optional): Filled with the column statistics of the converted rows.
+
+    Returns:
+    - tuple: (pd.DataFrame with converted data types, schema dict).
+
+    Raises:
+    - UnsupportedFileType: If the file is neither .csv nor .xlsx.
+    """
+    if file_name.endswith('.csv'):
+        # Stream CSV files chunk by chunk so the raw object-typed frame is never fully loaded
+        df, schema = read_csv_streaming(file, chunksize=settings.UPLOAD_CHUNK_ROWS, column_types=column_types,
+                                        threshold=threshold, progress=progress,
+                                        engine=engine or settings.CSV_PARSER_BACKEND, schema=schema,
+                                        statistics=statistics, **inference_options())
+    elif file_name.endswith('.xlsx'):
+        # Stream the worksheet in read-only mode instead of loading the whole workbook
+        df, schema = read_excel_streaming(file, sheet_name=sheet, chunksize=settings.UPLOAD_CHUNK_ROWS,
+                                          column_types=column_types, threshold=threshold, progress=progress,
+                                          schema=schema, statistics=statistics, **inference_options())
+    else:
+        raise UnsupportedFileType(file_name)
+    if statistics is not None:
+        statistics.finish(df)
+    return df, schema
+
+
+def optimize_upload(df, schema):
+    """
+    Runs the memory optimizer configured in settings and records the new dtypes in the schema.
+
+    Args:
+    - df (pd.DataFrame): The processed DataFrame.
+    - schema (dict): Schema entries as returned by `schema_from_frame`.
+
+    Returns:
+    - tuple: (pd.DataFrame, schema dict, per-column memory report or None if optimization is off).
+    """
+    if not settings.UPLOAD_OPTIMIZE_MEMORY:
+        return df, schema, None
+    with stage('optimize', rows=len(df)):
+        df, report = optimize_memory(df, arrow_strings=settings.UPLOAD_ARROW_STRINGS)
+    schema = {
+        col: spec if spec['type'] == 'datetime' else {**spec, 'type': str(df[col].dtype)}
+        for col, spec in schema.items()
+    }
+    return df, schema, report
+
+
+def read_upload_sheets(file, sheet_names=None, column_types=None, threshold=0.5):
+    """
+    Reads several worksheets of an uploaded Excel file, one worker process per sheet.
+
+    Args:
+    - file (file-like or str): The uploaded workbook or a path to it.
+    - sheet_names (list, optional): Sheet names or 0-based positions; all sheets by default.
+    - column_types (dict, optional): A dictionary specifying user-defined types for columns.
+    - threshold (float, optional): The minimum proportion of valid numeric values required to convert a column.
+
+    Returns:
+    - dict: Sheet name to (pd.DataFrame with converted data types, schema dict) tuples.
+    """
+    return read_excel_sheets(file, sheet_names, chunksize=settings.UPLOAD_CHUNK_ROWS, column_types=column_types,
+                             threshold=threshold, **inference_options())
@@ -0,0 +1,38 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError
+from django.utils import timezone
+
+from .models import UploadJob
+
+logger = logging.getLogger(__name__)
+
+
+def recover_jobs():
+    """
+    Requeues running jobs whose lease expired and starts a worker for the queue.
+
+    Called when the server starts, as a job left running by a process that died would stay
+    running and count against UPLOAD_JOB_QUEUE_LIMIT. Jobs of live processes keep renewing their
+    lease, so other server processes starting alongside them leave them alone. Does nothing when
+    UPLOAD_JOB_RECOVER_ON_STARTUP is off or the jobs table does not exist yet. The upload stack
+    is only imported when there are jobs to run.
+    """
+    if not settings.UPLOAD_JOB_RECOVER_ON_STARTUP:
+        return
+    expired = timezone.now() - timedelta(seconds=settings.UPLOAD_JOB_LEASE_SECONDS)
+    try:
+        requeued = UploadJob.objects.filter(status=UploadJob.STATUS_RUNNING, updated_at__lt=expired).update(
+            status=UploadJob.STATUS_QUEUED, stage='', rows_processed=0, worker='', updated_at=timezone.now(),
+        )
+        pending = UploadJob.objects.filter(status=UploadJob.STATUS_QUEUED).exists()
+    except DatabaseError:
+        logger.warning('upload jobs not recovered; the database is not migrated')
+        return
+    if requeued:
+        logger.info('requeued upload jobs with expired leases', extra={'jobs': requeued})
+    if pending:
+        from .jobs import start_worker
+        start_worker()
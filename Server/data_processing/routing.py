@@ -0,0 +1,20 @@
+# Path served by the streaming upload application in front of Django
+STREAM_UPLOAD_PATH = '/data_processing/upload/stream/'
+
+
+def with_streaming_uploads(django_application):
+    """
+    Wraps the Django ASGI application so streamed uploads reach `async_upload.streaming_upload` directly.
+
+    Django's ASGI handler reads the whole body before a view runs; bypassing it for this one
+    path lets the body be spooled while it is still arriving. The upload stack is imported on
+    the first streamed upload (or by the warm-up in `DataProcessingConfig.ready`), so the
+    server starts without loading pandas.
+    """
+    async def application(scope, receive, send):
+        if scope['type'] == 'http' and scope['path'] == STREAM_UPLOAD_PATH:
+            from .async_upload import streaming_upload
+            await streaming_upload(scope, receive, send)
+            return
+        await django_application(scope, receive, send)
+    return application
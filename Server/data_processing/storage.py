@@ -0,0 +1,287 @@
+import contextlib
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows; appends are then only serialized within the process
+    fcntl = None
+
+from django.conf import settings
+
+from .models import UploadedData
+from .pipeline import column_statistics, read_upload
+from .utils.column_statistics import STATE_FILE_NAME, FrameStatistics
+from .utils.dataset_store import DatasetNotFound, append_dataset, open_dataset, revert_append, save_dataset
+from .utils.instrumentation import stage
+from .utils.out_of_core import read_csv_out_of_core
+from .utils.result_cache import directory_size
+
+# Gzipped copy of the original upload inside a dataset's directory
+RAW_FILE_NAME = 'source.gz'
+
+# Bytes read at a time when copying or hashing an upload given as a path
+READ_BLOCK_BYTES = 1024 * 1024
+
+# Lock file inside a dataset's directory, held while the dataset is appended to
+LOCK_FILE_NAME = '.lock'
+
+# Serializes appends within the process where file locks are not available
+_append_lock = threading.Lock()
+
+
+def iter_file_chunks(file):
+    """
+    Yields the bytes of an upload from the start, whether it is an uploaded file or a path.
+    """
+    if isinstance(file, (str, os.PathLike)):
+        with open(file, 'rb') as source:
+            yield from iter(lambda: source.read(READ_BLOCK_BYTES), b'')
+        return
+    file.seek(0)
+    yield from file.chunks()
+
+
+def save_raw_upload(file, path, content_hash=None):
+    """
+    Writes a gzipped copy of the original upload and hashes it in the same pass.
+
+    Args:
+    - file (UploadedFile or str): The upload or a path to it.
+    - path (str): Destination of the copy, or None to only hash the file.
+    - content_hash (str, optional): The digest, if already computed; the file is then not hashed
+      again, and not read at all without `path`.
+
+    Returns:
+    - str: Hex SHA-256 digest of the original bytes.
+    """
+    if content_hash is not None and not path:
+        return content_hash
+    digest = hashlib.sha256() if content_hash is None else None
+    raw_file = gzip.open(path, 'wb', compresslevel=1) if path else None
+    try:
+        for chunk in iter_file_chunks(file):
+            if digest:
+                digest.update(chunk)
+            if raw_file:
+                raw_file.write(chunk)
+    finally:
+        if raw_file:
+            raw_file.close()
+    return digest.hexdigest() if digest else content_hash
+
+
+def dataset_path(dataset_id):
+    return os.path.join(settings.DATASET_STORAGE_DIR, str(dataset_id))
+
+
+@contextlib.contextmanager
+def dataset_lock(dataset_id):
+    """
+    Holds an exclusive lock on a stored dataset, so appends from any worker process cannot interleave.
+    """
+    if fcntl is None:
+        with _append_lock:
+            yield
+        return
+    try:
+        lock_file = open(os.path.join(dataset_path(dataset_id), LOCK_FILE_NAME), 'a')
+    except FileNotFoundError:
+        raise DatasetNotFound(str(dataset_id))
+    with lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def store_dataset(df, schema, file_name, owner=None, raw_file=None, statistics=None, content_hash=None):
+    """
+    Persists a processed upload: columnar files on disk plus an `UploadedData` row.
+
+    Args:
+    - df (pd.DataFrame): The processed DataFrame.
+    - schema (dict): Schema entries as returned by `schema_from_frame`.
+    - file_name (str): The original file name.
+    - owner (User, optional): The user who uploaded the file.
+    - raw_file (UploadedFile or str, optional): The original upload, hashed and kept gzipped.
+    - statistics (FrameStatistics, optional): Column statistics of the upload; their summary is stored on
+      the row and their mergeable state next to the columns, so appends can update them.
+    - content_hash (str, optional): SHA-256 of `raw_file`, if the caller already computed it.
+
+    Returns:
+    - UploadedData: The stored dataset's metadata.
+    """
+    with stage('store', rows=len(df)):
+        dataset_id = save_dataset(df, settings.DATASET_STORAGE_DIR, schema=schema,
+                                  compression=settings.DATASET_COMPRESSION, file_name=file_name)
+    return register_dataset(dataset_id, schema, file_name, len(df), owner, raw_file, statistics, content_hash)
+
+
+def register_dataset(dataset_id, schema, file_name, row_count, owner=None, raw_file=None, statistics=None,
+                     content_hash=None):
+    """
+    Creates the `UploadedData` row of a dataset written to DATASET_STORAGE_DIR, keeping the raw
+    upload and the statistics next to its columns; the files are removed if this fails.
+
+    Returns:
+    - UploadedData: The stored dataset's metadata.
+    """
+    path = dataset_path(dataset_id)
+    try:
+        if raw_file is not None:
+            keep_raw = settings.DATASET_KEEP_RAW_UPLOADS
+            with stage('raw'):
+                content_hash = save_raw_upload(raw_file, os.path.join(path, RAW_FILE_NAME) if keep_raw else None,
+                                               content_hash)
+        summary = {}
+        if statistics is not None:
+            statistics.save(path)
+            summary = statistics.result()
+        return UploadedData.objects.create(
+            id=dataset_id, owner=owner, file_name=file_name, content_hash=content_hash or '', schema=schema,
+            statistics=summary, row_count=row_count, size_bytes=directory_size(path),
+        )
+    except Exception:
+        shutil.rmtree(path, ignore_errors=True)
+        raise
+
+
+def find_stored_dataset(owner, content_hash, schema, row_count):
+    """
+    Looks up a dataset the owner already stored from the same file with the same result.
+
+    Datasets appended to since keep the hash of their first file, so the row count and
+    schema have to match as well.
+
+    Args:
+    - owner (User or None): The uploader.
+    - content_hash (str): SHA-256 of the upload.
+    - schema (dict): Schema entries of the processed upload.
+    - row_count (int): Number of processed rows.
+
+    Returns:
+    - UploadedData or None: The stored dataset, or None if there is none.
+    """
+    schema = json.loads(json.dumps(schema))
+    candidates = UploadedData.objects.filter(owner=owner, content_hash=content_hash, row_count=row_count)
+    return next((uploaded for uploaded in candidates if uploaded.schema == schema), None)
+
+
+def store_upload_out_of_core(file, file_name, owner=None, column_types=None, threshold=0.5, schema=None,
+                             progress=None):
+    """
+    Processes and persists a CSV upload too large to hold in memory, see `read_csv_out_of_core`.
+
+    The rows are parsed, converted and written a chunk at a time, holding about
+    UPLOAD_MEMORY_BUDGET_BYTES of them at once; the raw chunks are spilled to a scratch store in
+    UPLOAD_JOB_SPOOL_DIR until the column types are known. The memory optimizer does not run,
+    as it needs whole columns.
+
+    Args:
+    - file (UploadedFile or str): The uploaded CSV or a path to it.
+    - file_name (str): The original file name.
+    - owner (User, optional): The user who uploaded the file.
+    - column_types (dict, optional): A dictionary specifying user-defined types for columns.
+    - threshold (float, optional): The minimum proportion of valid numeric values required to convert a column.
+    - schema (dict, optional): A previously inferred schema used to parse the file without inference.
+    - progress (callable, optional): Called with the number of rows stored so far.
+
+    Returns:
+    - UploadedData: The stored dataset's metadata.
+    """
+    statistics = column_statistics()
+    dataset = read_csv_out_of_core(file, settings.DATASET_STORAGE_DIR, settings.UPLOAD_JOB_SPOOL_DIR,
+                                   settings.UPLOAD_MEMORY_BUDGET_BYTES, column_types=column_types,
+                                   threshold=threshold, schema=schema, compression=settings.DATASET_COMPRESSION,
+                                   statistics=statistics, progress=progress, file_name=file_name)
+    if statistics is not None and statistics.stale:
+        # A column widened to another kind part way through; summarize the stored rows again
+        statistics = dataset_statistics(dataset)
+    return register_dataset(dataset.dataset_id, dataset.schema, file_name, dataset.row_count, owner, file,
+                            statistics)
+
+
+def append_upload(uploaded, file, file_name, threshold=0.5, engine=None):
+    """
+    Appends a new file to a stored upload, reusing the stored schema instead of inferring it again.
+
+    The file is parsed straight into the stored dtypes and date formats. A column is only
+    widened when a new value does not fit; rows stored earlier are left as written and cast
+    when read, so the cost depends on the size of the new file alone.
+
+    Args:
+    - uploaded (UploadedData): The dataset to append to.
+    - file (file-like or str): The new file or a path to it.
+    - file_name (str): The new file's name, used to pick the reader.
+    - threshold (float, optional): The minimum proportion of valid numeric values required to keep a column numeric.
+    - engine (str, optional): CSV parsing backend; defaults to CSV_PARSER_BACKEND.
+
+    Returns:
+    - tuple: (number of rows appended, list of the columns whose type was widened).
+
+    Raises:
+    - ValueError: If the file's columns do not match the dataset.
+    """
+    appended = column_statistics()
+    df, schema = read_upload(file, file_name, threshold=threshold, engine=engine, schema=uploaded.schema,
+                             statistics=appended)
+    schema = {str(col): spec for col, spec in schema.items()}
+    widened = [col for col, spec in schema.items() if spec != uploaded.schema.get(col)]
+    with dataset_lock(uploaded.id), stage('store', rows=len(df)):
+        previous = open_uploaded_data(uploaded).manifest
+        dataset = append_dataset(df, settings.DATASET_STORAGE_DIR, uploaded.id, schema=schema)
+        try:
+            uploaded.schema = schema
+            uploaded.row_count = dataset.row_count
+            update_fields = ['schema', 'row_count', 'size_bytes', 'updated_at']
+            if appended is not None:
+                # Datasets stored without statistics, or whose columns changed kind, are summarized afresh
+                statistics = FrameStatistics.load(dataset.path)
+                if statistics is not None:
+                    try:
+                        statistics.merge(appended)
+                    except ValueError:
+                        statistics = None
+                if statistics is None:
+                    statistics = dataset_statistics(dataset)
+                statistics.save(dataset.path)
+                uploaded.statistics = statistics.result()
+                update_fields.append('statistics')
+            uploaded.size_bytes = directory_size(dataset.path)
+            uploaded.save(update_fields=update_fields)
+        except Exception:
+            # The row still describes the old data, so the files are put back to match it; the
+            # statistics are dropped and summarized afresh from the restored rows on the next append
+            revert_append(settings.DATASET_STORAGE_DIR, uploaded.id, previous)
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(os.path.join(dataset.path, STATE_FILE_NAME))
+            raise
+    return len(df), widened
+
+
+def dataset_statistics(dataset):
+    """
+    Collects the column statistics of a stored dataset segment by segment, for datasets stored without them.
+    """
+    statistics = FrameStatistics()
+    for start, rows in zip(dataset.segment_starts, dataset.manifest['segments']):
+        statistics.update(dataset.read(offset=int(start), limit=rows))
+    return statistics
+
+
+def open_uploaded_data(uploaded):
+    """
+    Opens the columnar files of a stored upload; only the manifest is read.
+    """
+    return open_dataset(settings.DATASET_STORAGE_DIR, uploaded.id)
+
+
+def delete_dataset(uploaded):
+    shutil.rmtree(dataset_path(uploaded.id), ignore_errors=True)
+    uploaded.delete()
@@ -1,3 +1,1206 @@
-from django.test import TestCase
+import hashlib
+import io
+import asyncio
+import datetime
+import json
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import tarfile
+import tempfile
+import tracemalloc
+import zipfile
+from datetime import timedelta
+from unittest import mock, skipIf
 
-# Create your tests here.
+import numpy as np
+import openpyxl
+import pandas as pd
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+
+from data_processing import async_upload, jobs, pipeline, recovery, routing, storage
+from data_processing.warm_up import warm_up
+from data_processing.authentication import CachedTokenAuthentication, token_cache
+from data_processing.models import UploadedData, UploadJob
+from data_processing.utils import arrow_stream, dataset_store, infer_data_types, out_of_core, query_engine
+from data_processing.utils.infer_data_types import (
+    convert_to_datetime_with_formats, detect_date_format, infer_and_convert_data_types, parse_dates,
+)
+from data_processing.utils.ingestion import (
+    SheetNotFound, available_csv_engines, iter_csv_chunks, read_csv_streaming, read_excel_streaming, unify_schemas,
+)
+from data_processing.utils.column_statistics import STATE_FILE_NAME, FrameStatistics
+from data_processing.utils.instrumentation import metrics
+from data_processing.utils.json_stream import frame_to_records
+from data_processing.utils.memory_optimizer import optimize_memory
+from data_processing.utils.result_cache import ResultCache
+
+
+# Every request logs a structured timing record; keep them out of the test output
+logging.getLogger('data_processing').setLevel(logging.WARNING)
+
+
+def make_workbook(**sheets):
+    buffer = io.BytesIO()
+    with pd.ExcelWriter(buffer) as writer:
+        for name, df in sheets.items():
+            df.to_excel(writer, sheet_name=name, index=False)
+    return buffer.getvalue()
+
+
+class TemporaryStorageMixin:
+    """
+    Points every directory uploads write to at a temporary directory removed after each test.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.storage_dir = tempfile.mkdtemp()
+        settings_override = override_settings(
+            DATASET_STORAGE_DIR=os.path.join(self.storage_dir, 'datasets'),
+            UPLOAD_JOB_SPOOL_DIR=os.path.join(self.storage_dir, 'uploads'),
+            UPLOAD_CACHE_DIR=os.path.join(self.storage_dir, 'upload_cache'),
+            PROFILE_DIR=os.path.join(self.storage_dir, 'profiles'),
+        )
+        settings_override.enable()
+        # A cleanup, so it is undone after the overrides subclasses add on top of it
+        self.addCleanup(settings_override.disable)
+        # The cache is created on first use from the settings, so each test gets its own
+        pipeline._result_cache = None
+
+    def tearDown(self):
+        pipeline._result_cache = None
+        shutil.rmtree(self.storage_dir, ignore_errors=True)
+        super().tearDown()
+
+
+class InferDataTypesTests(SimpleTestCase):
+    def test_dtype_decisions(self):
+        df = pd.DataFrame({
+            'small_int': ['1', '2', '3', '4', '5'],
+            'large_int': [1, 2, 3, 4, 70000],
+            'float': ['1.5', '2.25', 'NaN', '300', '4'],
+            'date': ['2024-10-30', '2024-11-15', 'invalid', '2024-12-01', '2024-12-02'],
+            'grade': ['A', 'B', 'A', 'A', 'B'],
+            'name': ['Alice', 'Bob', 'Charlie', 'David', 'Erin'],
+        })
+        result = infer_and_convert_data_types(df)
+        self.assertEqual(result.dtypes.astype(str).to_dict(), {
+            'small_int': 'int8',
+            'large_int': 'int32',
+            'float': 'float32',
+            'date': 'datetime64[ns]',
+            'grade': 'category',
+            'name': 'object',
+        })
+
+    def test_non_integral_and_infinite_values_stay_float(self):
+        df = pd.DataFrame({'a': [1.0, 2.0, np.inf], 'b': [1.0, 2.5, 3.0]})
+        result = infer_and_convert_data_types(df)
+        self.assertEqual(str(result['a'].dtype), 'float64')
+        self.assertEqual(str(result['b'].dtype), 'float32')
+
+    def test_integers_beyond_int64(self):
+        df = pd.DataFrame({
+            'unsigned': ['18446744073709551615', '1'],
+            'signed': ['9223372036854775807', '-1'],
+            'too_large': ['18446744073709551616', '0'],
+            'missing': ['18446744073709551615', None],
+        })
+        result = infer_and_convert_data_types(df)
+        self.assertEqual(result.dtypes.astype(str).to_dict(), {
+            'unsigned': 'uint64', 'signed': 'int64', 'too_large': 'float64', 'missing': 'float64',
+        })
+        self.assertEqual(result['unsigned'].tolist(), [18446744073709551615, 1])
+
+    def test_threshold_controls_numeric_conversion(self):
+        df = pd.DataFrame({'mixed': ['1', '2', 'x', 'x', 'x', 'x', 'x']})
+        self.assertEqual(str(infer_and_convert_data_types(df.copy())['mixed'].dtype), 'category')
+        result = infer_and_convert_data_types(df.copy(), threshold=0.25)
+        # Values that did not parse stay missing instead of becoming 0
+        self.assertEqual(str(result['mixed'].dtype), 'Int8')
+        self.assertEqual(result['mixed'].tolist(), [1, 2, pd.NA, pd.NA, pd.NA, pd.NA, pd.NA])
+
+    def test_sample_mode_matches_full_profiler(self):
+        rng = np.random.default_rng(0)
+        df = pd.DataFrame({
+            'count': rng.integers(0, 100, size=5000).astype(str),
+            'grade': rng.choice(['A', 'B', 'C'], size=5000),
+            'date': ['2024-10-30'] * 5000,
+        })
+        full = infer_and_convert_data_types(df.copy())
+        sampled = infer_and_convert_data_types(df.copy(), head_size=100, sample_size=200)
+        self.assertEqual(sampled.dtypes.to_dict(), full.dtypes.to_dict())
+
+    def test_sample_mode_widens_when_verification_fails(self):
+        values = np.ones(5000, dtype='int64')
+        values[-1] = 70000
+        df = pd.DataFrame({'count': values})
+        result = infer_and_convert_data_types(df, head_size=100, sample_size=100)
+        self.assertEqual(str(result['count'].dtype), 'int32')
+        self.assertEqual(result['count'].iloc[-1], 70000)
+
+    def test_chunk_size_is_deprecated(self):
+        df = pd.DataFrame({'count': ['1', '2', '300']})
+        with self.assertWarns(DeprecationWarning):
+            result = infer_and_convert_data_types(df, chunk_size=1)
+        self.assertEqual(str(result['count'].dtype), 'int16')
+
+    def test_parallel_inference_matches_serial(self):
+        rng = np.random.default_rng(0)
+        df = pd.DataFrame({
+            'count': rng.integers(0, 100, size=2000).astype(str),
+            'amount': rng.normal(size=2000),
+            'grade': rng.choice(['A', 'B', 'C'], size=2000),
+            'name': [f'Person_{i}' for i in range(2000)],
+            'date': ['30/10/2024'] * 2000,
+        })
+        serial = infer_and_convert_data_types(df.copy())
+        parallel = infer_and_convert_data_types(df.copy(), max_workers=2, parallel_min_rows=0)
+        self.assertEqual(list(parallel.columns), list(df.columns))
+        for col in df.columns:
+            pd.testing.assert_series_equal(parallel[col], serial[col])
+
+
+class DateFormatDetectionTests(SimpleTestCase):
+    def test_picks_best_covering_format(self):
+        # '%d/%m/%Y' is listed first but only parses one of these values
+        series = pd.Series(['10/30/2024', '11/15/2024', '01/02/2024', '12/31/2023'])
+        self.assertEqual(detect_date_format(series), '%m/%d/%Y')
+        self.assertTrue(convert_to_datetime_with_formats(series).notna().all())
+
+    def test_detects_unlisted_formats(self):
+        series = pd.Series(['2024-10-30 12:00:00', '2024-11-15 08:30:00', None])
+        self.assertEqual(detect_date_format(series), '%Y-%m-%d %H:%M:%S')
+
+    def test_non_dates_and_numbers_are_not_converted(self):
+        self.assertTrue(convert_to_datetime_with_formats(pd.Series(['Alice', 'Bob'])).isna().all())
+        self.assertTrue(convert_to_datetime_with_formats(pd.Series([1.0, np.nan])).isna().all())
+
+    def test_cached_format_skips_detection(self):
+        series = pd.Series(['30-Oct-2024', '15-Nov-2024'])
+        cache_key = ('schema', 'date')
+        convert_to_datetime_with_formats(series, cache_key=cache_key)
+        self.assertEqual(infer_data_types.get_cached_date_format(cache_key), '%d-%b-%Y')
+        with mock.patch.object(infer_data_types, 'detect_date_format') as detect:
+            converted = convert_to_datetime_with_formats(series, cache_key=cache_key)
+        detect.assert_not_called()
+        self.assertTrue(converted.notna().all())
+
+    def test_cached_format_is_redetected_when_it_does_not_fit(self):
+        cache_key = ('schema', 'shared_header')
+        convert_to_datetime_with_formats(pd.Series(['30/10/2024', '15/11/2024']), cache_key=cache_key)
+        self.assertEqual(infer_data_types.get_cached_date_format(cache_key), '%d/%m/%Y')
+        # Another feed with the same header writes month first; 01/02 would parse either way
+        converted = convert_to_datetime_with_formats(pd.Series(['10/30/2024', '11/15/2024', '01/02/2024']),
+                                                     cache_key=cache_key)
+        self.assertEqual(converted.tolist(), [pd.Timestamp('2024-10-30'), pd.Timestamp('2024-11-15'),
+                                              pd.Timestamp('2024-01-02')])
+        self.assertEqual(infer_data_types.get_cached_date_format(cache_key), '%m/%d/%Y')
+
+
+class StreamingIngestionTests(SimpleTestCase):
+    def read(self, text, chunksize=2):
+        return read_csv_streaming(io.StringIO(text), chunksize=chunksize)
+
+    def test_unify_schemas(self):
+        schemas = [
+            {'a': {'type': 'int8'}, 'b': {'type': 'Int8'}, 'c': {'type': 'datetime', 'format': '%d/%m/%Y'},
+             'd': {'type': 'category'}},
+            {'a': {'type': 'uint8'}, 'b': {'type': 'int32'}, 'c': {'type': 'datetime', 'format': '%Y-%m-%d'},
+             'd': {'type': 'float32'}},
+        ]
+        self.assertEqual(unify_schemas(schemas), {'a': {'type': 'int16'}, 'b': {'type': 'Int32'},
+                                                  'c': {'type': 'datetime', 'format': None},
+                                                  'd': {'type': 'object'}})
+
+    def test_matches_whole_file_inference(self):
+        text = 'count,grade,date\n' + ''.join(f'{i % 50},{"AB"[i % 2]},2024-10-{i % 28 + 1:02d}\n' for i in range(100))
+        df, schema = self.read(text, chunksize=30)
+        expected = infer_and_convert_data_types(pd.read_csv(io.StringIO(text)))
+        pd.testing.assert_frame_equal(df, expected)
+        self.assertEqual(schema['date'], {'type': 'datetime', 'format': '%Y-%m-%d'})
+
+    def test_later_chunks_widen_the_schema(self):
+        df, schema = self.read('small,fraction\n1,1\n2,2\n300,2.5\n70000,3\n')
+        self.assertEqual(str(df['small'].dtype), 'int32')
+        self.assertEqual(df['small'].tolist(), [1, 2, 300, 70000])
+        self.assertEqual(str(df['fraction'].dtype), 'float32')
+        self.assertEqual(df['fraction'].tolist(), [1.0, 2.0, 2.5, 3.0])
+
+    def test_columns_that_stop_parsing_as_numbers_become_object(self):
+        df, schema = self.read('text\n1\n2\nx\ny\nz\nw\n', chunksize=3)
+        self.assertEqual(schema['text'], {'type': 'object'})
+        self.assertEqual(df['text'].tolist()[3:], ['y', 'z', 'w'])
+
+    def test_category_chunks_with_blank_or_numeric_values(self):
+        text = 'grade,count\n' + 'A,1\nB,2\n' * 5 + ',3\n' * 10 + '1,4\n2,5\n' * 5
+        df, schema = self.read(text, chunksize=10)
+        self.assertEqual(schema['grade'], {'type': 'category'})
+        self.assertEqual(df['grade'].tolist(), ['A', 'B'] * 5 + [np.nan] * 10 + [1, 2] * 5)
+
+    def test_header_only_file(self):
+        df, schema = self.read('a,b\n')
+        self.assertEqual(list(df.columns), ['a', 'b'])
+        self.assertEqual(len(df), 0)
+
+    def test_engines_agree(self):
+        text = 'count,amount,grade,date,name\n' + ''.join(
+            f'{"" if i % 7 == 0 else i % 50},{i / 4},{"AB"[i % 2]},2024-10-{i % 28 + 1:02d},n{i}\n' for i in range(100)
+        )
+        expected, expected_schema = self.read(text, chunksize=30)
+        for engine in available_csv_engines():
+            with self.subTest(engine=engine):
+                df, schema = read_csv_streaming(io.StringIO(text), chunksize=30, engine=engine)
+                # The pyarrow engine keeps Arrow strings as the categories of category columns
+                self.assertEqual(df.dtypes.astype(str).to_dict(), expected.dtypes.astype(str).to_dict())
+                pd.testing.assert_frame_equal(df, expected, check_dtype=False, check_categorical=False)
+                self.assertEqual(schema, expected_schema)
+
+    @skipIf('pyarrow' not in available_csv_engines(), 'pyarrow is not installed')
+    def test_pyarrow_engine_streams_large_files(self):
+        text = 'count,grade\n' + ''.join(f'{i},{"AB"[i % 2]}\n' for i in range(100))
+        self.assertEqual(len(list(iter_csv_chunks(io.StringIO(text), 'pyarrow', chunksize=30))), 1)
+        with mock.patch('data_processing.utils.ingestion.PYARROW_MAX_BYTES', 100):
+            chunks = list(iter_csv_chunks(io.StringIO(text), 'pyarrow', chunksize=30))
+            df, _ = read_csv_streaming(io.StringIO(text), chunksize=30, engine='pyarrow')
+        self.assertEqual([len(chunk) for chunk in chunks], [30, 30, 30, 10])
+        self.assertEqual(df['count'].tolist(), list(range(100)))
+
+    def test_known_schema_skips_inference(self):
+        _, schema = self.read('count,grade\n1,A\n2,A\n3,B\n4,A\n5,A\n6,A\n', chunksize=10)
+        with mock.patch('data_processing.utils.ingestion.infer_and_convert_data_types') as infer:
+            df, _ = read_csv_streaming(io.StringIO('count,grade\n5,B\n6,B\n'), schema=schema)
+        infer.assert_not_called()
+        self.assertEqual(df.dtypes.astype(str).to_dict(), {'count': 'int8', 'grade': 'category'})
+
+    def test_known_schema_widens_when_hints_fail(self):
+        _, schema = self.read('amount\n1.5\n2.5\n')
+        df, widened = read_csv_streaming(io.StringIO('amount\n1.5\nx\ny\nz\n'), schema=schema)
+        self.assertEqual(widened['amount'], {'type': 'object'})
+        self.assertEqual(df['amount'].tolist(), ['1.5', 'x', 'y', 'z'])
+
+    def test_excel_batches_match_read_excel(self):
+        df = pd.DataFrame({
+            'count': [i % 50 if i % 9 else None for i in range(100)],
+            'grade': ['AB'[i % 2] for i in range(100)],
+            'date': pd.Timestamp('2024-01-01') + pd.to_timedelta(np.arange(100), unit='D'),
+            'text_date': [f'2024-10-{i % 28 + 1:02d}' for i in range(100)],
+        })
+        workbook = make_workbook(First=df.head(3), Second=df)
+        expected = infer_and_convert_data_types(pd.read_excel(io.BytesIO(workbook), sheet_name='Second'))
+        processed, schema = read_excel_streaming(io.BytesIO(workbook), sheet_name='Second', chunksize=30)
+        pd.testing.assert_frame_equal(processed, expected)
+        self.assertEqual(schema['text_date'], {'type': 'datetime', 'format': '%Y-%m-%d'})
+        self.assertEqual(len(read_excel_streaming(io.BytesIO(workbook), sheet_name=0)[0]), 3)
+        with self.assertRaises(SheetNotFound):
+            read_excel_streaming(io.BytesIO(workbook), sheet_name='Third')
+
+    def test_arrow_date_parsing_matches_pandas(self):
+        values = pd.Series(['01/02/2020', '1/2/2020', '31/02/2020', None, 'junk'])
+        expected = pd.to_datetime(values, format='%d/%m/%Y', errors='coerce')
+        pd.testing.assert_series_equal(parse_dates(values, '%d/%m/%Y'), expected)
+
+
+class UploadViewTests(TemporaryStorageMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        # Inference is checked on its own here; the memory optimizer has its own tests
+        settings_override = override_settings(UPLOAD_OPTIMIZE_MEMORY=False)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def upload(self, text, name='data.csv', data=None, **extra):
+        file = SimpleUploadedFile(name, text if isinstance(text, bytes) else text.encode('utf-8'))
+        return self.client.post('/data_processing/upload/', {'file': file, **(data or {})}, **extra)
+
+    def test_upload_csv(self):
+        response = self.upload('Name,Score\nAlice,90\nBob,75\nCarol,\n')
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(body['data_types'], {'Name': 'object', 'Score': 'Int8'})
+        self.assertEqual(body['data'][0], {'Name': 'Alice', 'Score': 90})
+        self.assertEqual(body['data'][2], {'Name': 'Carol', 'Score': None})
+
+    def test_rejects_unsupported_files(self):
+        self.assertEqual(self.upload('x', name='data.txt').status_code, 400)
+
+    def test_streamed_json_matches_shape(self):
+        text = 'Name,Score,Date\nAlice,1.5,2024-10-30\nBob,,2024-11-15\nAlice,2.5,invalid\n'
+        response = self.upload(text, QUERY_STRING='stream=1')
+        self.assertTrue(response.streaming)
+        body = json.loads(b''.join(response.streaming_content))
+        self.assertEqual(body['data_types']['Score'], 'float32')
+        self.assertEqual(body['data'][1], {'Name': 'Bob', 'Score': None, 'Date': '2024-11-15T00:00:00'})
+        self.assertEqual(body['data'][2]['Date'], None)
+
+    def test_ndjson_response(self):
+        response = self.upload('Grade\nA\nA\nB\nA\nA\n', HTTP_ACCEPT='application/x-ndjson')
+        lines = b''.join(response.streaming_content).decode('utf-8').splitlines()
+        header = json.loads(lines[0])
+        self.assertEqual(header['data_types'], {'Grade': 'category'})
+        self.assertEqual(header['statistics']['Grade']['top'][0], {'value': 'A', 'count': 4})
+        self.assertEqual([json.loads(line) for line in lines[1:3]], [{'Grade': 'A'}, {'Grade': 'A'}])
+        self.assertEqual(len(lines), 6)
+
+    @override_settings(UPLOAD_CACHE_ENABLED=False, DATASET_PERSIST_UPLOADS=False)
+    def test_streamed_responses_encode_excel_times(self):
+        # pandas writes times as text, so build the workbook with real time cells
+        sheet_book = openpyxl.Workbook()
+        sheet_book.active.append(['Start', 'Room'])
+        for room, start in enumerate([datetime.time(9, 30), None, datetime.time(17, 0)] * 3):
+            sheet_book.active.append([start, room])
+        buffer = io.BytesIO()
+        sheet_book.save(buffer)
+        workbook = buffer.getvalue()
+        body = json.loads(b''.join(self.upload(workbook, name='data.xlsx', QUERY_STRING='stream=1').streaming_content))
+        self.assertEqual([row['Start'] for row in body['data'][:3]], ['09:30:00', None, '17:00:00'])
+        response = self.upload(workbook, name='data.xlsx', QUERY_STRING='format=ndjson')
+        lines = b''.join(response.streaming_content).decode('utf-8').splitlines()
+        self.assertEqual(json.loads(lines[1]), {'Start': '09:30:00', 'Room': 0})
+
+    @skipIf(arrow_stream.pa is None, 'pyarrow is not installed')
+    def test_arrow_response(self):
+        accept = {'HTTP_ACCEPT': arrow_stream.ARROW_STREAM_CONTENT_TYPE}
+        response = self.upload('Score,Grade\n1,A\n2,A\n3,B\n4,A\n5,A\n6,A\n', **accept)
+        self.assertEqual(response['Content-Type'], arrow_stream.ARROW_STREAM_CONTENT_TYPE)
+        table = arrow_stream.pa.ipc.open_stream(b''.join(response.streaming_content)).read_all()
+        self.assertEqual(str(table.schema.field('Score').type), 'int8')
+        self.assertTrue(arrow_stream.pa.types.is_dictionary(table.schema.field('Grade').type))
+        self.assertEqual(table.column('Grade').to_pylist(), ['A', 'A', 'B', 'A', 'A', 'A'])
+        self.assertEqual(json.loads(table.schema.metadata[b'data_types']), {'Score': 'int8', 'Grade': 'category'})
+
+        url = f"/data_processing/datasets/{response['X-Dataset-Id']}/rows/"
+        response = self.client.get(url, {'offset': 4}, **accept)
+        table = arrow_stream.pa.ipc.open_stream(b''.join(response.streaming_content)).read_all()
+        self.assertEqual((table.num_rows, json.loads(table.schema.metadata[b'row_count'])), (2, 6))
+
+        with mock.patch.object(arrow_stream, 'pa', None):
+            self.assertEqual(self.client.get(url, **accept).status_code, 406)
+            both = {'HTTP_ACCEPT': f'{arrow_stream.ARROW_STREAM_CONTENT_TYPE}, application/json'}
+            self.assertEqual(self.client.get(url, **both).json()['row_count'], 6)
+
+    def test_batch_upload_reports_each_file(self):
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, 'w') as zip_file:
+            zip_file.writestr('2024/jan.csv', 'Month,Sales\nJan,5\n')
+            zip_file.writestr('2024/feb.csv', 'Month,Sales\nFeb,not a number\nFeb,nope\n')
+            zip_file.writestr('2024/notes.txt', 'ignored')
+        files = [SimpleUploadedFile('months.zip', archive.getvalue()),
+                 SimpleUploadedFile('mar.csv', b'Month,Sales\nMar,300\n'),
+                 SimpleUploadedFile('broken.xlsx', b'not a workbook')]
+        body = self.client.post('/data_processing/upload/batch/', {'files': files}).json()
+        results = {entry['file_name']: entry for entry in body['files']}
+        self.assertEqual(list(results), ['2024/jan.csv', '2024/feb.csv', '2024/notes.txt', 'mar.csv', 'broken.xlsx'])
+        self.assertEqual(results['2024/jan.csv']['data_types'], {'Month': 'object', 'Sales': 'int8'})
+        self.assertEqual(results['mar.csv']['data_types'], {'Month': 'object', 'Sales': 'int16'})
+        self.assertEqual(results['2024/notes.txt']['error'], 'Unsupported file type')
+        self.assertIn('error', results['broken.xlsx'])
+        self.assertEqual(UploadedData.objects.count(), 3)
+
+    def test_batch_upload_merges_compatible_files(self):
+        archive = io.BytesIO()
+        with tarfile.open(fileobj=archive, mode='w:gz') as tar_file:
+            for name, text in [('jan.csv', 'Month,Sales\nJan,5\n'), ('feb.csv', 'Sales,Month\n2.5,Feb\n'),
+                               ('other.csv', 'Name\nAlice\n')]:
+                info = tarfile.TarInfo(name)
+                info.size = len(text)
+                tar_file.addfile(info, io.BytesIO(text.encode('utf-8')))
+        file = SimpleUploadedFile('months.tar.gz', archive.getvalue())
+        body = self.client.post('/data_processing/upload/batch/?merge=1', {'file': file}).json()
+        merged, other = body['datasets']
+        self.assertEqual((merged['file_names'], merged['row_count']), (['jan.csv', 'feb.csv'], 2))
+        self.assertEqual(merged['data_types'], {'Month': 'object', 'Sales': 'float32'})
+        self.assertEqual(other['file_names'], ['other.csv'])
+        rows = self.client.get(f"/data_processing/datasets/{merged['dataset_id']}/rows/").json()['data']
+        self.assertEqual(rows, [{'Month': 'Jan', 'Sales': 5.0}, {'Month': 'Feb', 'Sales': 2.5}])
+
+    def test_batch_upload_merges_mismatched_categories(self):
+        files = [SimpleUploadedFile('a.csv', ('g,n\n' + 'A,1\nB,2\n' * 5).encode('utf-8')),
+                 SimpleUploadedFile('b.csv', ('g,n\n' + ',3\n' * 10).encode('utf-8'))]
+        body = self.client.post('/data_processing/upload/batch/?merge=1', {'files': files}).json()
+        merged, = body['datasets']
+        self.assertEqual((merged['row_count'], merged['data_types']['g']), (20, 'category'))
+
+        # Statistics of a column whose kind differs between members are summarized from the joined rows
+        files = [SimpleUploadedFile('e.csv', b'v\n1\n2\n'), SimpleUploadedFile('f.csv', b'v\nx\n')]
+        merged, = self.client.post('/data_processing/upload/batch/?merge=1', {'files': files}).json()['datasets']
+        uploaded = UploadedData.objects.get(pk=merged['dataset_id'])
+        self.assertEqual((uploaded.statistics['v']['count'], uploaded.statistics['v']['nulls']), (3, 0))
+        self.assertEqual(uploaded.content_hash, '')
+
+        files = [SimpleUploadedFile(name, b'g\nA\n') for name in ('c.csv', 'd.csv')]
+        with mock.patch('data_processing.batch_upload.merge_members', side_effect=TypeError('cannot merge')):
+            body = self.client.post('/data_processing/upload/batch/?merge=1', {'files': files}).json()
+        self.assertEqual(body['datasets'], [])
+        self.assertEqual([entry['error'] for entry in body['files']], ['cannot merge', 'cannot merge'])
+
+    def test_out_of_core_upload(self):
+        text = 'Name,Score\n' + ''.join(f'Person_{i},{i}\n' for i in range(10))
+        with override_settings(UPLOAD_PREVIEW_ROWS=2):
+            body = self.upload(text, QUERY_STRING='out_of_core=1').json()
+            self.assertEqual((body['row_count'], body['data_types']), (10, {'Name': 'object', 'Score': 'int8'}))
+            self.assertEqual(body['data'], [{'Name': 'Person_0', 'Score': 0}, {'Name': 'Person_1', 'Score': 1}])
+            self.assertEqual(body['statistics']['Score']['max'], 9)
+            self.assertEqual(UploadedData.objects.get(pk=body['dataset_id']).row_count, 10)
+            with override_settings(UPLOAD_OUT_OF_CORE_MIN_BYTES=len(text)):
+                self.assertIn('dataset_id', self.upload(text).json())
+            self.assertEqual(self.upload(b'x', name='data.xlsx', QUERY_STRING='out_of_core=1').status_code, 400)
+
+    def test_paginated_upload_and_row_slices(self):
+        with override_settings(UPLOAD_PREVIEW_ROWS=2):
+            text = 'Name,Score\n' + ''.join(f'Person_{i},{i}\n' for i in range(10))
+            body = self.upload(text, QUERY_STRING='paginate=1').json()
+            self.assertEqual(body['row_count'], 10)
+            self.assertEqual(len(body['data']), 2)
+
+            url = f"/data_processing/datasets/{body['dataset_id']}/rows/"
+            page = self.client.get(url, {'offset': 8, 'limit': 5, 'columns': 'Score'}).json()
+            self.assertEqual(page['data'], [{'Score': 8}, {'Score': 9}])
+            self.assertEqual(page['data_types'], {'Score': 'int8'})
+
+            schema = self.client.get(f"/data_processing/datasets/{body['dataset_id']}/").json()
+            self.assertEqual(schema['data_types'], body['data_types'])
+            self.assertEqual(self.client.get(url, {'columns': 'Missing'}).status_code, 400)
+
+    def test_query_returns_one_page_of_results(self):
+        text = 'Name,Score\n' + ''.join(f'Person_{i},{i}\n' for i in range(10))
+        dataset_id = self.upload(text, QUERY_STRING='paginate=1').json()['dataset_id']
+        url = f'/data_processing/datasets/{dataset_id}/query/'
+        query = {'filters': [{'column': 'Score', 'op': '>', 'value': 3}],
+                 'sort': [{'column': 'Score', 'descending': True}], 'columns': ['Name'], 'limit': 2}
+        body = self.client.post(url, query, content_type='application/json').json()
+        self.assertEqual(body['row_count'], 6)
+        self.assertEqual(body['data'], [{'Name': 'Person_9'}, {'Name': 'Person_8'}])
+        for spec in ({'column': 'Missing', 'op': 'is_null'}, {'column': 'Score', 'op': 'contains', 'value': '1'}):
+            response = self.client.post(url, {'filters': [spec]}, content_type='application/json')
+            self.assertEqual(response.status_code, 400)
+
+    def test_identical_uploads_hit_the_cache(self):
+        text = 'Name,Score\nAlice,90\nBob,75\n'
+        first = self.upload(text)
+        second = self.upload(text)
+        self.assertEqual((first['X-Upload-Cache'], second['X-Upload-Cache']), ('MISS', 'HIT'))
+        self.assertEqual(first.json()['data'], second.json()['data'])
+        # Different inference parameters produce a different cache key
+        self.assertEqual(self.upload(text, data={'threshold': '0.9'})['X-Upload-Cache'], 'MISS')
+
+        stats = self.client.get('/data_processing/cache/stats/').json()
+        self.assertEqual((stats['hits'], stats['misses'], stats['entries']), (1, 2, 2))
+
+    @override_settings(UPLOAD_OPTIMIZE_MEMORY=True, DATASET_KEEP_RAW_UPLOADS=False)
+    def test_cache_hits_keep_the_memory_report_and_hash_once(self):
+        text = 'Name,Score\nAlice,90\nBob,75\n'
+        first = self.upload(text).json()
+        with mock.patch('data_processing.storage.hashlib') as storage_hashlib:
+            second = self.upload(text)
+        storage_hashlib.sha256.assert_not_called()
+        self.assertEqual(second['X-Upload-Cache'], 'HIT')
+        self.assertEqual(second.json()['memory'], first['memory'])
+        uploaded = UploadedData.objects.get(pk=second.json()['dataset_id'])
+        self.assertEqual(uploaded.content_hash, hashlib.sha256(text.encode('utf-8')).hexdigest())
+
+    def test_identical_uploads_reuse_the_stored_dataset(self):
+        text = 'Name,Score\nAlice,90\nBob,75\n'
+        first = self.upload(text, QUERY_STRING='paginate=1').json()
+        second = self.upload(text, QUERY_STRING='paginate=1')
+        self.assertEqual((second['X-Upload-Cache'], second.json()['dataset_id']), ('HIT', first['dataset_id']))
+        self.assertEqual(UploadedData.objects.count(), 1)
+
+        # Once rows are appended, the stored dataset no longer matches the file
+        url = f"/data_processing/datasets/{first['dataset_id']}/"
+        self.client.post(url + 'append/', {'file': SimpleUploadedFile('more.csv', b'Name,Score\nCarol,60\n')})
+        third = self.upload(text, QUERY_STRING='paginate=1').json()
+        self.assertNotEqual(third['dataset_id'], first['dataset_id'])
+        self.assertEqual(UploadedData.objects.count(), 2)
+
+    def test_invalid_inference_parameters(self):
+        self.assertEqual(self.upload('a\n1\n', data={'threshold': 'high'}).status_code, 400)
+        self.assertEqual(self.upload('a\n1\n', data={'column_types': '[1]'}).status_code, 400)
+        self.assertEqual(self.upload('a\n1\n', QUERY_STRING='parser=python').status_code, 400)
+        self.assertEqual(self.upload('a\n1\n', data={'schema_from': '../x'}).status_code, 400)
+
+    def test_upload_excel_sheets(self):
+        workbook = make_workbook(Scores=pd.DataFrame({'Score': [1, 2, 3]}), Names=pd.DataFrame({'Name': ['a', 'b']}))
+        body = self.upload(workbook, name='data.xlsx', QUERY_STRING='sheet=Names').json()
+        self.assertEqual(body['data'], [{'Name': 'a'}, {'Name': 'b'}])
+
+        body = self.upload(workbook, name='data.xlsx', QUERY_STRING='sheet=*').json()
+        self.assertEqual(list(body['sheets']), ['Scores', 'Names'])
+        self.assertEqual(body['sheets']['Scores']['data_types'], {'Score': 'int8'})
+        self.assertEqual(self.upload(workbook, name='data.xlsx', QUERY_STRING='sheet=Other').status_code, 400)
+
+    def test_upload_with_schema_of_stored_dataset(self):
+        first = self.upload('Score,Grade\n1,A\n2,A\n3,B\n4,A\n5,A\n6,A\n').json()
+        # One row on its own would not be inferred as a category
+        body = self.upload('Score,Grade\n300,C\n', data={'schema_from': first['dataset_id']}).json()
+        self.assertEqual(body['data_types'], {'Score': 'int16', 'Grade': 'category'})
+
+    def test_uploads_are_stored_for_their_owner(self):
+        token = Token.objects.create(user=User.objects.create_user('alice', password='secret'))
+        auth = {'HTTP_AUTHORIZATION': f'Token {token.key}'}
+        text = 'Name,Score\nAlice,90\nBob,75\n'
+        dataset_id = self.upload(text, **auth).json()['dataset_id']
+
+        uploaded = UploadedData.objects.get()
+        self.assertEqual((str(uploaded.id), uploaded.owner.username, uploaded.row_count), (dataset_id, 'alice', 2))
+        self.assertEqual(uploaded.content_hash, hashlib.sha256(text.encode('utf-8')).hexdigest())
+        listed = self.client.get('/data_processing/datasets/', **auth).json()['datasets']
+        self.assertEqual([entry['dataset_id'] for entry in listed], [dataset_id])
+
+        url = f'/data_processing/datasets/{dataset_id}/'
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.assertEqual(self.client.get(url, **auth).json()['data_types'], {'Name': 'object', 'Score': 'int8'})
+        raw = self.client.get(url + 'raw/', **auth)
+        self.assertEqual(b''.join(raw.streaming_content), text.encode('utf-8'))
+
+        # Token clients send no CSRF cookie; the default test client would skip the check
+        self.assertEqual(Client(enforce_csrf_checks=True).delete(url, **auth).status_code, 204)
+        self.assertFalse(UploadedData.objects.exists())
+        self.assertEqual(os.listdir(settings.DATASET_STORAGE_DIR), [])
+
+    def test_append_reuses_the_stored_schema(self):
+        first = self.upload('Score,Grade,Date\n1,A,01/02/2024\n2,A,03/02/2024\n3,B,04/02/2024\n'
+                            '4,A,05/02/2024\n5,A,06/02/2024\n6,A,07/02/2024\n').json()
+        url = f"/data_processing/datasets/{first['dataset_id']}/"
+        file = SimpleUploadedFile('more.csv', b'Score,Grade,Date\n300,C,08/02/2024\n')
+        body = self.client.post(url + 'append/', {'file': file}).json()
+        self.assertEqual((body['row_count'], body['rows_appended'], body['widened']), (7, 1, ['Score']))
+        self.assertEqual(body['data_types'], {'Score': 'int16', 'Grade': 'category', 'Date': 'datetime64[ns]'})
+
+        rows = self.client.get(url + 'rows/', {'offset': 5}).json()['data']
+        self.assertEqual(rows, [{'Score': 6, 'Grade': 'A', 'Date': '2024-02-07T00:00:00'},
+                                {'Score': 300, 'Grade': 'C', 'Date': '2024-02-08T00:00:00'}])
+        self.assertEqual(UploadedData.objects.get().row_count, 7)
+
+        file = SimpleUploadedFile('other.csv', b'Name\nAlice\n')
+        self.assertEqual(self.client.post(url + 'append/', {'file': file}).status_code, 400)
+        self.assertEqual(self.client.get(url).json()['row_count'], 7)
+
+    @skipIf(storage.fcntl is None, 'file locks are not available')
+    def test_failed_append_restores_the_stored_files(self):
+        body = self.upload('Score\n1\n2\n', QUERY_STRING='paginate=1').json()
+        url = f"/data_processing/datasets/{body['dataset_id']}/"
+        path = storage.dataset_path(body['dataset_id'])
+        files = sorted(os.listdir(path))
+
+        def save(*args, **kwargs):
+            # Other workers are locked out of the dataset while it is written
+            with open(os.path.join(path, storage.LOCK_FILE_NAME)) as lock_file:
+                with self.assertRaises(BlockingIOError):
+                    storage.fcntl.flock(lock_file, storage.fcntl.LOCK_EX | storage.fcntl.LOCK_NB)
+            raise RuntimeError('database is locked')
+
+        file = SimpleUploadedFile('more.csv', b'Score\n3\n')
+        with mock.patch.object(UploadedData, 'save', save):
+            self.assertEqual(self.client.post(url + 'append/', {'file': file}).status_code, 500)
+        self.assertEqual(self.client.get(url).json()['row_count'], 2)
+        self.assertEqual(sorted(set(os.listdir(path)) - {storage.LOCK_FILE_NAME, STATE_FILE_NAME}),
+                         [name for name in files if name != STATE_FILE_NAME])
+
+        file = SimpleUploadedFile('more.csv', b'Score\n3\n')
+        self.client.post(url + 'append/', {'file': file})
+        body = self.client.get(url).json()
+        self.assertEqual((body['row_count'], body['statistics']['Score']['count']), (3, 3))
+        self.assertEqual(self.client.get(url + 'rows/').json()['data'], [{'Score': 1}, {'Score': 2}, {'Score': 3}])
+
+    def test_statistics_are_returned_stored_and_merged_on_append(self):
+        body = self.upload('Score,Day\n1,2024-01-02\n3,\n5,2024-01-01\n', QUERY_STRING='paginate=1').json()
+        self.assertEqual(body['statistics']['Score']['mean'], 3.0)
+        self.assertEqual(body['statistics']['Score']['quantiles']['p50'], 3.0)
+        self.assertEqual(body['statistics']['Day']['nulls'], 1)
+        self.assertEqual(body['statistics']['Day']['min'], '2024-01-01T00:00:00')
+
+        url = f"/data_processing/datasets/{body['dataset_id']}/"
+        file = SimpleUploadedFile('more.csv', b'Score,Day\n11,2024-02-01\n')
+        self.client.post(url + 'append/', {'file': file})
+        with mock.patch.object(dataset_store.Dataset, 'read', side_effect=AssertionError('rows read')):
+            statistics = self.client.get(url).json()['statistics']
+        self.assertEqual((statistics['Score']['count'], statistics['Score']['max']), (4, 11.0))
+        self.assertEqual(statistics['Day']['max'], '2024-02-01T00:00:00')
+
+    def test_upload_reports_memory_savings(self):
+        with override_settings(UPLOAD_OPTIMIZE_MEMORY=True):
+            body = self.upload('Name,Score\nAlice,200\nBob,\nAlice,3\nAlice,4\n').json()
+        self.assertEqual(body['data_types'], {'Name': 'category', 'Score': 'UInt8'})
+        self.assertEqual(body['data'][1], {'Name': 'Bob', 'Score': None})
+        self.assertEqual(body['memory']['Score']['dtype_before'], 'Int16')
+        self.assertLess(body['memory']['Score']['bytes_after'], body['memory']['Score']['bytes_before'])
+
+    def test_upload_reports_stage_timings(self):
+        metrics.reset()
+        with self.assertLogs('data_processing.requests', 'INFO') as logs:
+            response = self.upload('Name,Score,Date\nAlice,90,2024-10-30\nBob,75,2024-11-15\n')
+        stages = [metric.split(';')[0] for metric in response['Server-Timing'].split(', ')]
+        self.assertEqual(stages[:3], ['cache', 'parse', 'dates'])
+        self.assertIn('infer', stages)
+        self.assertEqual(stages[-1], 'total')
+
+        trace = logs.records[0].trace
+        self.assertEqual(logs.records[0].view, 'upload')
+        self.assertEqual(trace['columns']['Date']['dtype'], 'datetime64[ns]')
+        self.assertEqual(trace['stages']['parse']['rows'], 2)
+
+        snapshot = self.client.get('/data_processing/metrics/').json()
+        self.assertEqual(snapshot['request_seconds']['upload']['count'], 1)
+        self.assertEqual(snapshot['stage_seconds']['infer']['buckets']['+Inf'], 1)
+        prometheus = self.client.get('/data_processing/metrics/', {'format': 'prometheus'}).content.decode()
+        self.assertIn('data_processing_request_seconds_count{view="upload"} 1', prometheus)
+        self.assertEqual(self.client.get('/data_processing/metrics/', REMOTE_ADDR='10.0.0.1').status_code, 403)
+
+    def test_slow_requests_keep_their_profile(self):
+        with tempfile.TemporaryDirectory() as tmp, override_settings(
+                PROFILE_SAMPLE_RATE=1.0, PROFILE_THRESHOLD_SECONDS=0, PROFILE_INTERVAL_SECONDS=0.001,
+                PROFILE_DIR=tmp):
+            response = self.upload('a\n1\n', QUERY_STRING='stream=1')
+            b''.join(response.streaming_content)
+            [profile] = os.listdir(tmp)
+            with open(os.path.join(tmp, profile)) as profile_file:
+                self.assertIn('views.py:upload', profile_file.read())
+
+    def test_cache_evicts_least_recently_used_entries(self):
+        df = pd.DataFrame({'a': np.arange(1000)})
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = ResultCache(tmp, max_bytes=0)
+            cache.put('first', df)
+            self.assertIsNone(cache.get('first'))
+            cache.max_bytes = 10 ** 6
+            cache.put('second', df)
+            self.assertIsNotNone(cache.get('second'))
+
+    def test_cache_entries_are_published_whole(self):
+        df = pd.DataFrame({'a': np.arange(10)})
+        statistics = FrameStatistics()
+        statistics.update(df)
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = ResultCache(tmp, max_bytes=10 ** 6)
+            save = FrameStatistics.save
+
+            def save_unpublished(self, directory):
+                assert cache.get('key') is None, 'published before its statistics'
+                save(self, directory)
+
+            with mock.patch.object(FrameStatistics, 'save', save_unpublished):
+                cache.put('key', df, statistics=statistics, memory_report={'a': {}})
+            cached_df, _, cached_statistics, memory_report = cache.load('key')
+            pd.testing.assert_frame_equal(cached_df, df)
+            self.assertEqual((cached_statistics.result()['a']['count'], memory_report), (10, {'a': {}}))
+
+            # An entry evicted while it is read counts as a miss
+            read = dataset_store.Dataset.read
+
+            def read_then_evict(self, *args, **kwargs):
+                rows = read(self, *args, **kwargs)
+                cache.max_bytes = 0
+                cache.evict()
+                return rows
+
+            with mock.patch.object(dataset_store.Dataset, 'read', read_then_evict):
+                self.assertIsNone(cache.load('key'))
+            self.assertEqual((cache.stats()['misses'], os.listdir(tmp)), (2, []))
+
+
+class MemoryOptimizerTests(SimpleTestCase):
+    def test_round_trip_keeps_every_value(self):
+        df = pd.DataFrame({
+            'unsigned': np.array([0, 200, 255, 7], dtype='int64'),
+            'signed': np.array([-5, 100, 0, 1], dtype='int32'),
+            'nullable': pd.array([1, None, 3, 70000], dtype='Int64'),
+            'complete': pd.array([1, 2, 3, 4], dtype='Int8'),
+            'half': np.array([0.5, np.nan, -2.0, np.inf]),
+            'precise': np.array([0.1, 0.2, 0.3, 1e-8]),
+            'single': np.array([0.1, 0.2, 0.3, 1e-8], dtype='float32'),
+            'repeated': ['a', 'b', 'a', None],
+            'date': pd.date_range('2024-01-01', periods=4),
+        })
+        df = pd.concat([df] * 100, ignore_index=True)
+        optimized, report = optimize_memory(df)
+        self.assertEqual(optimized.dtypes.astype(str).to_dict(), {
+            'unsigned': 'uint8', 'signed': 'int8', 'nullable': 'UInt32', 'complete': 'uint8', 'half': 'float16',
+            'precise': 'float64', 'single': 'float32', 'repeated': 'category', 'date': 'datetime64[ns]',
+        })
+        for col in df.columns:
+            pd.testing.assert_series_equal(optimized[col].astype(df[col].dtype), df[col])
+            self.assertLessEqual(report[col]['bytes_after'], report[col]['bytes_before'])
+        self.assertEqual(report['unsigned'], {'dtype_before': 'int64', 'dtype_after': 'uint8',
+                                              'bytes_before': 3200, 'bytes_after': 400})
+
+    @skipIf(infer_data_types.pa is None, 'pyarrow is not installed')
+    def test_arrow_strings_when_smaller(self):
+        df = pd.DataFrame({'name': [f'Person_{i}' for i in range(1000)]})
+        optimized, report = optimize_memory(df, arrow_strings=True)
+        self.assertIsInstance(optimized['name'].dtype, pd.ArrowDtype)
+        self.assertEqual(optimized['name'].tolist(), df['name'].tolist())
+        self.assertLess(report['name']['bytes_after'], report['name']['bytes_before'])
+
+
+class ColumnStatisticsTests(SimpleTestCase):
+    def test_chunked_statistics_match_the_whole_column(self):
+        rng = np.random.default_rng(0)
+        df = pd.DataFrame({'value': pd.array(rng.integers(0, 50_000, 40_000), dtype='Int32'),
+                           'label': rng.choice(['a', 'b', 'c'], 40_000, p=[0.6, 0.3, 0.1])})
+        df.loc[::10, 'value'] = pd.NA
+        chunked, other = FrameStatistics(), FrameStatistics()
+        for start in range(0, 30_000, 10_000):
+            chunked.update(df.iloc[start:start + 10_000])
+        other.update(df.iloc[30_000:])
+        chunked.merge(other)
+        result = chunked.result()
+
+        self.assertEqual((result['value']['count'], result['value']['nulls']), (40_000, 4_000))
+        self.assertEqual((result['value']['min'], result['value']['max']), (df['value'].min(), df['value'].max()))
+        self.assertAlmostEqual(result['value']['mean'], df['value'].mean())
+        self.assertFalse(result['value']['distinct_exact'])
+        self.assertAlmostEqual(result['value']['distinct'] / df['value'].nunique(), 1, delta=0.05)
+        self.assertAlmostEqual(result['value']['quantiles']['p50'], df['value'].median(), delta=1_000)
+        self.assertAlmostEqual(sum(result['value']['histogram']['counts']), 36_000, delta=20)
+        self.assertEqual(result['label']['top'][0]['value'], 'a')
+        self.assertEqual(result['label']['top'][0]['count'], (df['label'] == 'a').sum())
+        self.assertTrue(result['label']['distinct_exact'])
+
+    def test_spread_of_large_close_values_is_exact(self):
+        values = pd.Series(1e9 + np.array([0.0, 1.0, 2.0] * 1000))
+        chunked, other = FrameStatistics(), FrameStatistics()
+        chunked.update(pd.DataFrame({'value': values.iloc[:1000]}))
+        other.update(pd.DataFrame({'value': values.iloc[1000:]}))
+        chunked.merge(other)
+        result = chunked.result()['value']
+        self.assertAlmostEqual(result['std'], values.std(ddof=0), places=9)
+        self.assertEqual(result['mean'], 1e9 + 1)
+
+    def test_quantiles_are_reproducible(self):
+        df = pd.DataFrame({'value': np.random.default_rng(0).normal(size=50_000)})
+        results = []
+        for _ in range(2):
+            statistics = FrameStatistics()
+            statistics.update(df)
+            results.append(statistics.result()['value']['quantiles'])
+        self.assertEqual(results[0], results[1])
+
+    def test_state_round_trip(self):
+        statistics = FrameStatistics()
+        statistics.update(pd.DataFrame({'when': pd.date_range('2024-01-01', periods=3, tz='UTC'),
+                                        'flag': [True, False, True]}))
+        with tempfile.TemporaryDirectory() as tmp:
+            statistics.save(tmp)
+            self.assertEqual(FrameStatistics.load(tmp).result(), statistics.result())
+            self.assertIsNone(FrameStatistics.load(os.path.join(tmp, 'missing')))
+        self.assertEqual(statistics.result()['when']['max'], '2024-01-03T00:00:00+00:00')
+        self.assertEqual(statistics.result()['flag']['top'], [{'value': True, 'count': 2},
+                                                              {'value': False, 'count': 1}])
+
+
+class DatasetStoreTests(SimpleTestCase):
+    def test_round_trip_across_segments(self):
+        df = pd.DataFrame({
+            'int': np.arange(10, dtype='int16'),
+            'nullable': pd.array([1, None] * 5, dtype='Int8'),
+            'float': np.linspace(0, 1, 10).astype('float32'),
+            'date': pd.date_range('2024-01-01', periods=10, tz='UTC'),
+            'grade': pd.Categorical(list('ABABABABAB')),
+            'text': ['héllo', None] + [f'row {i}' for i in range(8)],
+        })
+        for compression in dataset_store.COMPRESSIONS:
+            with self.subTest(compression=compression), tempfile.TemporaryDirectory() as tmp, \
+                    mock.patch.object(dataset_store, 'SEGMENT_ROWS', 3), \
+                    mock.patch.object(dataset_store, 'COMPRESSED_SEGMENT_ROWS', 3):
+                dataset = dataset_store.open_dataset(tmp, dataset_store.save_dataset(df, tmp, compression=compression))
+                self.assertEqual(dataset.manifest['segments'], [3, 3, 3, 1])
+                pd.testing.assert_frame_equal(dataset.read(), df)
+                pd.testing.assert_frame_equal(dataset.read(offset=2, limit=5), df.iloc[2:7])
+                self.assertEqual(list(dataset.read(limit=1, columns=['text']).columns), ['text'])
+                with self.assertRaises(dataset_store.DatasetNotFound):
+                    dataset_store.open_dataset(tmp, 'missing')
+
+    def test_append_widens_without_rewriting_segments(self):
+        df = pd.DataFrame({'int': np.arange(4, dtype='int8'), 'text': list('abcd')})
+        more = pd.DataFrame({'text': ['e', None], 'int': np.array([1000, 5], dtype='int16')})
+        with tempfile.TemporaryDirectory() as tmp, mock.patch.object(dataset_store, 'SEGMENT_ROWS', 3):
+            dataset_id = dataset_store.save_dataset(df, tmp)
+            first_segment = os.path.join(tmp, dataset_id, 'c0.s0.npy')
+            written = os.path.getmtime(first_segment)
+            dataset = dataset_store.append_dataset(more, tmp, dataset_id)
+            self.assertEqual(os.path.getmtime(first_segment), written)
+            self.assertEqual(dataset.manifest['segments'], [3, 1, 2])
+            self.assertEqual(dataset.data_types, {'int': 'int16', 'text': 'object'})
+            pd.testing.assert_frame_equal(dataset.read(), pd.concat([df.astype({'int': 'int16'}), more[['int', 'text']]],
+                                                                    ignore_index=True))
+            with self.assertRaises(ValueError):
+                dataset_store.append_dataset(pd.DataFrame({'int': [1]}), tmp, dataset_id)
+
+    def test_appended_categories_of_another_dtype(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            dataset_id = dataset_store.save_dataset(pd.DataFrame({'grade': pd.Categorical(['A', 'B'])}), tmp)
+            dataset_store.append_dataset(pd.DataFrame({'grade': pd.Categorical([1, 2])}), tmp, dataset_id)
+            dataset = dataset_store.append_dataset(pd.DataFrame({'grade': pd.Categorical([None])}), tmp, dataset_id)
+            self.assertEqual(dataset.read()['grade'].tolist(), ['A', 'B', 1, 2, np.nan])
+
+
+def write_mixed_csv(path, rows, seed=0):
+    rng = np.random.default_rng(seed)
+    dates = pd.Timestamp('2020-01-01') + pd.to_timedelta(rng.integers(0, 2000, size=rows), unit='D')
+    amounts = rng.normal(100, 25, size=rows).round(2).astype(object)
+    amounts[rng.random(rows) < 0.05] = 'n/a'
+    pd.DataFrame({
+        'count': rng.integers(0, 1000, size=rows),
+        'amount': amounts,
+        'date': dates.strftime('%d/%m/%Y'),
+        'region': rng.choice(['north', 'south', 'east', 'west'], size=rows),
+        'email': [f'customer_{i}@example.com' for i in rng.integers(0, rows * 10, size=rows)],
+    }).to_csv(path, index=False)
+
+
+class OutOfCoreTests(SimpleTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = tmp.name
+        self.scratch = os.path.join(tmp.name, 'scratch')
+        self.path = os.path.join(tmp.name, 'data.csv')
+
+    def test_matches_in_memory_inference(self):
+        write_mixed_csv(self.path, 5_000)
+        expected, expected_schema = read_csv_streaming(self.path)
+        for arrow in (True, False):
+            with self.subTest(arrow=arrow), mock.patch.object(out_of_core, 'PROBE_ROWS', 100), \
+                    mock.patch.object(out_of_core, 'pa', out_of_core.pa if arrow else None):
+                dataset = out_of_core.read_csv_out_of_core(self.path, self.tmp, self.scratch, 64 * 1024)
+                self.assertGreater(len(dataset.manifest['segments']), 10)
+                self.assertEqual(dataset.schema, expected_schema)
+                pd.testing.assert_frame_equal(dataset.read(), expected)
+                self.assertEqual(os.listdir(self.scratch), [])
+
+    def test_profiles_merge_into_the_whole_column_profile(self):
+        values = pd.Series(['1', '2', 'x', None, '300', '2'] * 5)
+        merged = out_of_core.RawColumnProfile()
+        for start in range(0, len(values), 4):
+            merged.update(values.iloc[start:start + 4])
+        whole = out_of_core.RawColumnProfile.from_series(values)
+        self.assertEqual(merged.spec(threshold=0.5), {'type': 'Int16'})
+        self.assertEqual(merged.spec(threshold=0.9), whole.spec(threshold=0.9))
+        self.assertEqual(merged.distinct(), 4)
+        self.assertEqual(merged.numeric.numeric_count, whole.numeric.numeric_count)
+
+    def test_memory_stays_within_the_budget(self):
+        write_mixed_csv(self.path, 60_000)
+        budget = 4 * 1024 * 1024
+        tracemalloc.start()
+        try:
+            read_csv_streaming(self.path)
+            in_memory_peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+            out_of_core.read_csv_out_of_core(self.path, self.tmp, self.scratch, budget, compression='zlib',
+                                             statistics=FrameStatistics())
+            peak = tracemalloc.get_traced_memory()[1] - baseline
+        finally:
+            tracemalloc.stop()
+        self.assertGreater(in_memory_peak, 2 * budget)
+        self.assertLess(peak, budget)
+
+
+class QueryEngineTests(SimpleTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.df = pd.DataFrame({
+            'score': pd.array([5, 3, None, 9, 1, 7, 3, 8, None, 2], dtype='Int16'),
+            'region': pd.Categorical(list('nsnsnnsens')),
+            'name': [f'row {i}' for i in range(10)],
+            'date': pd.date_range('2024-01-01', periods=10),
+        })
+        with mock.patch.object(dataset_store, 'COMPRESSED_SEGMENT_ROWS', 4):
+            dataset_id = dataset_store.save_dataset(self.df, tmp.name, compression='zlib')
+        self.dataset = dataset_store.open_dataset(tmp.name, dataset_id)
+
+    def test_filter_sort_and_page_match_pandas(self):
+        page, total = query_engine.run_query(self.dataset, {
+            'filters': [{'column': 'score', 'op': '>=', 'value': 3}, {'column': 'region', 'op': '!=', 'value': 'e'}],
+            'sort': [{'column': 'score', 'descending': True}, {'column': 'name'}],
+            'columns': ['name', 'score'], 'offset': 1, 'limit': 3,
+        })
+        expected = self.df[(self.df['score'] >= 3).fillna(False) & (self.df['region'] != 'e')]
+        expected = expected.sort_values(['score', 'name'], ascending=[False, True])[['name', 'score']]
+        self.assertEqual(total, len(expected))
+        pd.testing.assert_frame_equal(page, expected.iloc[1:4].reset_index(drop=True))
+
+    def test_group_by_aggregates(self):
+        page, total = query_engine.run_query(self.dataset, {
+            'filters': [{'column': 'date', 'op': '<', 'value': '2024-01-09'}],
+            'group_by': ['region'],
+            'aggregates': [{'func': 'count'}, {'column': 'score', 'func': 'sum', 'as': 'total'}],
+            'sort': [{'column': 'total', 'descending': True}],
+        })
+        self.assertEqual(total, 3)
+        self.assertEqual(frame_to_records(page), [
+            {'region': 's', 'count': 3, 'total': 15},
+            {'region': 'n', 'count': 4, 'total': 13},
+            {'region': 'e', 'count': 1, 'total': 8},
+        ])
+
+    def test_block_stats_prune_segments_and_orders_are_cached(self):
+        query = {'filters': [{'column': 'score', 'op': '>', 'value': 8}], 'sort': [{'column': 'score'}]}
+        self.assertEqual(query_engine.run_query(self.dataset, query)[1], 1)
+        with mock.patch.object(self.dataset, 'read_segment', wraps=self.dataset.read_segment) as read_segment, \
+                mock.patch.object(self.dataset, 'read', side_effect=AssertionError('order not cached')):
+            page, total = query_engine.run_query(self.dataset, query)
+        # Only the segment holding 9 can match; the other two are skipped by their max
+        self.assertEqual([call.args[1] for call in read_segment.call_args_list if call.args[0] == 'score'], [0, 0])
+        self.assertEqual(page['score'].tolist(), [9])
+
+    def test_contains_matches_text_and_categories(self):
+        for column, value, expected in (('name', 'ROW 1', 1), ('region', 'E', 1)):
+            with self.subTest(column=column):
+                _, total = query_engine.run_query(self.dataset, {'filters': [{'column': column, 'op': 'contains',
+                                                                              'value': value}]})
+                self.assertEqual(total, expected)
+
+    def test_invalid_queries(self):
+        for query in ({'filters': [{'column': 'score', 'op': '~', 'value': 1}]},
+                      {'filters': [{'column': 'score', 'op': '=', 'value': 'high'}]},
+                      {'group_by': ['region'], 'sort': [{'column': 'name'}]},
+                      {'filters': [{'column': 'score', 'op': 'contains', 'value': '5'}]},
+                      {'filters': [{'column': 'date', 'op': 'contains', 'value': '2024'}]}):
+            with self.subTest(query=query), self.assertRaises(ValueError):
+                query_engine.run_query(self.dataset, query)
+        with self.assertRaises(KeyError):
+            query_engine.run_query(self.dataset, {'columns': ['missing']})
+
+
+class UploadJobTests(TemporaryStorageMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        settings_override = override_settings(UPLOAD_JOB_QUEUE_LIMIT=1)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        # Run jobs inline instead of on the worker threads, which cannot see the test transaction
+        patcher = mock.patch.object(jobs, 'start_worker')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def upload(self, text, **extra):
+        file = SimpleUploadedFile('data.csv', text.encode('utf-8'))
+        return self.client.post('/data_processing/upload/', {'file': file}, QUERY_STRING='async=1', **extra)
+
+    def test_job_lifecycle(self):
+        response = self.upload('Name,Score\nAlice,90\nBob,75\n')
+        self.assertEqual(response.status_code, 202)
+        job_id = response.json()['job_id']
+        self.assertEqual(self.client.get(f'/data_processing/jobs/{job_id}/result/').status_code, 202)
+
+        jobs.run_pending_jobs()
+        status = self.client.get(f'/data_processing/jobs/{job_id}/').json()
+        self.assertEqual((status['status'], status['stage'], status['rows_processed']), ('succeeded', 'done', 2))
+        result = self.client.get(f'/data_processing/jobs/{job_id}/result/').json()
+        self.assertEqual(result['data'], [{'Name': 'Alice', 'Score': 90}, {'Name': 'Bob', 'Score': 75}])
+
+    def test_job_datasets_belong_to_the_uploader(self):
+        token = Token.objects.create(user=User.objects.create_user('alice', password='secret'))
+        auth = {'HTTP_AUTHORIZATION': f'Token {token.key}'}
+        self.upload('Name,Score\nAlice,90\n', **auth)
+        jobs.run_pending_jobs()
+        uploaded = UploadedData.objects.get()
+        self.assertEqual(uploaded.owner.username, 'alice')
+
+        self.assertEqual(self.client.get('/data_processing/datasets/').json()['datasets'], [])
+        self.assertEqual(self.client.get(f'/data_processing/datasets/{uploaded.id}/raw/').status_code, 404)
+        listed = self.client.get('/data_processing/datasets/', **auth).json()['datasets']
+        self.assertEqual([entry['dataset_id'] for entry in listed], [str(uploaded.id)])
+
+    def test_jobs_are_only_visible_to_their_uploader(self):
+        token = Token.objects.create(user=User.objects.create_user('alice', password='secret'))
+        auth = {'HTTP_AUTHORIZATION': f'Token {token.key}'}
+        job_id = self.upload('Name,Score\nAlice,90\n', **auth).json()['job_id']
+        jobs.run_pending_jobs()
+        for url in (f'/data_processing/jobs/{job_id}/', f'/data_processing/jobs/{job_id}/result/'):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 404)
+                self.assertEqual(self.client.get(url, **auth).status_code, 200)
+
+    def test_jobs_with_expired_leases_are_requeued_on_startup(self):
+        self.upload('Name,Score\nAlice,90\n')
+        jobs.claim_next_job()
+        self.assertEqual(UploadJob.objects.get().worker, jobs.worker_id())
+        # A job whose worker still renews its lease belongs to a live process
+        recovery.recover_jobs()
+        self.assertEqual(UploadJob.objects.get().status, UploadJob.STATUS_RUNNING)
+
+        jobs.start_worker.reset_mock()
+        expired = timezone.now() - timedelta(seconds=settings.UPLOAD_JOB_LEASE_SECONDS + 1)
+        UploadJob.objects.update(updated_at=expired)
+        recovery.recover_jobs()
+        self.assertEqual(UploadJob.objects.get().status, UploadJob.STATUS_QUEUED)
+        jobs.start_worker.assert_called_once_with()
+
+        jobs.run_pending_jobs()
+        self.assertEqual(UploadJob.objects.get().status, UploadJob.STATUS_SUCCEEDED)
+        jobs.start_worker.reset_mock()
+        recovery.recover_jobs()
+        jobs.start_worker.assert_not_called()
+
+    def test_queue_limit_applies_backpressure(self):
+        self.assertEqual(self.upload('a\n1\n').status_code, 202)
+        response = self.upload('a\n1\n')
+        self.assertEqual(response.status_code, 503)
+        self.assertIn('Retry-After', response)
+        # The rejected upload's spooled copy is removed
+        self.assertEqual(len(os.listdir(settings.UPLOAD_JOB_SPOOL_DIR)), 1)
+
+    def test_failed_job_reports_error(self):
+        self.upload('')
+        jobs.run_pending_jobs()
+        job = UploadJob.objects.get()
+        self.assertEqual(job.status, UploadJob.STATUS_FAILED)
+        self.assertTrue(job.error)
+
+
+class TokenCacheTests(TestCase):
+    def setUp(self):
+        token_cache.clear()
+        self.addCleanup(token_cache.clear)
+        self.token = Token.objects.create(user=User.objects.create_user('alice', password='secret'))
+
+    def test_repeated_tokens_skip_the_database(self):
+        authentication = CachedTokenAuthentication()
+        with self.assertNumQueries(1):
+            user, _ = authentication.authenticate_credentials(self.token.key)
+        with self.assertNumQueries(0):
+            self.assertEqual(authentication.authenticate_credentials(self.token.key)[0], user)
+        self.assertEqual(token_cache.stats(), {'entries': 1, 'hits': 1, 'misses': 1})
+
+    def test_logout_and_deactivation_invalidate_cached_tokens(self):
+        auth = {'HTTP_AUTHORIZATION': f'Token {self.token.key}'}
+        self.assertEqual(self.client.post('/data_processing/logout/', **auth).status_code, 200)
+        self.assertEqual(self.client.post('/data_processing/logout/', **auth).status_code, 401)
+
+        token = Token.objects.create(user=self.token.user)
+        CachedTokenAuthentication().authenticate_credentials(token.key)
+        token.user.is_active = False
+        token.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            CachedTokenAuthentication().authenticate_credentials(token.key)
+
+    @override_settings(AUTH_TOKEN_SHARED_CACHE='default')
+    def test_shared_cache_serves_other_processes(self):
+        CachedTokenAuthentication().authenticate_credentials(self.token.key)
+        # A fresh in-process cache stands in for another worker process
+        token_cache.clear()
+        with self.assertNumQueries(0):
+            user, _ = CachedTokenAuthentication().authenticate_credentials(self.token.key)
+        self.assertEqual(user.username, 'alice')
+        key = self.token.key
+        self.token.delete()
+        with self.assertRaises(AuthenticationFailed):
+            CachedTokenAuthentication().authenticate_credentials(key)
+
+    @override_settings(AUTH_TOKEN_CACHE_SECONDS=0)
+    def test_cache_can_be_turned_off(self):
+        CachedTokenAuthentication().authenticate_credentials(self.token.key)
+        with self.assertNumQueries(1):
+            CachedTokenAuthentication().authenticate_credentials(self.token.key)
+
+
+class StreamingUploadTests(TemporaryStorageMixin, SimpleTestCase):
+    def setUp(self):
+        super().setUp()
+        settings_override = override_settings(DATASET_PERSIST_UPLOADS=False, UPLOAD_OPTIMIZE_MEMORY=False,
+                                              ASYNC_UPLOAD_QUEUE_LIMIT=1)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.spool_dir = settings.UPLOAD_JOB_SPOOL_DIR
+
+    def post(self, chunks, query='name=data.csv', headers=()):
+        """
+        Sends the body in several messages to the ASGI application and returns (status, headers, body).
+        """
+        messages = [{'type': 'http.request', 'body': chunk, 'more_body': i < len(chunks) - 1}
+                    for i, chunk in enumerate(chunks)]
+        sent = self.sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message)
+
+        application = routing.with_streaming_uploads(None)
+        scope = {'type': 'http', 'method': 'POST', 'path': routing.STREAM_UPLOAD_PATH,
+                 'query_string': query.encode('latin-1'), 'headers': list(headers)}
+        asyncio.run(application(scope, receive, send))
+        return sent[0]['status'], dict(sent[0]['headers']), b''.join(message.get('body', b'') for message in sent[1:])
+
+    def test_body_is_spooled_and_streamed_back(self):
+        status, headers, body = self.post([b'Name,Sco', b're\nAlice,90\nBob', b',75\n'])
+        self.assertEqual(status, 200)
+        self.assertIn(b'infer', headers[b'server-timing'])
+        body = json.loads(body)
+        self.assertEqual(body['data_types'], {'Name': 'object', 'Score': 'int8'})
+        self.assertEqual(body['data'], [{'Name': 'Alice', 'Score': 90}, {'Name': 'Bob', 'Score': 75}])
+        self.assertEqual(os.listdir(self.spool_dir), [])
+
+    def test_errors_after_the_response_started_abort_it(self):
+        def failing_encoder(*args, **kwargs):
+            yield b'{"data": ['
+            raise ValueError('encoding failed')
+
+        with mock.patch.object(async_upload, 'iter_json', failing_encoder), self.assertRaises(ValueError):
+            self.post([b'Name,Score\nAlice,90\n'])
+        starts = [message for message in self.sent if message['type'] == 'http.response.start']
+        self.assertEqual([message['status'] for message in starts], [200])
+        self.assertTrue(async_upload.admit_upload())
+        async_upload.release_upload()
+
+    @skipIf(arrow_stream.pa is None, 'pyarrow is not installed')
+    def test_arrow_response(self):
+        accept = [(b'accept', arrow_stream.ARROW_STREAM_CONTENT_TYPE.encode('latin-1'))]
+        status, headers, body = self.post([b'Name,Score\nAlice,90\nBob,75\n'], headers=accept)
+        self.assertEqual((status, headers[b'content-type']), (200, arrow_stream.ARROW_STREAM_CONTENT_TYPE.encode()))
+        table = arrow_stream.pa.ipc.open_stream(body).read_all()
+        self.assertEqual(table.to_pydict(), {'Name': ['Alice', 'Bob'], 'Score': [90, 75]})
+
+    def test_invalid_parameters(self):
+        self.assertEqual(self.post([b'a\n1\n'], query='name=data.txt')[0], 400)
+        self.assertEqual(self.post([b'a\n1\n'], query='name=data.csv&format=xml')[0], 400)
+
+    def test_queue_limit_applies_backpressure(self):
+        self.assertTrue(async_upload.admit_upload())
+        self.addCleanup(async_upload.release_upload)
+        status, headers, _ = self.post([b'a\n1\n'])
+        self.assertEqual(status, 503)
+        self.assertEqual(headers[b'retry-after'], b'30')
+
+    def test_oversized_body_is_rejected(self):
+        with override_settings(ASYNC_UPLOAD_MAX_BYTES=4):
+            self.assertEqual(self.post([b'a\n1\n', b'2\n'])[0], 413)
+        self.assertEqual(os.listdir(self.spool_dir), [])
+
+
+class StartupTests(SimpleTestCase):
+    def test_account_endpoints_do_not_import_the_upload_stack(self):
+        script = ("import sys, django; django.setup(); from django.test import Client; "
+                  "response = Client(HTTP_HOST='localhost').get('/data_processing/login/'); "
+                  "print(response.status_code, 'pandas' in sys.modules)")
+        env = {**os.environ, 'DJANGO_SETTINGS_MODULE': 'Server.settings_api', 'PYTHONWARNINGS': 'ignore',
+               'DATA_PROCESSING_LOG_LEVEL': 'ERROR'}
+        result = subprocess.run([sys.executable, '-c', script], cwd=settings.BASE_DIR, env=env,
+                                capture_output=True, text=True, timeout=60)
+        self.assertEqual(result.stdout.split(), ['405', 'False'], result.stderr)
+
+    def test_arrow_responses_have_a_declared_dependency(self):
+        # Installs built from requirements.txt must be able to answer Arrow stream requests
+        with open(os.path.join(settings.BASE_DIR.parent, 'requirements.txt')) as requirements:
+            pinned = [line.strip() for line in requirements if line.lower().startswith('pyarrow==')]
+        self.assertEqual(len(pinned), 1)
+        if arrow_stream.pa is not None:
+            self.assertEqual(arrow_stream.negotiate(arrow_stream.ARROW_STREAM_CONTENT_TYPE), 'arrow')
+
+    def test_warm_up_runs_a_tiny_upload(self):
+        warm_up()
@@ -1,10 +1,13 @@
 # data_processing/urls.py
-from django.urls import path
-from . import views
+from django.urls import URLResolver, path
+from django.urls.resolvers import RoutePattern
+from . import account_views
 
 urlpatterns = [
-    path('upload/', views.upload, name='upload'),
-    path('register/', views.register, name='register'),
-    path('login/', views.login, name='login'),
-    path('logout/', views.logout, name='logout'),
+    path('register/', account_views.register, name='register'),
+    path('login/', account_views.login, name='login'),
+    path('logout/', account_views.logout, name='logout'),
+    # The upload and dataset views import pandas and the inference stack; a resolver given the
+    # module name only imports it when a request first reaches one of its URLs
+    URLResolver(RoutePattern(''), 'data_processing.data_urls'),
 ]
@@ -0,0 +1,379 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+# Distinct values are counted exactly up to this many per column; beyond it a HyperLogLog sketch estimates them
+EXACT_DISTINCT_LIMIT = 10_000
+
+# HyperLogLog precision: 2**p one-byte registers, about 1.04 / sqrt(2**p) relative error (1.6% at 12)
+HLL_PRECISION = 12
+
+# Values of numeric columns kept in a uniform sample for quantiles and histograms; exact below this many rows
+SAMPLE_SIZE = 10_000
+
+QUANTILES = (0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99)
+HISTOGRAM_BINS = 20
+
+# Most frequent values reported for text and boolean columns, and candidates kept while counting
+TOP_K = 10
+TOP_K_CAPACITY = 1_000
+
+# File holding the mergeable statistics state inside a dataset's directory
+STATE_FILE_NAME = 'statistics.npz'
+
+
+def statistics_kind(dtype):
+    """
+    Maps a pandas dtype to the statistics collected for it: 'numeric', 'datetime', 'boolean' or 'text'.
+    """
+    if pd.api.types.is_bool_dtype(dtype):
+        return 'boolean'
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        return 'datetime'
+    if pd.api.types.is_numeric_dtype(dtype) and not isinstance(dtype, pd.CategoricalDtype):
+        return 'numeric'
+    return 'text'
+
+
+def hash_values(values):
+    """
+    Hashes distinct values to 64 bits. Numbers are hashed as float64, so chunks widened from
+    int8 to int16 hash equal values equally; anything else is hashed as text.
+    """
+    if values.dtype.kind in 'iuf':
+        return pd.util.hash_array(values.astype('float64', copy=False))
+    if values.dtype != object:
+        values = values.astype(str).astype(object)
+    # Non-string objects are hashed through str() by pandas
+    return pd.util.hash_array(values)
+
+
+def hll_update(registers, hashes):
+    """
+    Adds hashes to HyperLogLog registers: the top bits pick a register, which keeps the longest run of leading zeros.
+    """
+    low_bits = 64 - HLL_PRECISION
+    index = (hashes >> np.uint64(low_bits)).astype('int64')
+    rest = hashes & np.uint64((1 << low_bits) - 1)
+    # `rest` fits in 52 bits, so its float64 exponent is its exact bit length
+    bit_length = np.frexp(rest.astype('float64'))[1]
+    np.maximum.at(registers, index, (low_bits - bit_length + 1).astype('uint8'))
+
+
+def hll_estimate(registers):
+    m = len(registers)
+    alpha = 0.7213 / (1 + 1.079 / m)
+    estimate = alpha * m * m / np.sum(np.exp2(-registers.astype('float64')))
+    zeros = int(np.count_nonzero(registers == 0))
+    if estimate <= 2.5 * m and zeros:
+        # Linear counting is more accurate while many registers are still empty
+        estimate = m * np.log(m / zeros)
+    return int(round(estimate))
+
+
+def json_number(value):
+    value = float(value)
+    return value if np.isfinite(value) else None
+
+
+class ColumnStatistics:
+    """
+    Mergeable statistics of one column, updated a chunk at a time.
+
+    Every part can be merged with the statistics of other chunks or of a later append:
+    counts add up, the mean and the sum of squared deviations (M2) combine with Chan's
+    formula, so the spread of large values close together stays exact, distinct values are a set of hashes until EXACT_DISTINCT_LIMIT
+    and a HyperLogLog sketch after, quantiles come from a bottom-k sample keyed by random
+    priorities, and top values are counts trimmed to the TOP_K_CAPACITY largest.
+    """
+
+    def __init__(self, kind, tz=None):
+        self.kind = kind
+        self.tz = tz
+        self.rows = 0
+        self.nulls = 0
+        self.hashes = np.empty(0, dtype='uint64')
+        self.registers = None
+        self.min = None
+        self.max = None
+        # Count, mean and sum of squared deviations of the finite values of numeric columns
+        self.finite = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.sample = np.empty(0, dtype='float64')
+        self.priorities = np.empty(0, dtype='float64')
+        self.top = {}
+
+    def update(self, series):
+        valid = series.dropna()
+        self.rows += len(series)
+        self.nulls += len(series) - len(valid)
+        if not len(valid):
+            return
+
+        if self.kind in ('text', 'boolean'):
+            # Counting first means only the distinct values are hashed
+            counts = valid.value_counts()
+            observed = counts.to_numpy() > 0
+            values, counts = counts.index.to_numpy()[observed], counts.to_numpy()[observed]
+            self.add_hashes(hash_values(values))
+            self.add_top(zip(values[:TOP_K_CAPACITY].astype(str).tolist(), counts[:TOP_K_CAPACITY]))
+            return
+
+        values = valid.to_numpy(dtype='datetime64[ns]').view('int64') if self.kind == 'datetime' \
+            else valid.to_numpy(dtype='float64')
+        uniques = np.unique(values)
+        self.add_hashes(hash_values(uniques))
+        self.min = uniques[0] if self.min is None else min(self.min, uniques[0])
+        self.max = uniques[-1] if self.max is None else max(self.max, uniques[-1])
+        if self.kind == 'numeric':
+            finite = values[np.isfinite(values)]
+            if len(finite):
+                mean = float(finite.mean())
+                self.add_moments(len(finite), mean, float(np.square(finite - mean).sum()))
+            self.add_sample(values, self.sample_priorities(values))
+
+    def add_moments(self, count, mean, m2):
+        """
+        Combines the count, mean and M2 of other values with these (Chan et al.'s parallel update).
+        """
+        if not count:
+            return
+        total = self.finite + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self.m2 += m2 + delta * delta * self.finite * count / total
+        self.finite = total
+
+    def sample_priorities(self, values):
+        """
+        Draws the sampling priorities of a chunk from a generator seeded by its values and position.
+
+        The same upload therefore always keeps the same sample, while other chunks and appends
+        draw independent priorities.
+        """
+        seed = int(hash_values(values).sum(dtype='uint64'))
+        return np.random.default_rng([seed, self.rows]).random(len(values))
+
+    def add_hashes(self, hashes):
+        if self.registers is not None:
+            hll_update(self.registers, hashes)
+            return
+        self.hashes = np.union1d(self.hashes, hashes)
+        if len(self.hashes) > EXACT_DISTINCT_LIMIT:
+            self.registers = np.zeros(1 << HLL_PRECISION, dtype='uint8')
+            hll_update(self.registers, self.hashes)
+            self.hashes = np.empty(0, dtype='uint64')
+
+    def add_sample(self, values, priorities):
+        sample = np.concatenate([self.sample, values])
+        priorities = np.concatenate([self.priorities, priorities])
+        if len(sample) > SAMPLE_SIZE:
+            keep = np.argpartition(priorities, SAMPLE_SIZE)[:SAMPLE_SIZE]
+            sample, priorities = sample[keep], priorities[keep]
+        self.sample, self.priorities = sample, priorities
+
+    def add_top(self, counts):
+        for value, count in counts:
+            self.top[value] = self.top.get(value, 0) + int(count)
+        if len(self.top) > TOP_K_CAPACITY:
+            self.top = dict(sorted(self.top.items(), key=lambda item: -item[1])[:TOP_K_CAPACITY])
+
+    def merge(self, other):
+        """
+        Adds the statistics of other rows of the same column.
+        """
+        self.rows += other.rows
+        self.nulls += other.nulls
+        if other.registers is not None:
+            if self.registers is None:
+                self.registers = np.zeros(1 << HLL_PRECISION, dtype='uint8')
+                hll_update(self.registers, self.hashes)
+                self.hashes = np.empty(0, dtype='uint64')
+            np.maximum(self.registers, other.registers, out=self.registers)
+        else:
+            self.add_hashes(other.hashes)
+        for bound, pick in (('min', min), ('max', max)):
+            values = [value for value in (getattr(self, bound), getattr(other, bound)) if value is not None]
+            setattr(self, bound, pick(values) if values else None)
+        self.add_moments(other.finite, other.mean, other.m2)
+        self.add_sample(other.sample, other.priorities)
+        self.add_top(other.top.items())
+
+    @property
+    def distinct(self):
+        return hll_estimate(self.registers) if self.registers is not None else len(self.hashes)
+
+    def result(self):
+        """
+        Summarizes the column as JSON-ready values.
+        """
+        valid = self.rows - self.nulls
+        result = {
+            'kind': self.kind,
+            'count': self.rows,
+            'nulls': self.nulls,
+            'distinct': self.distinct,
+            'distinct_exact': self.registers is None,
+        }
+        if self.kind == 'datetime' and self.min is not None:
+            result['min'], result['max'] = (self.timestamp(self.min), self.timestamp(self.max))
+        elif self.kind == 'numeric' and self.min is not None:
+            result.update({
+                'min': json_number(self.min),
+                'max': json_number(self.max),
+                'mean': json_number(self.mean) if self.finite else None,
+                'std': json_number(np.sqrt(self.m2 / self.finite)) if self.finite else None,
+                'quantiles': {f'p{round(q * 100)}': json_number(value)
+                              for q, value in zip(QUANTILES, np.quantile(self.sample, QUANTILES))},
+                'quantiles_exact': len(self.sample) == valid,
+            })
+            if np.isfinite([self.min, self.max]).all():
+                counts, edges = np.histogram(self.sample[np.isfinite(self.sample)], bins=HISTOGRAM_BINS,
+                                             range=(self.min, self.max))
+                # Counts of the sample are scaled up to every valid value
+                scale = valid / len(self.sample)
+                result['histogram'] = {'edges': [float(edge) for edge in edges],
+                                       'counts': [int(round(count * scale)) for count in counts]}
+        elif self.kind in ('text', 'boolean'):
+            top = sorted(self.top.items(), key=lambda item: (-item[1], item[0]))[:TOP_K]
+            result['top'] = [{'value': value == 'True' if self.kind == 'boolean' else value, 'count': count}
+                             for value, count in top]
+        return result
+
+    def timestamp(self, nanoseconds):
+        timestamp = pd.Timestamp(int(nanoseconds))
+        return (timestamp.tz_localize('UTC').tz_convert(self.tz) if self.tz else timestamp).isoformat()
+
+    def state(self):
+        """
+        Returns the statistics as scalars and arrays, the form they are saved in.
+        """
+        scalars = {'kind': self.kind, 'tz': self.tz, 'rows': self.rows, 'nulls': self.nulls,
+                   'min': None if self.min is None else float(self.min) if self.kind == 'numeric' else int(self.min),
+                   'max': None if self.max is None else float(self.max) if self.kind == 'numeric' else int(self.max),
+                   'finite': self.finite, 'mean': self.mean, 'm2': self.m2}
+        arrays = {'hashes': self.hashes, 'sample': self.sample, 'priorities': self.priorities,
+                  'top_values': np.array(list(self.top), dtype=str),
+                  'top_counts': np.array(list(self.top.values()), dtype='int64')}
+        if self.registers is not None:
+            arrays['registers'] = self.registers
+        return scalars, arrays
+
+    @classmethod
+    def from_state(cls, scalars, arrays):
+        statistics = cls(scalars['kind'], scalars['tz'])
+        for name in ('rows', 'nulls', 'min', 'max'):
+            setattr(statistics, name, scalars[name])
+        if 'm2' in scalars:
+            statistics.finite, statistics.mean, statistics.m2 = scalars['finite'], scalars['mean'], scalars['m2']
+        elif scalars['kind'] == 'numeric' and scalars['rows'] > scalars['nulls']:
+            # State saved with running sums; its precision cannot be recovered, only carried over
+            count = scalars['rows'] - scalars['nulls']
+            mean = scalars['sum'] / count
+            statistics.add_moments(count, mean, max(scalars['sum_squares'] - count * mean * mean, 0.0))
+        statistics.hashes = arrays['hashes']
+        statistics.registers = arrays.get('registers')
+        statistics.sample = arrays['sample']
+        statistics.priorities = arrays['priorities']
+        statistics.top = dict(zip(arrays['top_values'].tolist(), arrays['top_counts'].tolist()))
+        return statistics
+
+
+class FrameStatistics:
+    """
+    Column statistics of an upload, collected from its converted chunks as they are produced.
+
+    A column whose statistics kind changes between chunks (numbers that turn out to be
+    text, say) is summarized again from the final column in `result`, the only case in
+    which values are read a second time.
+    """
+
+    def __init__(self):
+        self.columns = {}
+        self.stale = set()
+
+    def update(self, df):
+        for col in df.columns:
+            name = str(col)
+            kind = statistics_kind(df[col].dtype)
+            if name in self.stale:
+                continue
+            if name not in self.columns:
+                self.columns[name] = ColumnStatistics(kind, tz=str(getattr(df[col].dtype, 'tz', None) or '') or None)
+            elif self.columns[name].kind != kind:
+                self.stale.add(name)
+                continue
+            self.columns[name].update(df[col])
+
+    def clear(self):
+        self.columns = {}
+        self.stale = set()
+
+    def merge(self, other):
+        """
+        Adds the statistics of rows appended to the same dataset.
+
+        Raises:
+        - ValueError: If a column's statistics kind differs, e.g. after numbers widened to text.
+        """
+        for name, statistics in other.columns.items():
+            current = self.columns.get(name)
+            if current is None:
+                self.columns[name] = statistics
+            elif current.kind != statistics.kind:
+                raise ValueError(f"Column {name} changed from {current.kind} to {statistics.kind}")
+            else:
+                current.merge(statistics)
+
+    def finish(self, df):
+        """
+        Brings the statistics in line with the final frame, summarizing again columns whose kind changed.
+        """
+        for col in df.columns:
+            name = str(col)
+            statistics = self.columns.get(name)
+            if name in self.stale or statistics is None or statistics.kind != statistics_kind(df[col].dtype):
+                self.columns[name] = ColumnStatistics(statistics_kind(df[col].dtype),
+                                                      tz=str(getattr(df[col].dtype, 'tz', None) or '') or None)
+                self.columns[name].update(df[col])
+        self.stale = set()
+        return self
+
+    def result(self):
+        return {name: statistics.result() for name, statistics in self.columns.items()}
+
+    def save(self, directory):
+        """
+        Writes the mergeable state into a dataset's directory.
+        """
+        names = list(self.columns)
+        scalars, arrays = [], {}
+        for i, name in enumerate(names):
+            column_scalars, column_arrays = self.columns[name].state()
+            scalars.append(column_scalars)
+            arrays.update({f'{i}.{key}': value for key, value in column_arrays.items()})
+        path = os.path.join(directory, STATE_FILE_NAME)
+        with open(path + '.tmp', 'wb') as state_file:
+            np.savez(state_file, meta=np.array(json.dumps({'columns': names, 'scalars': scalars})), **arrays)
+        os.replace(path + '.tmp', path)
+
+    @classmethod
+    def load(cls, directory):
+        """
+        Reads the state saved by `save`, or returns None if the dataset has none.
+        """
+        try:
+            state = np.load(os.path.join(directory, STATE_FILE_NAME), allow_pickle=False)
+        except FileNotFoundError:
+            return None
+        with state:
+            meta = json.loads(str(state['meta']))
+            statistics = cls()
+            for i, (name, scalars) in enumerate(zip(meta['columns'], meta['scalars'])):
+                prefix = f'{i}.'
+                arrays = {key[len(prefix):]: state[key] for key in state.files if key.startswith(prefix)}
+                statistics.columns[name] = ColumnStatistics.from_state(scalars, arrays)
+        return statistics
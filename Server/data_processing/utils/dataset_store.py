@@ -0,0 +1,517 @@
+import io
+import json
+import os
+import shutil
+import uuid
+import zlib
+
+import numpy as np
+import pandas as pd
+
+# Rows written per column segment file; compressed segments are smaller so a page read decompresses little
+SEGMENT_ROWS = 1_000_000
+COMPRESSED_SEGMENT_ROWS = 65_536
+
+# Segment compression codecs and the zlib level, chosen for write speed over ratio
+COMPRESSIONS = (None, 'zlib')
+ZLIB_LEVEL = 1
+
+MANIFEST_NAME = 'manifest.json'
+
+
+class DatasetNotFound(Exception):
+    pass
+
+
+def column_kind(dtype):
+    """
+    Maps a pandas dtype to the on-disk layout used for the column.
+
+    - 'numeric': a plain NumPy array (ints, floats, bools).
+    - 'masked': a NumPy array plus a validity mask (nullable Int*, boolean, Float*).
+    - 'datetime': datetime64[ns] values, timezone stored in the manifest.
+    - 'category': int codes plus the list of categories.
+    - 'text': UTF-8 bytes with int64 offsets and a validity mask.
+    """
+    if isinstance(dtype, pd.CategoricalDtype):
+        return 'category'
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        return 'datetime'
+    if isinstance(dtype, np.dtype) and dtype.kind in 'biuf':
+        return 'numeric'
+    if isinstance(getattr(dtype, 'numpy_dtype', None), np.dtype) and dtype.numpy_dtype.kind in 'biuf':
+        return 'masked'
+    return 'text'
+
+
+def encode_text(values, valid):
+    """
+    Packs strings into one UTF-8 buffer with offsets, the layout Arrow uses for string arrays.
+    """
+    encoded = [str(value).encode('utf-8') if ok else b'' for value, ok in zip(values, valid)]
+    offsets = np.zeros(len(encoded) + 1, dtype='int64')
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    return b''.join(encoded), offsets
+
+
+def column_entry(col, dtype, schema=None):
+    """
+    Describes a column in the manifest: its name, dtype name and storage kind.
+    """
+    entry = {'name': str(col), 'type': str(dtype), 'kind': column_kind(dtype)}
+    if entry['kind'] == 'datetime':
+        entry['tz'] = str(dtype.tz) if getattr(dtype, 'tz', None) else None
+        entry['format'] = (schema or {}).get(col, {}).get('format')
+    return entry
+
+
+def cast_segment(series, entry):
+    """
+    Casts a segment written before its column widened to the column's current type.
+    """
+    if entry['kind'] == 'text':
+        return series.astype(object).where(series.notna(), None)
+    return series.astype(entry['type'])
+
+
+class DatasetWriter:
+    """
+    Writes a dataset as per-column segment files.
+
+    Each call to `append` adds one segment per column, so a dataset can be written chunk
+    by chunk without holding all rows in memory. Uncompressed segments can later be
+    memory-mapped; zlib-compressed segments are decompressed one segment at a time.
+    """
+
+    def __init__(self, root, dataset_id=None, compression=None):
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"Unsupported compression: {compression}")
+        self.dataset_id = dataset_id or str(uuid.uuid4())
+        self.path = os.path.join(root, self.dataset_id)
+        self.tmp_path = self.path + '.tmp'
+        os.makedirs(self.tmp_path)
+        self.compression = compression
+        self.segment_rows = COMPRESSED_SEGMENT_ROWS if compression else SEGMENT_ROWS
+        self.columns = None
+        self.segments = []
+
+    def _segment_path(self, column_index, segment_index, suffix):
+        return os.path.join(self.tmp_path, f'c{column_index}.s{segment_index}.{suffix}')
+
+    def _write_bytes(self, path, data):
+        if self.compression:
+            data = zlib.compress(data, ZLIB_LEVEL)
+        with open(path, 'wb') as segment_file:
+            segment_file.write(data)
+
+    def _save_array(self, path, array):
+        if not self.compression:
+            np.save(path, array)
+            return
+        buffer = io.BytesIO()
+        np.save(buffer, array)
+        self._write_bytes(path, buffer.getbuffer())
+
+    def append(self, df, schema=None):
+        """
+        Writes the rows of `df` as a new segment.
+
+        When a column arrives with a different dtype than earlier segments (an int8 column
+        now holding int16 values, say), the column's type changes to the new dtype while the
+        earlier segments stay as written; their types are kept in `segment_types` and they
+        are cast when read.
+
+        Args:
+        - df (pd.DataFrame): Rows to append; the column names must match earlier segments.
+        - schema (dict, optional): Schema entries as returned by `schema_from_frame`, used to keep date formats.
+        """
+        if self.columns is None:
+            self.columns = [column_entry(col, df[col].dtype, schema) for col in df.columns]
+        else:
+            df = df.rename(columns=str)
+            missing = {entry['name'] for entry in self.columns} ^ set(df.columns)
+            if missing:
+                raise ValueError(f"Columns do not match the dataset: {', '.join(sorted(missing))}")
+            df = df[[entry['name'] for entry in self.columns]]
+            if not len(df):
+                return
+            for entry in self.columns:
+                self._widen(entry, column_entry(entry['name'], df[entry['name']].dtype, schema))
+
+        for start in range(0, max(len(df), 1), self.segment_rows):
+            part = df.iloc[start:start + self.segment_rows]
+            segment_index = len(self.segments)
+            for column_index, (col, entry) in enumerate(zip(df.columns, self.columns)):
+                self._write_column(part[col], entry, column_index, segment_index)
+                if 'segment_types' in entry:
+                    entry['segment_types'].append({'type': entry['type'], 'kind': entry['kind']})
+            self.segments.append(len(part))
+
+    def _widen(self, entry, new_entry):
+        if (new_entry['type'], new_entry['kind']) == (entry['type'], entry['kind']):
+            return
+        if 'segment_types' not in entry:
+            entry['segment_types'] = [{'type': entry['type'], 'kind': entry['kind']} for _ in self.segments]
+        entry.update(new_entry)
+
+    def _write_column(self, series, entry, column_index, segment_index):
+        path = lambda suffix: self._segment_path(column_index, segment_index, suffix)
+        kind = entry['kind']
+        if kind == 'numeric':
+            self._save_array(path('npy'), series.to_numpy())
+        elif kind == 'masked':
+            valid = series.notna().to_numpy()
+            self._save_array(path('npy'), series.to_numpy(dtype=series.dtype.numpy_dtype, na_value=0))
+            self._save_array(path('valid.npy'), valid)
+        elif kind == 'datetime':
+            if entry['tz']:
+                series = series.dt.tz_convert('UTC').dt.tz_localize(None)
+            self._save_array(path('npy'), series.to_numpy(dtype='datetime64[ns]'))
+        elif kind == 'category':
+            self._save_array(path('npy'), series.cat.codes.to_numpy())
+            with open(path('categories.json'), 'w') as categories_file:
+                json.dump(series.cat.categories.tolist(), categories_file, default=str)
+        else:
+            valid = series.notna().to_numpy()
+            data, offsets = encode_text(series.to_numpy(dtype=object), valid)
+            self._write_bytes(path('bin'), data)
+            self._save_array(path('offsets.npy'), offsets)
+            self._save_array(path('valid.npy'), valid)
+
+    def close(self, **metadata):
+        """
+        Writes the manifest and publishes the dataset under its final path.
+
+        Returns:
+        - str: The dataset ID.
+        """
+        manifest = {
+            'dataset_id': self.dataset_id,
+            'columns': self.columns or [],
+            'segments': self.segments,
+            'row_count': sum(self.segments),
+            'compression': self.compression,
+            **metadata,
+        }
+        with open(os.path.join(self.tmp_path, MANIFEST_NAME), 'w') as manifest_file:
+            json.dump(manifest, manifest_file)
+        os.replace(self.tmp_path, self.path)
+        return self.dataset_id
+
+    def abort(self):
+        shutil.rmtree(self.tmp_path, ignore_errors=True)
+
+
+class DatasetAppender(DatasetWriter):
+    """
+    Adds segments to a stored dataset in place.
+
+    New segment files are written next to the existing ones and the manifest is replaced
+    atomically at the end, so readers see either the old rows or all of the new ones.
+    Existing segments are never rewritten, so an append costs as much as the new rows.
+    """
+
+    def __init__(self, root, dataset_id):
+        dataset = Dataset(os.path.join(root, str(dataset_id)))
+        self.manifest = dataset.manifest
+        self.dataset_id = dataset.dataset_id
+        self.path = self.tmp_path = dataset.path
+        self.compression = self.manifest.get('compression')
+        self.segment_rows = COMPRESSED_SEGMENT_ROWS if self.compression else SEGMENT_ROWS
+        self.columns = json.loads(json.dumps(self.manifest['columns']))
+        self.segments = list(self.manifest['segments'])
+        self.first_new_segment = len(self.segments)
+
+    def close(self, **metadata):
+        manifest = {
+            **self.manifest,
+            **metadata,
+            'columns': self.columns,
+            'segments': self.segments,
+            'row_count': sum(self.segments),
+        }
+        manifest_path = os.path.join(self.path, MANIFEST_NAME)
+        with open(manifest_path + '.tmp', 'w') as manifest_file:
+            json.dump(manifest, manifest_file)
+        os.replace(manifest_path + '.tmp', manifest_path)
+        return self.dataset_id
+
+    def abort(self):
+        for name in os.listdir(self.path):
+            segment = name.split('.')[1] if name.startswith('c') and name.count('.') >= 2 else None
+            if segment and segment.startswith('s') and int(segment[1:]) >= self.first_new_segment:
+                os.remove(os.path.join(self.path, name))
+
+
+def append_dataset(df, root, dataset_id, schema=None):
+    """
+    Appends rows to a stored dataset as new segments.
+
+    Args:
+    - df (pd.DataFrame): The processed rows; the column names must match the dataset.
+    - root (str): Directory holding all stored datasets.
+    - dataset_id (str): The dataset to append to.
+    - schema (dict, optional): Schema entries as returned by `schema_from_frame`, used to keep date formats.
+
+    Returns:
+    - Dataset: The dataset reopened with the new rows.
+
+    Raises:
+    - DatasetNotFound: If no dataset with this ID exists.
+    - ValueError: If the columns do not match the dataset.
+    """
+    writer = DatasetAppender(root, dataset_id)
+    try:
+        writer.append(df, schema)
+        writer.close()
+    except Exception:
+        writer.abort()
+        raise
+    return open_dataset(root, dataset_id)
+
+
+def revert_append(root, dataset_id, manifest):
+    """
+    Undoes `append_dataset` by restoring the manifest read before it and removing the new segments.
+
+    Args:
+    - root (str): Directory holding all stored datasets.
+    - dataset_id (str): The dataset that was appended to.
+    - manifest (dict): The dataset's manifest from before the append.
+    """
+    writer = DatasetAppender(root, dataset_id)
+    writer.manifest = manifest
+    writer.columns, writer.segments = manifest['columns'], list(manifest['segments'])
+    writer.first_new_segment = len(writer.segments)
+    writer.close()
+    writer.abort()
+
+
+def save_dataset(df, root, schema=None, dataset_id=None, compression=None, **metadata):
+    """
+    Stores a processed DataFrame on local disk in the columnar segment layout.
+
+    Args:
+    - df (pd.DataFrame): The processed DataFrame.
+    - root (str): Directory holding all stored datasets.
+    - schema (dict, optional): Schema entries as returned by `schema_from_frame`.
+    - dataset_id (str, optional): ID to store the dataset under; a new UUID by default.
+    - compression (str, optional): Segment compression, one of `COMPRESSIONS`.
+    - **metadata: Extra JSON-serializable fields kept in the manifest.
+
+    Returns:
+    - str: The dataset ID.
+    """
+    writer = DatasetWriter(root, dataset_id, compression)
+    try:
+        writer.append(df, schema)
+        return writer.close(**metadata)
+    except Exception:
+        writer.abort()
+        raise
+
+
+class Dataset:
+    """
+    A stored dataset opened for reading.
+
+    Opening only reads the manifest; row slices load just the segments of the requested
+    columns they touch. Uncompressed column files are memory-mapped and compressed ones
+    are decompressed a segment at a time, so the cost of a read depends on the slice
+    size only.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        try:
+            with open(os.path.join(path, MANIFEST_NAME)) as manifest_file:
+                self.manifest = json.load(manifest_file)
+        except FileNotFoundError:
+            raise DatasetNotFound(os.path.basename(path))
+        self.columns = self.manifest['columns']
+        self.row_count = self.manifest['row_count']
+        self.segment_starts = np.concatenate([[0], np.cumsum(self.manifest['segments'])]).astype('int64')
+
+    @property
+    def dataset_id(self):
+        return self.manifest['dataset_id']
+
+    @property
+    def data_types(self):
+        return {entry['name']: entry['type'] for entry in self.columns}
+
+    @property
+    def schema(self):
+        """
+        The column types in the shape returned by `schema_from_frame`, including date formats.
+        """
+        return {
+            entry['name']: {'type': 'datetime', 'format': entry.get('format')} if entry['kind'] == 'datetime'
+            else {'type': entry['type']}
+            for entry in self.columns
+        }
+
+    def _segment_entry(self, entry, segment_index):
+        segment_types = entry.get('segment_types')
+        if not segment_types or segment_types[segment_index] == {'type': entry['type'], 'kind': entry['kind']}:
+            return entry
+        return {**entry, **segment_types[segment_index]}
+
+    def _read_bytes(self, path):
+        with open(path, 'rb') as segment_file:
+            data = segment_file.read()
+        return zlib.decompress(data) if self.manifest.get('compression') else data
+
+    def _load(self, column_index, segment_index, suffix):
+        path = os.path.join(self.path, f'c{column_index}.s{segment_index}.{suffix}')
+        if self.manifest.get('compression'):
+            return np.load(io.BytesIO(self._read_bytes(path)))
+        return np.load(path, mmap_mode='r')
+
+    def _read_segment(self, entry, column_index, segment_index, start, stop, rows=None):
+        # `rows` picks positions within the slice; text is then decoded for those rows only
+        pick = (lambda array: np.array(array[start:stop])) if rows is None else \
+            (lambda array: np.array(array[start:stop])[rows])
+        kind = entry['kind']
+        if kind == 'numeric':
+            return pd.Series(pick(self._load(column_index, segment_index, 'npy')))
+        if kind == 'masked':
+            values = pick(self._load(column_index, segment_index, 'npy'))
+            valid = pick(self._load(column_index, segment_index, 'valid.npy'))
+            return pd.Series(pd.array(values, dtype=entry['type'])).where(valid, pd.NA)
+        if kind == 'datetime':
+            series = pd.Series(pick(self._load(column_index, segment_index, 'npy')))
+            return series.dt.tz_localize('UTC').dt.tz_convert(entry['tz']) if entry['tz'] else series
+        if kind == 'category':
+            codes = pick(self._load(column_index, segment_index, 'npy'))
+            with open(os.path.join(self.path, f'c{column_index}.s{segment_index}.categories.json')) as categories_file:
+                categories = json.load(categories_file)
+            return pd.Series(pd.Categorical.from_codes(codes, categories=categories))
+
+        offsets = np.array(self._load(column_index, segment_index, 'offsets.npy')[start:stop + 1])
+        valid = np.array(self._load(column_index, segment_index, 'valid.npy')[start:stop])
+        data_path = os.path.join(self.path, f'c{column_index}.s{segment_index}.bin')
+        if self.manifest.get('compression'):
+            data = self._read_bytes(data_path)[int(offsets[0]):int(offsets[-1])]
+        else:
+            with open(data_path, 'rb') as data_file:
+                data_file.seek(int(offsets[0]))
+                data = data_file.read(int(offsets[-1] - offsets[0]))
+        relative = offsets - offsets[0]
+        indices = range(len(valid)) if rows is None else rows
+        values = [data[relative[i]:relative[i + 1]].decode('utf-8') if valid[i] else None
+                  for i in indices]
+        return pd.Series(values, dtype=object)
+
+    def read(self, offset=0, limit=None, columns=None):
+        """
+        Reads a slice of rows for a subset of columns.
+
+        Args:
+        - offset (int, optional): Index of the first row to read.
+        - limit (int, optional): Maximum number of rows to read; None reads to the end.
+        - columns (list, optional): Column names to read; None reads all columns.
+
+        Returns:
+        - pd.DataFrame: The requested rows, indexed from `offset`.
+        """
+        offset = max(0, min(offset, self.row_count))
+        stop = self.row_count if limit is None else min(self.row_count, offset + limit)
+        selected = [(index, entry) for index, entry in enumerate(self.columns)
+                    if columns is None or entry['name'] in columns]
+        missing = set(columns or []) - {entry['name'] for _, entry in selected}
+        if missing:
+            raise KeyError(f"Unknown columns: {', '.join(sorted(missing))}")
+
+        first = int(np.searchsorted(self.segment_starts, offset, side='right') - 1)
+        data = {}
+        for column_index, entry in selected:
+            parts = []
+            segment_index = first
+            while segment_index < len(self.manifest['segments']) and self.segment_starts[segment_index] < stop:
+                segment_start = self.segment_starts[segment_index]
+                start_in_segment = max(offset - segment_start, 0)
+                stop_in_segment = min(stop - segment_start, self.manifest['segments'][segment_index])
+                segment_entry = self._segment_entry(entry, segment_index)
+                part = self._read_segment(segment_entry, column_index, segment_index,
+                                          int(start_in_segment), int(stop_in_segment))
+                parts.append(part if segment_entry is entry else cast_segment(part, entry))
+                segment_index += 1
+            data[entry['name']] = concat_parts(parts, entry)
+        return pd.DataFrame(data).set_axis(
+            pd.RangeIndex(offset, offset + (stop - offset))
+        )
+
+    def column_index(self, name):
+        for index, entry in enumerate(self.columns):
+            if entry['name'] == name:
+                return index
+        raise KeyError(f"Unknown columns: {name}")
+
+    def read_segment(self, name, segment_index, rows=None):
+        """
+        Reads one segment of a column, cast to the column's current type.
+
+        Args:
+        - name (str): The column name.
+        - segment_index (int): The segment to read.
+        - rows (np.ndarray, optional): Positions within the segment to read; the whole segment by default.
+        """
+        column_index = self.column_index(name)
+        entry = self.columns[column_index]
+        segment_entry = self._segment_entry(entry, segment_index)
+        part = self._read_segment(segment_entry, column_index, segment_index, 0,
+                                  self.manifest['segments'][segment_index], rows)
+        return part if segment_entry is entry else cast_segment(part, entry)
+
+    def take(self, positions, columns=None):
+        """
+        Reads the rows at the given positions, in the order given.
+
+        Only the segments holding at least one of the rows are read.
+
+        Args:
+        - positions (np.ndarray): Row positions, in any order.
+        - columns (list, optional): Column names to read; None reads all columns.
+
+        Returns:
+        - pd.DataFrame: The rows, indexed by their positions.
+        """
+        positions = np.asarray(positions, dtype='int64')
+        names = [entry['name'] for entry in self.columns] if columns is None else list(columns)
+        segments = np.searchsorted(self.segment_starts, positions, side='right') - 1
+        # Read segment by segment, then put the rows back in the requested order
+        by_segment = np.argsort(segments, kind='stable')
+        restore = np.argsort(by_segment, kind='stable')
+        data = {}
+        for name in names:
+            entry = self.columns[self.column_index(name)]
+            parts = []
+            for segment_index in np.unique(segments):
+                local = positions[by_segment][segments[by_segment] == segment_index] - self.segment_starts[segment_index]
+                parts.append(self.read_segment(name, int(segment_index), local))
+            data[name] = concat_parts(parts, entry).iloc[restore]
+            data[name] = data[name].reset_index(drop=True)
+        return pd.DataFrame(data, columns=names).set_axis(pd.Index(positions))
+
+
+def concat_parts(parts, entry):
+    if not parts:
+        return pd.Series([], dtype=object if entry['kind'] in ('text', 'category') else entry['type'])
+    if len(parts) == 1:
+        return parts[0].reset_index(drop=True)
+    if entry['kind'] == 'category':
+        # Segments whose categories were all blank or all numbers have non-object categories
+        parts = [part.cat.set_categories(part.cat.categories.astype(object)) for part in parts]
+        return pd.Series(pd.api.types.union_categoricals(parts, ignore_order=True))
+    return pd.concat(parts, ignore_index=True)
+
+
+def open_dataset(root, dataset_id):
+    """
+    Opens a stored dataset by ID.
+
+    Raises:
+    - DatasetNotFound: If no dataset with this ID exists.
+    """
+    return Dataset(os.path.join(root, str(dataset_id)))
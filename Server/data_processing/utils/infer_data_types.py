@@ -1,4 +1,22 @@
+import hashlib
+import logging
+import re
+import threading
+import warnings
+from collections import OrderedDict
+from functools import lru_cache
+
+import numpy as np
 import pandas as pd
+from pandas.tseries.api import guess_datetime_format
+
+from .instrumentation import stage
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:  # pyarrow is optional; dates are then always parsed by pandas
+    pa = None
 
 # List of common date formats to attempt when parsing datetime columns
 common_date_formats = [
@@ -17,39 +35,547 @@ ALLOWED_TYPES = {
     'int', 'int32', 'int64', 'float', 'float32', 'float64', 'datetime', 'bool', 'category', 'object'
 }
 
-def convert_to_datetime_with_formats(series):
+# Integer dtypes tried in order, smallest first, with their inclusive value ranges; uint64
+# only holds the non-negative values above the int64 range
+INTEGER_RANGES = [
+    ('int8', -128, 127),
+    ('int16', -32768, 32767),
+    ('int32', -2147483648, 2147483647),
+    ('int64', -9223372036854775808, 9223372036854775807),
+    ('uint64', 0, 18446744073709551615),
+]
+
+# Largest magnitude that still fits safely into float32
+FLOAT32_LIMIT = 3.4e38
+
+# Columns with fewer distinct values than this share of rows become categories
+CATEGORY_UNIQUE_RATIO = 0.5
+
+# Regex fragments matching what each strftime directive accepts when parsing
+DIRECTIVE_PATTERNS = {
+    '%Y': r'\d{4}',
+    '%y': r'\d{2}',
+    '%m': r'\d{1,2}',
+    '%d': r'\d{1,2}',
+    '%H': r'\d{1,2}',
+    '%I': r'\d{1,2}',
+    '%M': r'\d{1,2}',
+    '%S': r'\d{1,2}',
+    '%f': r'\d{1,9}',
+    '%j': r'\d{1,3}',
+    '%b': r'[A-Za-z]{3}',
+    '%B': r'[A-Za-z]+',
+    '%a': r'[A-Za-z]{3}',
+    '%A': r'[A-Za-z]+',
+    '%p': r'[AaPp][Mm]',
+    '%z': r'(?:Z|[+-]\d{2}:?\d{2})',
+    '%Z': r'[A-Za-z]+',
+    '%%': '%',
+}
+
+# Frames with fewer rows than this are inferred serially; process start-up and transfer cost more than they save
+PARALLEL_MIN_ROWS = 100_000
+
+# Number of non-null values used to score candidate date formats
+DATE_SAMPLE_SIZE = 200
+
+# Maximum number of (schema, column) entries kept in the date format cache
+DATE_FORMAT_CACHE_SIZE = 1024
+
+logger = logging.getLogger(__name__)
+
+_date_format_cache = OrderedDict()
+_date_format_cache_lock = threading.Lock()
+
+
+def schema_fingerprint(columns):
     """
-    Tries to convert a Series to datetime format using a list of common date formats.
+    Builds a stable key for an upload schema from its column names.
+
+    Args:
+    - columns (iterable): The column names of the uploaded file.
+
+    Returns:
+    - str: A short hash identifying the schema.
+    """
+    return hashlib.sha1('\x1f'.join(map(str, columns)).encode('utf-8')).hexdigest()
+
+
+def get_cached_date_format(cache_key):
+    with _date_format_cache_lock:
+        if cache_key not in _date_format_cache:
+            return None
+        _date_format_cache.move_to_end(cache_key)
+        return _date_format_cache[cache_key]
+
+
+def cache_date_format(cache_key, date_format):
+    with _date_format_cache_lock:
+        _date_format_cache[cache_key] = date_format
+        _date_format_cache.move_to_end(cache_key)
+        while len(_date_format_cache) > DATE_FORMAT_CACHE_SIZE:
+            _date_format_cache.popitem(last=False)
+
+
+@lru_cache(maxsize=None)
+def date_format_regex(date_format):
+    """
+    Translates a strftime format into a regex fingerprint of the strings it can parse.
+
+    Args:
+    - date_format (str): The strftime format.
+
+    Returns:
+    - str: A regex that matches strings shaped like the format.
+    """
+    parts = re.split(r'(%.)', date_format)
+    return ''.join(DIRECTIVE_PATTERNS.get(part, '.+?') if part.startswith('%') and len(part) == 2
+                   else re.escape(part) for part in parts)
+
+
+def candidate_date_formats(sample):
+    """
+    Lists the formats worth scoring: the common formats plus those pandas guesses from the sample.
+
+    Args:
+    - sample (pd.Series): Non-null string values from the column.
+
+    Returns:
+    - list: Candidate strftime formats, common formats first.
+    """
+    candidates = list(common_date_formats)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        for value in sample.drop_duplicates().iloc[:5]:
+            for dayfirst in (False, True):
+                guessed = guess_datetime_format(value, dayfirst=dayfirst)
+                if guessed and guessed not in candidates:
+                    candidates.append(guessed)
+    return candidates
+
+
+def date_sample(series, sample_size=DATE_SAMPLE_SIZE):
+    """
+    Draws the seeded sample of non-null values, as stripped strings, that date formats are scored on.
+    """
+    sample = series.dropna()
+    if len(sample) > sample_size:
+        sample = sample.sample(sample_size, random_state=0)
+    return sample.astype(str).str.strip()
+
+
+def date_format_coverage(sample, date_format):
+    """
+    Counts the sampled values a date format parses.
+    """
+    if not sample.str.fullmatch(date_format_regex(date_format)).any():
+        return 0
+    try:
+        return int(pd.to_datetime(sample, format=date_format, errors='coerce').notna().sum())
+    except (ValueError, TypeError):
+        return 0
+
+
+def detect_date_format(series, sample_size=DATE_SAMPLE_SIZE, preferred=None):
+    """
+    Scores all candidate date formats against a small sample and returns the best-covering one.
+
+    Candidates are first filtered with cheap regex fingerprints, and only the formats
+    whose fingerprint matches part of the sample are parsed to measure real coverage.
+
+    Args:
+    - series (pd.Series): The column data to be checked.
+    - sample_size (int, optional): Number of non-null values to score.
+    - preferred (str, optional): A format that wins ties, e.g. the one cached for the column.
+
+    Returns:
+    - str or None: The format that parses the most sampled values, or None if none applies.
+    """
+    sample = date_sample(series, sample_size)
+    if sample.empty:
+        return None
+
+    best_format, best_coverage = None, 0
+    if preferred is not None:
+        best_format, best_coverage = preferred, date_format_coverage(sample, preferred)
+        if not best_coverage:
+            best_format = None
+    for date_format in candidate_date_formats(sample):
+        coverage = date_format_coverage(sample, date_format)
+        if coverage > best_coverage:
+            best_format, best_coverage = date_format, coverage
+    return best_format
+
+
+def parse_dates(series, date_format):
+    """
+    Parses a text column with a known date format, invalid values becoming NaT.
+
+    When pyarrow is available the strings are parsed with Arrow's vectorized `strptime`,
+    which is far faster than pandas' per-value parser. Arrow accepts some values pandas
+    rejects (such as 31/02) and rejects some pandas accepts (such as 1/2 for %d/%m), so
+    every value whose parse does not format back to the original string is parsed again
+    by pandas; the result always matches `pd.to_datetime(..., errors='coerce')`.
+
+    Args:
+    - series (pd.Series): The column data.
+    - date_format (str): The strptime format of the column.
+
+    Returns:
+    - pd.Series: The parsed datetime64 column.
+    """
+    if pa is None or '%z' in date_format or '%Z' in date_format:
+        return pd.to_datetime(series, format=date_format, errors='coerce')
+
+    try:
+        values = pa.array(series.array if isinstance(series.dtype, pd.ArrowDtype) else series, from_pandas=True)
+        if not pa.types.is_string(values.type):
+            return pd.to_datetime(series, format=date_format, errors='coerce')
+        parsed = pc.strptime(values, format=date_format, unit='ns', error_is_null=True)
+        exact = pc.fill_null(pc.equal(pc.strftime(parsed, format=date_format), values), False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+        return pd.to_datetime(series, format=date_format, errors='coerce')
+
+    result = pd.Series(parsed.to_numpy(zero_copy_only=False), index=series.index, dtype='datetime64[ns]')
+    retry = ~exact.to_numpy(zero_copy_only=False) & series.notna().to_numpy()
+    if retry.any():
+        result[retry] = pd.to_datetime(series[retry], format=date_format, errors='coerce')
+    return result
+
+
+def convert_to_datetime_with_formats(series, cache_key=None):
+    """
+    Converts a Series to datetime by parsing it once with its detected date format.
+
+    The format is detected from a sample of the column. When `cache_key` is given, the
+    chosen format is cached so later uploads of the same feed skip detection. The cache is
+    keyed by column names only, so a cached format is trusted only while it parses every
+    sampled value, which no other format could beat; otherwise the format is detected again,
+    keeping the cached one on ties. Feeds with the same headers but, say, month-first dates
+    are then not parsed day-first.
 
     Args:
     - series (pd.Series): The column data to be converted.
+    - cache_key (hashable, optional): Identifies the column, e.g. (schema fingerprint, column name).
 
     Returns:
     - pd.Series: The converted Series with datetime type if successful, or with NaT for unparseable values.
     """
-    for date_format in common_date_formats:
-        try:
-            converted_series = pd.to_datetime(series, format=date_format, errors='coerce')
-            if converted_series.notna().sum() > 0:  # Check if any values were successfully parsed
-                return converted_series
-        except Exception:
-            continue  # Try the next format
-    # Fallback to automatic parsing if all specified formats fail
-    return pd.to_datetime(series, errors='coerce')
+    if pd.api.types.is_datetime64_any_dtype(series.dtype):
+        return series
+    if not (pd.api.types.is_object_dtype(series.dtype) or pd.api.types.is_string_dtype(series.dtype)):
+        return pd.Series(pd.NaT, index=series.index, dtype='datetime64[ns]')
+
+    cached_format = get_cached_date_format(cache_key) if cache_key is not None else None
+    if cached_format is not None:
+        sample = date_sample(series)
+        if len(sample) and date_format_coverage(sample, cached_format) == len(sample):
+            return parse_dates(series, cached_format)
+
+    date_format = detect_date_format(series, preferred=cached_format)
+    if date_format is None:
+        return pd.Series(pd.NaT, index=series.index, dtype='datetime64[ns]')
+    if cache_key is not None and date_format != cached_format:
+        cache_date_format(cache_key, date_format)
+    return parse_dates(series, date_format)
+
+
+class ColumnProfile:
+    """
+    Summary statistics gathered for a column in a single vectorized pass.
+
+    The profile holds everything needed to pick a dtype for the column, so the
+    column only has to be parsed and converted once.
+    """
+
+    def __init__(self, length=0, numeric_count=0, non_integer_count=0,
+                 min_value=np.nan, max_value=np.nan):
+        self.length = length
+        self.numeric_count = numeric_count
+        self.non_integer_count = non_integer_count
+        self.min_value = min_value
+        self.max_value = max_value
+
+    @property
+    def numeric_ratio(self):
+        return self.numeric_count / self.length if self.length else 0.0
+
+    @property
+    def is_integer(self):
+        return self.non_integer_count == 0
+
+
+def coerce_numeric(series):
+    """
+    Parses a column as numbers, turning unparseable values into NaN.
+
+    Arrow-backed results are moved to NumPy, because Arrow keeps NaN and null apart and
+    `fillna` would leave the NaN produced by coercion in place.
+
+    Args:
+    - series (pd.Series): The raw column data.
+
+    Returns:
+    - pd.Series: The numeric column.
+    """
+    numeric_data = pd.to_numeric(series, errors='coerce')
+    if isinstance(numeric_data.dtype, pd.ArrowDtype):
+        numeric_dtype = numeric_data.dtype.numpy_dtype
+        if numeric_dtype.kind not in 'biu' or numeric_data.hasnans:
+            numeric_dtype = np.dtype('float64')
+        numeric_data = pd.Series(numeric_data.to_numpy(dtype=numeric_dtype, na_value=np.nan),
+                                 index=numeric_data.index, name=numeric_data.name)
+    return numeric_data
+
 
-def infer_and_convert_data_types(df, column_types=None, threshold=0.5, chunk_size=1000):
+def profile_numeric(numeric_data):
+    """
+    Profiles a numeric Series with NumPy reductions instead of per-value Python calls.
+
+    Args:
+    - numeric_data (pd.Series): The column after `coerce_numeric`.
+
+    Returns:
+    - ColumnProfile: Parse count, integer-ness and value range of the column.
+    """
+    profile = ColumnProfile(length=len(numeric_data))
+    if isinstance(numeric_data.dtype, np.dtype) and numeric_data.dtype.kind in 'biu':
+        values = numeric_data.to_numpy()
+        profile.numeric_count = len(values)
+    else:
+        values = numeric_data.to_numpy(dtype='float64', na_value=np.nan)
+        values = values[~np.isnan(values)]
+        profile.numeric_count = len(values)
+        with np.errstate(invalid='ignore'):
+            integral = np.isfinite(values) & (np.mod(values, 1) == 0)
+        profile.non_integer_count = int(len(values) - np.count_nonzero(integral))
+
+    if profile.numeric_count:
+        profile.min_value = values.min()
+        profile.max_value = values.max()
+    return profile
+
+
+def nullable_integer_dtype(dtype):
+    """
+    Returns the nullable pandas dtype name for a NumPy integer dtype, e.g. 'Int8' for int8 and 'UInt16' for uint16.
+    """
+    dtype = np.dtype(dtype)
+    return f"{'U' if dtype.kind == 'u' else ''}Int{dtype.itemsize * 8}"
+
+
+def choose_numeric_dtype(profile):
+    """
+    Picks the smallest integer or float dtype that can hold the profiled values.
+
+    Integer columns with missing values get the nullable `Int*` dtype of the same width,
+    so missing values stay missing instead of turning into 0. Integers beyond the 64-bit
+    ranges are kept as float64.
+
+    Args:
+    - profile (ColumnProfile): The profile produced by `profile_numeric`.
+
+    Returns:
+    - str: The name of the chosen dtype.
+    """
+    if profile.is_integer:
+        for name, low, high in INTEGER_RANGES:
+            # The bounds are powers of two once the upper one is made exclusive, so float
+            # profiles of columns with missing values compare exactly too
+            if profile.min_value >= low and profile.max_value < high + 1:
+                return nullable_integer_dtype(name) if profile.numeric_count < profile.length else name
+        return 'float64'
+    if profile.max_value < FLOAT32_LIMIT and profile.min_value > -FLOAT32_LIMIT:
+        return 'float32'
+    return 'float64'
+
+
+def promote_numeric_dtype(dtype, profile):
+    """
+    Returns the narrowest dtype that holds both the values of `dtype` and the profiled values.
+
+    The current dtype is kept whenever the new values fit it, so a column that the memory
+    optimizer made unsigned stays unsigned. Missing values turn an integer dtype nullable.
+
+    Args:
+    - dtype (str): The column's current dtype name, NumPy or nullable integer.
+    - profile (ColumnProfile): The profile of the new values.
+
+    Returns:
+    - str: The name of the promoted dtype.
+    """
+    base = np.dtype(dtype.lower())
+    nullable = dtype != base.name or profile.numeric_count < profile.length
+    if profile.numeric_count:
+        fits = (base.kind in 'iu' and profile.is_integer
+                and np.iinfo(base).min <= profile.min_value and profile.max_value <= np.iinfo(base).max)
+        if not fits:
+            base = np.promote_types(base, choose_numeric_dtype(profile).lower())
+    return nullable_integer_dtype(base) if nullable and base.kind in 'iu' else base.name
+
+
+def convert_numeric(series, threshold=0.5):
+    """
+    Converts a column to its smallest numeric dtype if enough values parse as numbers.
+
+    Args:
+    - series (pd.Series): The raw column data.
+    - threshold (float, optional): The minimum proportion of valid numeric values required to convert a column.
+
+    Returns:
+    - pd.Series or None: The converted column, or None if the column is not numeric.
+    """
+    if pd.api.types.is_datetime64_any_dtype(series.dtype):
+        return None  # Dates already parsed by the reader would otherwise turn into nanosecond integers
+    numeric_data = coerce_numeric(series)
+    profile = profile_numeric(numeric_data)
+    if profile.numeric_ratio < threshold or not profile.numeric_count:
+        return None
+    return numeric_data.astype(choose_numeric_dtype(profile))
+
+
+def convert_categorical(series):
+    """
+    Converts a text column to category or object depending on its cardinality.
+
+    Args:
+    - series (pd.Series): The raw column data.
+
+    Returns:
+    - pd.Series: The column as category if it is highly repetitive, otherwise as object.
+    """
+    unique_count = series.nunique()
+    if len(series) and unique_count / len(series) < CATEGORY_UNIQUE_RATIO:
+        return series.astype('category')
+    return series.astype('object')
+
+
+def infer_column(series, threshold=0.5, cache_key=None):
+    """
+    Infers the type of a single column and converts the whole column once.
+
+    Args:
+    - series (pd.Series): The raw column data.
+    - threshold (float, optional): The minimum proportion of valid numeric values required to convert a column.
+    - cache_key (hashable, optional): Key under which the column's date format is cached.
+
+    Returns:
+    - pd.Series: The converted column.
+    """
+    # Attempt to convert to numeric type
+    numeric_data = convert_numeric(series, threshold)
+    if numeric_data is not None:
+        return numeric_data
+
+    # Attempt to convert to datetime type
+    with stage('dates', rows=len(series), column=series.name):
+        datetime_data = convert_to_datetime_with_formats(series, cache_key=cache_key)
+    if datetime_data.notna().any():
+        return datetime_data
+
+    # Check if column qualifies as category type
+    return convert_categorical(series)
+
+
+def sample_column(series, head_size, sample_size, seed=0):
+    """
+    Takes the first rows of a column plus a seeded random sample of the rest.
+
+    Args:
+    - series (pd.Series): The raw column data.
+    - head_size (int): Number of leading rows to include.
+    - sample_size (int): Number of rows to draw at random from the remaining rows.
+    - seed (int, optional): Seed for the random generator, so repeated uploads pick the same rows.
+
+    Returns:
+    - pd.Series: The sampled rows in their original order, or the whole column if it is small.
+    """
+    if len(series) <= head_size + sample_size:
+        return series
+    rng = np.random.default_rng(seed)
+    tail_positions = rng.choice(len(series) - head_size, size=sample_size, replace=False)
+    positions = np.concatenate([np.arange(head_size), head_size + np.sort(tail_positions)])
+    return series.iloc[positions]
+
+
+def verify_candidate(series, candidate, threshold=0.5, cache_key=None):
+    """
+    Checks a dtype picked from a sample against the full column in one vectorized pass.
+
+    Args:
+    - series (pd.Series): The raw column data.
+    - candidate (pd.Series): The sample converted by `infer_column`.
+    - threshold (float, optional): The minimum proportion of valid numeric values required to convert a column.
+    - cache_key (hashable, optional): Key under which the column's date format is cached.
+
+    Returns:
+    - pd.Series or None: The converted column, or None if the candidate does not hold for the full column.
+    """
+    if pd.api.types.is_numeric_dtype(candidate.dtype):
+        # The numeric profile of the full column also picks the final width
+        return convert_numeric(series, threshold)
+
+    if pd.api.types.is_datetime64_any_dtype(candidate.dtype):
+        datetime_data = convert_to_datetime_with_formats(series, cache_key=cache_key)
+        return datetime_data if datetime_data.notna().any() else None
+
+    converted = convert_categorical(series)
+    return converted if converted.dtype == candidate.dtype else None
+
+
+def infer_column_from_sample(series, threshold=0.5, head_size=1000, sample_size=10000, seed=0, cache_key=None):
+    """
+    Picks a candidate dtype from a sample and falls back to the full profiler only if it fails.
+
+    Args:
+    - series (pd.Series): The raw column data.
+    - threshold (float, optional): The minimum proportion of valid numeric values required to convert a column.
+    - head_size (int, optional): Number of leading rows included in the sample.
+    - sample_size (int, optional): Number of randomly drawn rows included in the sample.
+    - seed (int, optional): Seed for the random sample.
+    - cache_key (hashable, optional): Key under which the column's date format is cached.
+
+    Returns:
+    - pd.Series: The converted column.
+    """
+    sample = sample_column(series, head_size, sample_size, seed)
+    if len(sample) == len(series):
+        return infer_column(series, threshold, cache_key)
+
+    candidate = infer_column(sample, threshold, cache_key)
+    converted = verify_candidate(series, candidate, threshold, cache_key)
+    if converted is None:
+        converted = infer_column(series, threshold, cache_key)
+    return converted
+
+
+def infer_and_convert_data_types(df, column_types=None, threshold=0.5, chunk_size=None, sample_size=None, seed=0,
+                                 max_workers=None, parallel_min_rows=PARALLEL_MIN_ROWS, head_size=1000):
     """
     Infers and converts data types for columns in a DataFrame, suitable for large datasets.
 
+    Each column is profiled once with vectorized operations and then converted in a
+    single step, so the cost grows linearly with the number of rows. When `sample_size`
+    is set, the dtype is picked from a sample and only verified against the full column.
+    With `max_workers` above one, large frames are inferred across a process pool.
+
     Args:
     - df (pd.DataFrame): The DataFrame to be processed.
     - column_types (dict, optional): A dictionary specifying user-defined types for columns.
     - threshold (float, optional): The minimum proportion of valid numeric values required to convert a column.
-    - chunk_size (int, optional): The size of data chunks to process at a time to reduce memory usage.
+    - chunk_size (int, optional): Deprecated and ignored; columns are no longer processed chunk by chunk.
+    - sample_size (int, optional): Number of randomly drawn rows used to pick a candidate dtype; None profiles every row.
+    - seed (int, optional): Seed for the random sample.
+    - max_workers (int, optional): Number of worker processes for column inference; None or 1 runs serially.
+    - parallel_min_rows (int, optional): Frames with fewer rows stay on the serial path.
+    - head_size (int, optional): Number of leading rows included in the sample when `sample_size` is set.
 
     Returns:
     - pd.DataFrame: The DataFrame with inferred and converted data types.
     """
+    if chunk_size is not None:
+        warnings.warn('chunk_size is ignored; columns are converted in one pass', DeprecationWarning, stacklevel=2)
+
     # Apply user-specified data types first
     if column_types:
         for col, dtype in column_types.items():
@@ -57,100 +583,39 @@ def infer_and_convert_data_types(df, column_types=None, threshold=0.5, chunk_siz
                 date_format = dtype.get('format', None)
                 try:
                     df[col] = pd.to_datetime(df[col], format=date_format, errors='coerce')
-                    print(f"Column '{col}' converted to datetime with format '{date_format}'.")
+                    logger.debug("Converted column to datetime", extra={'column': col, 'format': date_format})
                 except Exception as e:
-                    print(f"Could not convert column '{col}' to datetime with format '{date_format}': {e}")
+                    logger.warning("Could not convert column to datetime",
+                                   extra={'column': col, 'format': date_format, 'error': str(e)})
                     df[col] = df[col].astype('object')
             elif dtype in ALLOWED_TYPES:
                 try:
                     df[col] = df[col].astype(dtype)
                 except Exception as e:
-                    print(f"Could not convert column '{col}' to '{dtype}': {e}")
+                    logger.warning("Could not convert column to the requested type",
+                                   extra={'column': col, 'dtype': dtype, 'error': str(e)})
                     df[col] = df[col].astype('object')
 
     # Automatically infer types for columns not specified by the user
-    for col in df.columns:
-        if column_types and col in column_types:
-            continue
-
-        # Check if chunking is necessary
-        if len(df) > chunk_size:
-            for start in range(0, len(df), chunk_size):
-                chunk = df.loc[start:start + chunk_size, col]
-
-                # Attempt to convert to numeric type
-                numeric_data = pd.to_numeric(chunk, errors='coerce')
-                if numeric_data.notna().sum() / len(chunk) >= threshold:
-                    if numeric_data.dropna().apply(lambda x: isinstance(x, float) and x.is_integer()).all():
-                        numeric_data = numeric_data.fillna(0)
-                        max_val = numeric_data.max()
-                        min_val = numeric_data.min()
-                        if min_val >= -128 and max_val <= 127:
-                            df.loc[start:start + chunk_size, col] = numeric_data.astype('int8')
-                        elif min_val >= -32768 and max_val <= 32767:
-                            df.loc[start:start + chunk_size, col] = numeric_data.astype('int16')
-                        elif min_val >= -2147483648 and max_val <= 2147483647:
-                            df.loc[start:start + chunk_size, col] = numeric_data.astype('int32')
-                        else:
-                            df.loc[start:start + chunk_size, col] = numeric_data.astype('int64')
-                    else:
-                        if numeric_data.max() < 3.4e38 and numeric_data.min() > -3.4e38:
-                            df.loc[start:start + chunk_size, col] = numeric_data.astype('float32')
-                        else:
-                            df.loc[start:start + chunk_size, col] = numeric_data.astype('float64')
-                    continue
-
-                # Attempt to convert to datetime type
-                datetime_data = convert_to_datetime_with_formats(chunk)
-                if datetime_data.notna().sum() > 0:
-                    df.loc[start:start + chunk_size, col] = datetime_data
-                    continue
-
-                # Check if column qualifies as category type
-                unique_ratio = chunk.nunique() / len(chunk)
-                if unique_ratio < 0.1:
-                    df.loc[start:start + chunk_size, col] = chunk.astype('category')
-                else:
-                    df.loc[start:start + chunk_size, col] = chunk.astype('object')
-        else:
-            # Process the entire column directly if chunking is not needed
-            chunk = df[col]
-
-            # Attempt to convert to numeric type
-            numeric_data = pd.to_numeric(chunk, errors='coerce')
-            if numeric_data.notna().sum() / len(chunk) >= threshold:
-                if numeric_data.dropna().apply(lambda x: isinstance(x, (int, float)) and float(x).is_integer()).all():
-                    numeric_data = numeric_data.fillna(0)
-                    max_val = numeric_data.max()
-                    min_val = numeric_data.min()
-                    if min_val >= -128 and max_val <= 127:
-                        df[col] = numeric_data.astype('int8')
-                    elif min_val >= -32768 and max_val <= 32767:
-                        df[col] = numeric_data.astype('int16')
-                    elif min_val >= -2147483648 and max_val <= 2147483647:
-                        df[col] = numeric_data.astype('int32')
-                    else:
-                        df[col] = numeric_data.astype('int64')
-                else:
-                    if numeric_data.max() < 3.4e38 and numeric_data.min() > -3.4e38:
-                        df[col] = numeric_data.astype('float32')
-                    else:
-                        df[col] = numeric_data.astype('float64')
-                continue
-
-            # Attempt to convert to datetime type
-            datetime_data = convert_to_datetime_with_formats(chunk)
-            if datetime_data.notna().sum() > 0:
-                df[col] = datetime_data
-                continue
-
-            # Check if column qualifies as category type
-            unique_ratio = chunk.nunique() / len(chunk)
-            print(f"Unique ratio for column '{col}': {unique_ratio}")
-            if unique_ratio < 0.5:
-                df[col] = chunk.astype('category')
+    schema_key = schema_fingerprint(df.columns)
+    columns = [col for col in df.columns if not (column_types and col in column_types)]
+    cache_keys = {col: (schema_key, col) for col in columns}
+
+    if max_workers and max_workers > 1 and len(columns) > 1 and len(df) >= parallel_min_rows:
+        from .parallel_inference import infer_columns_parallel
+        with stage('infer', rows=len(df)):
+            return infer_columns_parallel(df, columns, cache_keys, max_workers, threshold=threshold,
+                                          sample_size=sample_size, head_size=head_size, seed=seed)
+
+    for col in columns:
+        cache_key = cache_keys[col]
+        with stage('infer', rows=len(df), column=col) as fields:
+            if sample_size:
+                df[col] = infer_column_from_sample(df[col], threshold=threshold, head_size=head_size,
+                                                   sample_size=sample_size, seed=seed, cache_key=cache_key)
             else:
-                df[col] = chunk.astype('object')
+                df[col] = infer_column(df[col], threshold=threshold, cache_key=cache_key)
+            fields['dtype'] = str(df[col].dtype)
 
     return df
 
@@ -0,0 +1,591 @@
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+from pandas.api.types import union_categoricals
+
+from .infer_data_types import (
+    coerce_numeric, get_cached_date_format, infer_and_convert_data_types, nullable_integer_dtype, parse_dates,
+    profile_numeric, promote_numeric_dtype, schema_fingerprint,
+)
+from .instrumentation import stage, timed_chunks
+from .parallel_inference import get_executor
+
+try:
+    import pyarrow as pa
+except ImportError:  # pyarrow is optional; only the C parser is then available
+    pa = None
+
+# Number of CSV rows parsed and converted at a time by the streaming reader
+CHUNK_ROWS = 100_000
+
+# CSV parsing backends accepted by `read_csv_streaming`
+CSV_ENGINES = ('c', 'pyarrow')
+
+# Largest CSV the pyarrow engine parses in one pass; larger files, or files of unknown size, are
+# read by the chunked C parser, so picking the engine cannot get around the bounded memory
+PYARROW_MAX_BYTES = 64 * 1024 * 1024
+
+
+class SheetNotFound(ValueError):
+    pass
+
+
+def schema_from_frame(df):
+    """
+    Describes the dtypes of an inferred DataFrame in the same shape as `column_types`.
+
+    Datetime columns carry the date format that inference detected for them, so later
+    chunks of the same upload can be parsed with that format directly.
+
+    Args:
+    - df (pd.DataFrame): A DataFrame returned by `infer_and_convert_data_types`.
+
+    Returns:
+    - dict: Column name to {'type': dtype name} or {'type': 'datetime', 'format': date format}.
+    """
+    schema_key = schema_fingerprint(df.columns)
+    schema = {}
+    for col in df.columns:
+        if pd.api.types.is_datetime64_any_dtype(df[col].dtype):
+            schema[col] = {'type': 'datetime', 'format': get_cached_date_format((schema_key, col))}
+        else:
+            schema[col] = {'type': str(df[col].dtype)}
+    return schema
+
+
+def is_numeric_type(dtype_name):
+    return dtype_name.startswith(('int', 'uint', 'float', 'Int', 'UInt'))
+
+
+def convert_chunk_column(series, spec, counts, threshold=0.5):
+    """
+    Converts one column of a later chunk to the schema dtype, widening the schema if the values no longer fit.
+
+    Integer columns that overflow move to a wider integer, integer columns that gain
+    fractions become floats, and numeric columns whose overall parse rate drops below
+    `threshold` fall back to object.
+
+    Args:
+    - series (pd.Series): The raw column data of the chunk.
+    - spec (dict): The column's schema entry; updated in place when the dtype widens.
+    - counts (dict): Running 'rows' and 'numeric' totals for numeric columns; updated in place.
+    - threshold (float, optional): The minimum proportion of valid numeric values required to keep a column numeric.
+
+    Returns:
+    - pd.Series: The converted column.
+    """
+    dtype = spec['type']
+    if is_numeric_type(dtype):
+        numeric_data = coerce_numeric(series)
+        profile = profile_numeric(numeric_data)
+        counts['rows'] += profile.length
+        counts['numeric'] += profile.numeric_count
+        if counts['numeric'] < threshold * counts['rows']:
+            spec['type'] = 'object'
+            return series.astype('object')
+        spec['type'] = dtype = promote_numeric_dtype(dtype, profile)
+        return numeric_data.astype(dtype)
+
+    if dtype == 'datetime':
+        if spec.get('format') is None:
+            return pd.to_datetime(series, errors='coerce')
+        return parse_dates(series, spec['format'])
+
+    try:
+        return series.astype(dtype)
+    except (ValueError, TypeError):
+        spec['type'] = 'object'
+        return series.astype('object')
+
+
+def concat_chunks(chunks, schema):
+    """
+    Joins converted chunks column by column, casting earlier chunks to any widened dtype.
+
+    Args:
+    - chunks (list): Converted DataFrames in file order.
+    - schema (dict): The final schema after all chunks were converted.
+
+    Returns:
+    - pd.DataFrame: The full DataFrame with a fresh RangeIndex.
+    """
+    if len(chunks) == 1:
+        return chunks[0].reset_index(drop=True)
+
+    data = {}
+    for col, spec in schema.items():
+        parts = [chunk[col] for chunk in chunks]
+        dtype = spec['type']
+        if dtype == 'category':
+            # A blank or numbers-only chunk has float or int categories, which cannot be unioned with text
+            parts = [part.cat.set_categories(part.cat.categories.astype(object)) for part in parts]
+            data[col] = pd.Series(union_categoricals(parts, ignore_order=True), name=col)
+            continue
+        if dtype != 'datetime':
+            parts = [part if str(part.dtype) == dtype else part.astype(dtype) for part in parts]
+        data[col] = pd.concat(parts, ignore_index=True)
+    # Passing `columns=` here would send datetime columns through a slow object-dtype reindex
+    return pd.DataFrame(data)
+
+
+def unify_column_types(specs):
+    """
+    Picks the schema entry of a column that holds the values of every file it came from.
+
+    Numeric columns widen to the smallest dtype holding all of them (int8 and int16 give
+    int16, integers and floats give a float), staying nullable if any input was; dates keep
+    their format when all inputs agree on it; anything else that differs becomes object.
+
+    Args:
+    - specs (list): The column's schema entries, one per file.
+
+    Returns:
+    - dict: The unified schema entry.
+    """
+    types = {spec['type'] for spec in specs}
+    if len(types) == 1:
+        if types == {'datetime'}:
+            formats = {spec.get('format') for spec in specs}
+            return {'type': 'datetime', 'format': formats.pop() if len(formats) == 1 else None}
+        return dict(specs[0])
+    if all(is_numeric_type(dtype) for dtype in types):
+        dtypes = [pd.api.types.pandas_dtype(dtype) for dtype in types]
+        common = np.result_type(*[getattr(dtype, 'numpy_dtype', dtype) for dtype in dtypes])
+        if common.kind in 'iu' and any(not isinstance(dtype, np.dtype) for dtype in dtypes):
+            return {'type': nullable_integer_dtype(common)}
+        return {'type': str(common)}
+    return {'type': 'object'}
+
+
+def unify_schemas(schemas):
+    """
+    Unifies the schemas of files with the same columns, in the column order of the first one.
+
+    Args:
+    - schemas (list): Schema entries as returned by `schema_from_frame`, one per file.
+
+    Returns:
+    - dict: Column name to the entry from `unify_column_types`; pass it to `concat_chunks`
+      to join the files' frames.
+    """
+    return {col: unify_column_types([schema[col] for schema in schemas]) for col in schemas[0]}
+
+
+def available_csv_engines():
+    """
+    Returns the CSV parsing backends usable in this environment.
+    """
+    return CSV_ENGINES if pa is not None else ('c',)
+
+
+def dtype_hints(schema):
+    """
+    Maps a stored schema to `read_csv` dtypes so known columns are parsed straight into numbers or categories.
+
+    Floats are read as float64 and categories as categories; `convert_chunk_column` then
+    narrows them to the schema dtype. Integer columns are not hinted: both parsers read
+    clean integers natively, while a nullable Int64 hint makes the C parser go through
+    strings. Dates and text are left to the parser.
+
+    Args:
+    - schema (dict): Schema entries as returned by `schema_from_frame`.
+
+    Returns:
+    - dict: Column name to dtype accepted by `pd.read_csv`.
+    """
+    hints = {}
+    for col, spec in schema.items():
+        if spec['type'].lower().startswith('float'):
+            hints[col] = 'float64'
+        elif spec['type'] == 'category':
+            hints[col] = 'category'
+    return hints
+
+
+def normalize_arrow_frame(df):
+    """
+    Converts date and timestamp columns parsed by the pyarrow engine to datetime64, the dtype inference produces.
+    """
+    for col in df.columns:
+        dtype = df[col].dtype
+        if isinstance(dtype, pd.ArrowDtype) and pa.types.is_temporal(dtype.pyarrow_dtype):
+            df[col] = df[col].astype('datetime64[ns]')
+    return df
+
+
+def csv_size(file):
+    """
+    Returns the size in bytes (characters for text buffers) of a CSV given as a path or file, or None if unknown.
+    """
+    if isinstance(file, (str, os.PathLike)):
+        return os.path.getsize(file)
+    size = getattr(file, 'size', None)
+    if size is not None:
+        return size
+    if hasattr(file, 'seekable') and file.seekable():
+        position = file.tell()
+        size = file.seek(0, os.SEEK_END) - position
+        file.seek(position)
+        return size
+    return None
+
+
+def iter_csv_chunks(file, engine='c', chunksize=CHUNK_ROWS, dtype=None):
+    """
+    Parses a CSV with the chosen backend and yields it as DataFrame chunks.
+
+    The C parser yields `chunksize` rows at a time. The pyarrow engine parses the whole file
+    with multiple threads into Arrow-backed columns and yields it as a single chunk; files
+    larger than PYARROW_MAX_BYTES are read by the C parser instead. (pyarrow's own block reader
+    fixes the column types from the first block, so it cannot widen columns as later chunks require.)
+
+    Raises:
+    - ValueError: If the engine is unknown or unavailable.
+    """
+    if engine not in available_csv_engines():
+        raise ValueError(f"Unsupported CSV engine: {engine}")
+    if engine == 'pyarrow':
+        size = csv_size(file)
+        if size is not None and size <= PYARROW_MAX_BYTES:
+            yield normalize_arrow_frame(pd.read_csv(file, engine='pyarrow', dtype_backend='pyarrow', dtype=dtype))
+            return
+    yield from pd.read_csv(file, chunksize=chunksize, dtype=dtype)
+
+
+def read_csv_with_schema(file, schema, engine='c', chunksize=CHUNK_ROWS, threshold=0.5, progress=None,
+                         hints=True, statistics=None):
+    """
+    Reads a CSV whose schema is already known, converting every chunk straight into the schema dtypes.
+
+    Args:
+    - file (file-like or str): The CSV to read.
+    - schema (dict): Schema entries as returned by `schema_from_frame`; copied, not modified.
+    - engine (str, optional): The parsing backend.
+    - chunksize (int, optional): Number of rows parsed per chunk by the C parser.
+    - threshold (float, optional): The minimum proportion of valid numeric values required to keep a column numeric.
+    - progress (callable, optional): Called with the number of rows converted so far after each chunk.
+    - hints (bool, optional): Whether to pass the schema to the parser as dtypes.
+    - statistics (FrameStatistics, optional): Collects column statistics from the converted chunks.
+
+    Returns:
+    - tuple: (pd.DataFrame with converted data types, the schema, widened where the data required it).
+    """
+    chunks = iter_csv_chunks(file, engine, chunksize, dtype_hints(schema) if hints else None)
+    return convert_chunks(chunks, schema, threshold, progress, statistics)
+
+
+def collect_statistics(statistics, chunk):
+    if statistics is not None:
+        with stage('statistics', rows=len(chunk)):
+            statistics.update(chunk)
+
+
+def convert_chunks(chunks, schema, threshold=0.5, progress=None, statistics=None):
+    """
+    Converts raw chunks straight into the dtypes of a known schema, widening columns whose values no longer fit.
+
+    Args:
+    - chunks (iterable): Raw DataFrames with the schema's columns.
+    - schema (dict): Schema entries as returned by `schema_from_frame`; copied, not modified.
+    - threshold (float, optional): The minimum proportion of valid numeric values required to keep a column numeric.
+    - progress (callable, optional): Called with the number of rows converted so far after each chunk.
+    - statistics (FrameStatistics, optional): Collects column statistics from the converted chunks.
+
+    Returns:
+    - tuple: (pd.DataFrame with converted data types, the schema, widened where the data required it).
+
+    Raises:
+    - ValueError: If the columns do not match the schema or there are no columns.
+    """
+    schema = {col: dict(spec) for col, spec in schema.items()}
+    counts = {col: {'rows': 0, 'numeric': 0} for col in schema}
+    converted = []
+    rows = 0
+    for chunk in timed_chunks(chunks):
+        missing = set(chunk.columns) ^ set(schema)
+        if missing:
+            raise ValueError(f"Columns do not match the schema: {', '.join(sorted(map(str, missing)))}")
+        with stage('convert', rows=len(chunk)):
+            converted.append(pd.DataFrame({
+                col: convert_chunk_column(chunk[col], schema[col], counts[col], threshold=threshold)
+                for col in chunk.columns
+            }))
+        collect_statistics(statistics, converted[-1])
+        rows += len(chunk)
+        if progress:
+            progress(rows)
+    if not converted:
+        raise ValueError("No columns to parse from file")
+    with stage('concat', rows=rows):
+        return concat_chunks(converted, schema), schema
+
+
+def read_csv_streaming(file, chunksize=CHUNK_ROWS, schema_rows=None, column_types=None, threshold=0.5,
+                       progress=None, engine='c', schema=None, statistics=None, **infer_kwargs):
+    """
+    Reads a CSV in chunks, inferring the schema from the first rows and converting later chunks as they arrive.
+
+    Only one raw chunk is held in memory at a time; every chunk is converted to its compact
+    dtypes before the next one is parsed, so the full object-typed frame is never built.
+    When `schema` is given, inference is skipped and the parser receives dtype hints; if the
+    file no longer parses with those hints it is read again without them.
+
+    Args:
+    - file (file-like or str): The CSV to read.
+    - chunksize (int, optional): Number of rows parsed per chunk.
+    - schema_rows (int, optional): Number of leading rows used to infer the schema; defaults to one chunk.
+    - column_types (dict, optional): A dictionary specifying user-defined types for columns.
+    - threshold (float, optional): The minimum proportion of valid numeric values required to convert a column.
+    - progress (callable, optional): Called with the number of rows converted so far after each chunk.
+    - engine (str, optional): CSV parsing backend, one of `CSV_ENGINES`.
+    - schema (dict, optional): A previously inferred schema, e.g. of an earlier upload of the same feed.
+    - statistics (FrameStatistics, optional): Collects column statistics from the converted chunks.
+    - **infer_kwargs: Further options passed to `infer_and_convert_data_types`.
+
+    Returns:
+    - tuple: (pd.DataFrame with converted data types, schema dict as returned by `schema_from_frame`).
+    """
+    if schema is not None:
+        schema = dict(schema)
+        for col, dtype in (column_types or {}).items():
+            if isinstance(dtype, dict) and col in schema:
+                schema[col] = dict(dtype)
+        try:
+            return read_csv_with_schema(file, schema, engine, chunksize, threshold, progress,
+                                        statistics=statistics)
+        except (ValueError, TypeError, OverflowError):
+            # The feed no longer fits the hinted dtypes; parse it as text and widen the schema instead
+            if hasattr(file, 'seek'):
+                file.seek(0)
+            if statistics is not None:
+                statistics.clear()
+            return read_csv_with_schema(file, schema, engine, chunksize, threshold, progress, hints=False,
+                                        statistics=statistics)
+
+    chunks = iter_csv_chunks(file, engine, chunksize)
+    return read_chunks_streaming(chunks, schema_rows=schema_rows or chunksize, column_types=column_types,
+                                 threshold=threshold, progress=progress, statistics=statistics, **infer_kwargs)
+
+
+def read_chunks_streaming(chunks, schema_rows, column_types=None, threshold=0.5, progress=None, statistics=None,
+                          **infer_kwargs):
+    """
+    Infers the schema from the leading raw chunks and converts later chunks as they arrive.
+
+    Args:
+    - chunks (iterable): Raw DataFrames with the same columns, in row order; consumed once.
+    - schema_rows (int): Number of leading rows used to infer the schema.
+    - column_types (dict, optional): A dictionary specifying user-defined types for columns.
+    - threshold (float, optional): The minimum proportion of valid numeric values required to convert a column.
+    - progress (callable, optional): Called with the number of rows converted so far after each chunk.
+    - statistics (FrameStatistics, optional): Collects column statistics from the converted chunks.
+    - **infer_kwargs: Further options passed to `infer_and_convert_data_types`.
+
+    Returns:
+    - tuple: (pd.DataFrame with converted data types, schema dict as returned by `schema_from_frame`).
+    """
+    reader = timed_chunks(chunks)
+
+    # Infer the schema from the leading chunks
+    head_chunks = []
+    for chunk in reader:
+        head_chunks.append(chunk)
+        if sum(len(head) for head in head_chunks) >= schema_rows:
+            break
+    head = pd.concat(head_chunks, ignore_index=True) if len(head_chunks) > 1 else head_chunks[0]
+    raw_columns = dict(head.items())  # Inference replaces the columns of `head` in place
+    inferred = infer_and_convert_data_types(head, column_types=column_types, threshold=threshold, **infer_kwargs)
+    schema = schema_from_frame(inferred)
+    for col, dtype in (column_types or {}).items():
+        if isinstance(dtype, dict) and col in schema:
+            schema[col] = dict(dtype)
+    # Running parse counts are only consulted for numeric columns, which may fall back to object later
+    counts = {
+        col: {'rows': len(inferred),
+              'numeric': coerce_numeric(raw_columns[col]).notna().sum()
+              if is_numeric_type(schema[col]['type']) else 0}
+        for col in inferred.columns
+    }
+    converted = [inferred]
+    collect_statistics(statistics, inferred)
+    rows = len(inferred)
+    del head_chunks, head, raw_columns
+    if progress:
+        progress(rows)
+
+    # Convert the remaining chunks straight into the schema dtypes
+    for chunk in reader:
+        with stage('convert', rows=len(chunk)):
+            converted.append(pd.DataFrame({
+                col: convert_chunk_column(chunk[col], schema[col], counts[col], threshold=threshold)
+                for col in chunk.columns
+            }))
+        collect_statistics(statistics, converted[-1])
+        rows += len(chunk)
+        if progress:
+            progress(rows)
+
+    with stage('concat', rows=rows):
+        return concat_chunks(converted, schema), schema
+
+
+def excel_header(row):
+    """
+    Names header cells the way `pd.read_excel` does: blanks become 'Unnamed: i' and repeats get a '.n' suffix.
+    """
+    names = []
+    seen = {}
+    for i, value in enumerate(row):
+        name = f'Unnamed: {i}' if value is None else value
+        if name in seen:
+            seen[name] += 1
+            name = f'{name}.{seen[name]}'
+        seen.setdefault(name, 0)
+        names.append(name)
+    return names
+
+
+def open_worksheet(workbook, sheet_name):
+    """
+    Looks a worksheet up by name or 0-based position.
+
+    Raises:
+    - SheetNotFound: If the workbook has no such sheet.
+    """
+    if isinstance(sheet_name, int):
+        if not 0 <= sheet_name < len(workbook.worksheets):
+            raise SheetNotFound(f"Worksheet index {sheet_name} is out of range")
+        return workbook.worksheets[sheet_name]
+    if sheet_name not in workbook.sheetnames:
+        raise SheetNotFound(f"Worksheet named '{sheet_name}' not found")
+    return workbook[sheet_name]
+
+
+def iter_excel_chunks(file, sheet_name=0, chunksize=CHUNK_ROWS):
+    """
+    Streams a worksheet in read-only mode and yields it as DataFrame chunks.
+
+    openpyxl's read-only mode parses the sheet XML lazily, so only `chunksize` rows of
+    Python values exist at a time; each batch is turned into typed column arrays before
+    the next one is read. Fully empty rows are skipped like `pd.read_excel` does.
+
+    Args:
+    - file (file-like or str): The .xlsx workbook.
+    - sheet_name (str or int, optional): Sheet name or 0-based position.
+    - chunksize (int, optional): Number of rows per chunk.
+
+    Yields:
+    - pd.DataFrame: The next rows of the sheet, with the first row as header.
+    """
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        rows = open_worksheet(workbook, sheet_name).iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            yield pd.DataFrame()
+            return
+        columns = excel_header(header)
+        width = len(columns)
+
+        batch = []
+        yielded = False
+        for row in rows:
+            if all(value is None for value in row):
+                continue
+            batch.append(row[:width] + (None,) * (width - len(row)))
+            if len(batch) >= chunksize:
+                yield pd.DataFrame.from_records(batch, columns=columns)
+                batch, yielded = [], True
+        if batch or not yielded:
+            yield pd.DataFrame.from_records(batch, columns=columns)
+    finally:
+        workbook.close()
+
+
+def read_excel_streaming(file, sheet_name=0, chunksize=CHUNK_ROWS, schema_rows=None, column_types=None,
+                         threshold=0.5, progress=None, schema=None, statistics=None, **infer_kwargs):
+    """
+    Reads one worksheet in batches and infers its types with the same incremental inference as CSV uploads.
+
+    Peak memory depends on `chunksize` and the converted result, not on the size of the workbook.
+
+    Args:
+    - file (file-like or str): The .xlsx workbook.
+    - sheet_name (str or int, optional): Sheet name or 0-based position.
+    - chunksize (int, optional): Number of rows read per batch.
+    - schema_rows (int, optional): Number of leading rows used to infer the schema; defaults to one batch.
+    - column_types (dict, optional): A dictionary specifying user-defined types for columns.
+    - threshold (float, optional): The minimum proportion of valid numeric values required to convert a column.
+    - progress (callable, optional): Called with the number of rows converted so far after each batch.
+    - schema (dict, optional): A previously inferred schema; inference is skipped and the batches are converted to it.
+    - statistics (FrameStatistics, optional): Collects column statistics from the converted batches.
+    - **infer_kwargs: Further options passed to `infer_and_convert_data_types`.
+
+    Returns:
+    - tuple: (pd.DataFrame with converted data types, schema dict as returned by `schema_from_frame`).
+
+    Raises:
+    - SheetNotFound: If the workbook has no such sheet.
+    """
+    chunks = iter_excel_chunks(file, sheet_name, chunksize)
+    if schema is not None:
+        chunks = (chunk.rename(columns=str) for chunk in chunks)
+        return convert_chunks(chunks, schema, threshold, progress, statistics)
+    return read_chunks_streaming(chunks, schema_rows=schema_rows or chunksize, column_types=column_types,
+                                 threshold=threshold, progress=progress, statistics=statistics, **infer_kwargs)
+
+
+def excel_sheet_names(file):
+    workbook = load_workbook(file, read_only=True)
+    try:
+        return list(workbook.sheetnames)
+    finally:
+        workbook.close()
+
+
+def read_excel_sheets(file, sheet_names=None, max_workers=1, **read_kwargs):
+    """
+    Reads several worksheets of a workbook, in parallel worker processes when `max_workers` > 1.
+
+    Each worker opens the workbook itself and streams its own sheet, so sheets are parsed
+    side by side; inference inside a worker stays serial.
+
+    Args:
+    - file (file-like or str): The .xlsx workbook.
+    - sheet_names (list, optional): Sheet names or positions to read; all sheets by default.
+    - max_workers (int, optional): Number of worker processes; a single sheet uses them for inference instead.
+    - **read_kwargs: Further options passed to `read_excel_streaming`.
+
+    Returns:
+    - dict: Sheet name to (pd.DataFrame, schema) tuples, in the requested order.
+
+    Raises:
+    - SheetNotFound: If the workbook has no such sheet.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        # Worker processes need a path; copy file objects to disk once
+        if not isinstance(file, (str, os.PathLike)):
+            path = os.path.join(tmp, 'workbook.xlsx')
+            with open(path, 'wb') as workbook_file:
+                shutil.copyfileobj(file, workbook_file)
+            file = path
+
+        names = excel_sheet_names(file)
+        selected = names if sheet_names is None else sheet_names
+        for sheet in selected:
+            if not (sheet in names or isinstance(sheet, int) and 0 <= sheet < len(names)):
+                raise SheetNotFound(f"Worksheet '{sheet}' not found")
+        selected = [names[sheet] if isinstance(sheet, int) else sheet for sheet in selected]
+
+        if max_workers <= 1 or len(selected) <= 1:
+            return {sheet: read_excel_streaming(file, sheet, max_workers=max_workers, **read_kwargs)
+                    for sheet in selected}
+
+        read_kwargs.update(max_workers=1, progress=None)
+        executor = get_executor(max_workers)
+        futures = {sheet: executor.submit(read_excel_streaming, file, sheet, **read_kwargs) for sheet in selected}
+        return {sheet: future.result() for sheet, future in futures.items()}
@@ -0,0 +1,324 @@
+import bisect
+import contextvars
+import datetime
+import json
+import logging
+import os
+import resource
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+
+MB = 1024 * 1024
+
+# Upper bounds, in seconds, of the latency histogram buckets; a final bucket holds everything slower
+HISTOGRAM_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_current_trace = contextvars.ContextVar('data_processing_trace', default=None)
+
+
+class Trace:
+    """
+    Timings collected while one request or job runs.
+
+    Stages are recorded as they finish, so nested stages ('dates' inside 'infer') appear
+    separately and are not subtracted from their parent. When tracemalloc is tracing,
+    every stage also records the peak memory allocated while it ran; tracemalloc is
+    process-wide, so concurrent requests inflate each other's peaks.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.started = time.perf_counter()
+        self.stages = []
+        self.columns = {}
+        self._peak_stack = []
+
+    def record(self, name, seconds, rows=None, column=None, peak_mb=None, **fields):
+        entry = {'stage': name, 'seconds': seconds}
+        if rows is not None:
+            entry['rows'] = rows
+            entry['rows_per_second'] = rows / seconds if seconds > 0 else None
+        if column is not None:
+            entry['column'] = str(column)
+            totals = self.columns.setdefault(str(column), {})
+            totals[name] = totals.get(name, 0.0) + seconds
+            totals.update(fields)
+        if peak_mb is not None:
+            entry['peak_mb'] = peak_mb
+        self.stages.append(entry)
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def totals(self):
+        """
+        Sums the recorded stages by name, in the order each stage first ran.
+
+        Per-column stages see the same rows once per column, so their row count is the
+        largest one recorded rather than the sum.
+        """
+        totals = {}
+        for entry in self.stages:
+            total = totals.setdefault(entry['stage'], {'seconds': 0.0, 'rows': 0})
+            total['seconds'] += entry['seconds']
+            if 'column' in entry:
+                total['rows'] = max(total['rows'], entry.get('rows') or 0)
+            else:
+                total['rows'] += entry.get('rows') or 0
+            if 'peak_mb' in entry:
+                total['peak_mb'] = max(total.get('peak_mb', 0.0), entry['peak_mb'])
+        return totals
+
+    def server_timing(self):
+        """
+        Formats the stage totals as a `Server-Timing` header value, durations in milliseconds.
+        """
+        metrics = []
+        for name, total in self.totals().items():
+            metric = f"{name};dur={total['seconds'] * 1000:.1f}"
+            if total['rows']:
+                metric += f';desc="{total["rows"]} rows"'
+            metrics.append(metric)
+        metrics.append(f'total;dur={self.elapsed * 1000:.1f}')
+        return ', '.join(metrics)
+
+    def as_dict(self):
+        return {
+            'name': self.name,
+            'seconds': self.elapsed,
+            'peak_rss_mb': peak_rss_mb(),
+            'stages': self.totals(),
+            'columns': self.columns,
+        }
+
+
+def peak_rss_mb():
+    """
+    Returns the process's peak resident set size so far, in MB.
+    """
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss / MB if sys.platform == 'darwin' else maxrss / 1024
+
+
+def current_trace():
+    return _current_trace.get()
+
+
+def activate(trace):
+    """
+    Makes `trace` the one stages are recorded into for the current thread or task.
+
+    Returns:
+    - Token: Pass it to `deactivate` when the request is done.
+    """
+    return _current_trace.set(trace)
+
+
+def deactivate(token):
+    _current_trace.reset(token)
+
+
+@contextmanager
+def stage(name, rows=None, column=None):
+    """
+    Times a block of work and records it into the active trace.
+
+    Without an active trace this does nothing but yield, so library code can be
+    instrumented unconditionally. Fields set on the yielded dict, e.g. `rows` once they
+    are known or `dtype` of a column, are recorded with the stage.
+
+    Args:
+    - name (str): Stage name, a `Server-Timing` token such as 'parse' or 'infer'.
+    - rows (int, optional): Number of rows the stage handles.
+    - column (str, optional): Column the stage works on, for per-column timings.
+
+    Yields:
+    - dict: Extra fields for the stage record.
+    """
+    trace = _current_trace.get()
+    if trace is None:
+        yield {}
+        return
+
+    fields = {'rows': rows}
+    tracing = tracemalloc.is_tracing()
+    if tracing:
+        # Keep the enclosing stage's peak before resetting it for this one
+        current, peak = tracemalloc.get_traced_memory()
+        if trace._peak_stack:
+            trace._peak_stack[-1] = max(trace._peak_stack[-1], peak)
+        trace._peak_stack.append(0)
+        tracemalloc.reset_peak()
+    start = time.perf_counter()
+    try:
+        yield fields
+    finally:
+        seconds = time.perf_counter() - start
+        peak_mb = None
+        if tracing:
+            _, peak = tracemalloc.get_traced_memory()
+            peak = max(peak, trace._peak_stack.pop())
+            if trace._peak_stack:
+                trace._peak_stack[-1] = max(trace._peak_stack[-1], peak)
+            peak_mb = (peak - current) / MB
+        trace.record(name, seconds, column=column, peak_mb=peak_mb, **fields)
+
+
+def timed_chunks(chunks, name='parse'):
+    """
+    Yields the chunks of a reader, recording the time spent producing each one as a stage.
+    """
+    reader = iter(chunks)
+    while True:
+        with stage(name) as fields:
+            chunk = next(reader, None)
+            fields['rows'] = len(chunk) if chunk is not None else 0
+        if chunk is None:
+            return
+        yield chunk
+
+
+class Histogram:
+    """
+    Cumulative bucket counts of observed values, in the shape of a Prometheus histogram.
+    """
+
+    def __init__(self, buckets=HISTOGRAM_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def as_dict(self):
+        cumulative = 0
+        buckets = {}
+        for bound, count in zip([*map(str, self.buckets), '+Inf'], self.counts):
+            cumulative += count
+            buckets[bound] = cumulative
+        return {'count': self.count, 'sum': self.sum, 'buckets': buckets}
+
+
+class MetricsRegistry:
+    """
+    In-process histograms of request and stage latencies, keyed by metric name and label.
+    """
+
+    def __init__(self):
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def observe(self, metric, label, value):
+        with self._lock:
+            histogram = self._histograms.get((metric, label))
+            if histogram is None:
+                histogram = self._histograms[(metric, label)] = Histogram()
+            histogram.observe(value)
+
+    def observe_trace(self, trace, label):
+        self.observe('request_seconds', label, trace.elapsed)
+        for name, total in trace.totals().items():
+            self.observe('stage_seconds', name, total['seconds'])
+
+    def snapshot(self):
+        with self._lock:
+            snapshot = {}
+            for (metric, label), histogram in sorted(self._histograms.items()):
+                snapshot.setdefault(metric, {})[label] = histogram.as_dict()
+            return snapshot
+
+    def prometheus(self):
+        """
+        Renders the histograms in the Prometheus text exposition format.
+        """
+        lines = []
+        label_names = {'request_seconds': 'view', 'stage_seconds': 'stage'}
+        for metric, histograms in self.snapshot().items():
+            name = f'data_processing_{metric}'
+            lines.append(f'# TYPE {name} histogram')
+            label_name = label_names.get(metric, 'label')
+            for label, histogram in histograms.items():
+                for bound, count in histogram['buckets'].items():
+                    lines.append(f'{name}_bucket{{{label_name}="{label}",le="{bound}"}} {count}')
+                lines.append(f'{name}_sum{{{label_name}="{label}"}} {histogram["sum"]}')
+                lines.append(f'{name}_count{{{label_name}="{label}"}} {histogram["count"]}')
+        return '\n'.join(lines) + '\n'
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+
+
+metrics = MetricsRegistry()
+
+
+class StackSampler:
+    """
+    A sampling profiler for one thread: a background thread records its stack at a fixed interval.
+
+    The samples are kept as collapsed stacks ("outer;inner;leaf count" lines), the input
+    format of flame graph tools such as speedscope or flamegraph.pl. Unlike cProfile it
+    does not slow down the profiled code, so it can run on live requests.
+    """
+
+    def __init__(self, thread_id=None, interval=0.005):
+        self.thread_id = thread_id or threading.get_ident()
+        self.interval = interval
+        self.samples = Counter()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+        return self.samples
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{os.path.basename(code.co_filename)}:{code.co_name}')
+                frame = frame.f_back
+            if stack:
+                self.samples[';'.join(reversed(stack))] += 1
+
+    def write(self, path):
+        with open(path, 'w') as profile_file:
+            for stack, count in self.samples.most_common():
+                profile_file.write(f'{stack} {count}\n')
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formats log records as one JSON object per line, including any fields passed with `extra`.
+    """
+
+    # Attributes every LogRecord has; anything else came from `extra`
+    RESERVED = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+
+    def format(self, record):
+        entry = {
+            'time': datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        entry.update({key: value for key, value in vars(record).items() if key not in self.RESERVED})
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
@@ -0,0 +1,147 @@
+import json
+
+import numpy as np
+import pandas as pd
+from django.core.serializers.json import DjangoJSONEncoder
+
+# Rows serialized per chunk of a streamed response
+BATCH_ROWS = 10_000
+
+NDJSON_CONTENT_TYPE = 'application/x-ndjson'
+
+
+def dumps(value):
+    # Object columns can hold values json cannot encode, e.g. times and decimals from Excel cells;
+    # encode them like JsonResponse does for non-streamed responses
+    return json.dumps(value, cls=DjangoJSONEncoder)
+
+
+def datetime_to_json_values(series):
+    """
+    Formats a datetime column as ISO 8601 strings, matching Django's JSON encoder.
+
+    Args:
+    - series (pd.Series): A datetime64 column, timezone-aware or naive.
+
+    Returns:
+    - np.ndarray: Object array of strings, with None for NaT.
+    """
+    suffix = ''
+    if series.dt.tz is not None:
+        series = series.dt.tz_convert('UTC').dt.tz_localize(None)
+        suffix = 'Z'
+    values = series.to_numpy(dtype='datetime64[ns]')
+    mask = np.isnat(values)
+    with_millis = (values[~mask].astype('int64') % 1_000_000_000 != 0).any()
+    strings = np.datetime_as_string(values, unit='ms' if with_millis else 's').astype(object)
+    if suffix:
+        strings = strings + suffix
+    strings[mask] = None
+    return strings
+
+
+def column_to_json_values(series):
+    """
+    Converts a column into JSON-ready Python values with one vectorized step per column.
+
+    NaN, NaT and missing values become None, infinite floats become None, and categories
+    are expanded from their codes without touching each category value more than once.
+
+    Args:
+    - series (pd.Series): The column to convert.
+
+    Returns:
+    - list: JSON-serializable values in row order.
+    """
+    dtype = series.dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        categories = column_to_json_values(pd.Series(dtype.categories))
+        # Code -1 marks a missing value and picks the trailing None
+        lookup = np.array(categories + [None], dtype=object)
+        return lookup[series.cat.codes.to_numpy()].tolist()
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        return datetime_to_json_values(series).tolist()
+    if isinstance(dtype, np.dtype) and dtype.kind in 'biu':
+        return series.to_numpy().tolist()
+    if isinstance(dtype, np.dtype) and dtype.kind == 'f':
+        values = series.to_numpy()
+        result = values.astype(object)
+        result[~np.isfinite(values)] = None
+        return result.tolist()
+
+    values = series.to_numpy(dtype=object)
+    mask = series.isna().to_numpy()
+    if mask.any():
+        values = values.copy()
+        values[mask] = None
+    return values.tolist()
+
+
+def frame_to_records(df):
+    """
+    Converts a DataFrame into row dicts column by column, without `to_dict(orient='records')`.
+
+    Args:
+    - df (pd.DataFrame): The rows to convert.
+
+    Returns:
+    - list: One JSON-ready dict per row.
+    """
+    keys = [str(col) for col in df.columns]
+    columns = [column_to_json_values(df[col]) for col in df.columns]
+    return [dict(zip(keys, row)) for row in zip(*columns)]
+
+
+def iter_record_batches(df, batch_size=BATCH_ROWS):
+    """
+    Yields lists of row dicts built straight from the column arrays, one batch at a time.
+
+    Args:
+    - df (pd.DataFrame): The processed DataFrame.
+    - batch_size (int, optional): Number of rows per batch.
+
+    Yields:
+    - list: Row dicts for the next batch of rows.
+    """
+    for start in range(0, len(df), batch_size):
+        yield frame_to_records(df.iloc[start:start + batch_size])
+
+
+def iter_json(df, data_types, batch_size=BATCH_ROWS, extra=None):
+    """
+    Streams the upload response as a single JSON document: the data types first, then the rows.
+
+    Args:
+    - df (pd.DataFrame): The processed DataFrame.
+    - data_types (dict): Column name to dtype name.
+    - batch_size (int, optional): Number of rows serialized per chunk.
+    - extra (dict, optional): Further fields written before the rows, e.g. column statistics.
+
+    Yields:
+    - bytes: Consecutive pieces of the JSON document.
+    """
+    header = dumps({'data_types': data_types, **(extra or {})})
+    yield (header[:-1] + ', "data": [').encode('utf-8')
+    separator = ''
+    for records in iter_record_batches(df, batch_size):
+        yield (separator + dumps(records)[1:-1]).encode('utf-8')
+        separator = ', '
+    yield b']}'
+
+
+def iter_ndjson(df, data_types, batch_size=BATCH_ROWS, extra=None):
+    """
+    Streams the upload response as newline-delimited JSON: a data types line, then one line per row.
+
+    Args:
+    - df (pd.DataFrame): The processed DataFrame.
+    - data_types (dict): Column name to dtype name.
+    - batch_size (int, optional): Number of rows serialized per chunk.
+    - extra (dict, optional): Further fields written on the data types line, e.g. column statistics.
+
+    Yields:
+    - bytes: Consecutive lines of the NDJSON stream.
+    """
+    yield (dumps({'data_types': data_types, **(extra or {})}) + '\n').encode('utf-8')
+    for records in iter_record_batches(df, batch_size):
+        yield ''.join(dumps(record) + '\n' for record in records).encode('utf-8')
@@ -0,0 +1,132 @@
+import numpy as np
+import pandas as pd
+
+from .infer_data_types import nullable_integer_dtype
+
+try:
+    import pyarrow as pa
+except ImportError:  # pyarrow is optional; text then stays object or category
+    pa = None
+
+# Integer dtypes tried in order of width; unsigned ones only hold non-negative values
+OPTIMIZED_INTEGER_DTYPES = ['uint8', 'int8', 'uint16', 'int16', 'uint32', 'int32', 'uint64', 'int64']
+
+# Float dtypes tried in order of width; a column only moves if every value survives the round trip
+OPTIMIZED_FLOAT_DTYPES = ['float16', 'float32']
+
+
+def column_bytes(series):
+    return int(series.memory_usage(deep=True, index=False))
+
+
+def smallest_integer_dtype(min_value, max_value):
+    """
+    Returns the narrowest signed or unsigned integer dtype holding every value in [min_value, max_value].
+    """
+    for dtype in OPTIMIZED_INTEGER_DTYPES:
+        info = np.iinfo(dtype)
+        if info.min <= min_value and max_value <= info.max:
+            return dtype
+    return None
+
+
+def optimize_integers(series):
+    """
+    Narrows an integer column, making it unsigned when it has no negative values.
+
+    Nullable columns keep their mask only if they actually hold missing values.
+    """
+    valid = series.dropna()
+    if not len(valid):
+        return series
+    values = valid.to_numpy()
+    dtype = smallest_integer_dtype(int(values.min()), int(values.max()))
+    if dtype is None:
+        return series
+    return series.astype(nullable_integer_dtype(dtype) if len(valid) < len(series) else dtype)
+
+
+def optimize_floats(series):
+    """
+    Moves a float column to float16 or float32 if every value, NaN and infinities included, round-trips exactly.
+    """
+    values = series.to_numpy()
+    for dtype in OPTIMIZED_FLOAT_DTYPES:
+        if np.dtype(dtype).itemsize >= values.dtype.itemsize:
+            break
+        with np.errstate(over='ignore'):
+            candidate = values.astype(dtype)
+        if np.array_equal(candidate.astype(values.dtype), values, equal_nan=True):
+            return pd.Series(candidate, index=series.index, name=series.name)
+    return series
+
+
+def optimize_text(series, arrow_strings=False):
+    """
+    Stores a text column as category or Arrow strings when that takes fewer bytes than Python objects.
+
+    Instead of a fixed distinct-value ratio, every candidate is measured with
+    `memory_usage(deep=True)` and the smallest one wins.
+    """
+    if pd.api.types.infer_dtype(series, skipna=True) != 'string':
+        return series
+    candidates = [series, series.astype('category')]
+    if arrow_strings and pa is not None:
+        candidates.append(series.astype(pd.ArrowDtype(pa.string())))
+    return min(candidates, key=column_bytes)
+
+
+def optimize_column(series, arrow_strings=False):
+    """
+    Picks the smallest lossless representation of one column.
+
+    Args:
+    - series (pd.Series): An inferred column.
+    - arrow_strings (bool, optional): Whether text columns may move to Arrow-backed strings.
+
+    Returns:
+    - pd.Series: The column in its new dtype, or unchanged if nothing smaller holds every value.
+    """
+    dtype = series.dtype
+    if isinstance(dtype, np.dtype) and dtype.kind in 'iu':
+        return optimize_integers(series)
+    if isinstance(dtype, pd.api.extensions.ExtensionDtype) and str(dtype).startswith(('Int', 'UInt')):
+        return optimize_integers(series)
+    if isinstance(dtype, np.dtype) and dtype.kind == 'f':
+        return optimize_floats(series)
+    if dtype == object:
+        return optimize_text(series, arrow_strings)
+    return series
+
+
+def optimize_memory(df, arrow_strings=False):
+    """
+    Shrinks every column of an inferred DataFrame to its smallest lossless dtype.
+
+    Integers may become unsigned or nullable `Int*`/`UInt*`, floats may become float16
+    when no value changes, and text may become category or Arrow strings when that is
+    measurably smaller. Values never change: every candidate holds exactly the original data.
+
+    Args:
+    - df (pd.DataFrame): The DataFrame returned by inference.
+    - arrow_strings (bool, optional): Whether text columns may move to Arrow-backed strings.
+
+    Returns:
+    - tuple: (the optimized pd.DataFrame, report dict mapping each column to its dtype and
+      `memory_usage(deep=True)` bytes before and after).
+    """
+    optimized = {}
+    report = {}
+    for col in df.columns:
+        before = df[col]
+        after = optimize_column(before, arrow_strings)
+        optimized[col] = after
+        bytes_before = column_bytes(before)
+        report[str(col)] = {
+            'dtype_before': str(before.dtype),
+            'dtype_after': str(after.dtype),
+            'bytes_before': bytes_before,
+            'bytes_after': bytes_before if after is before else column_bytes(after),
+        }
+    # Passing `columns=` here would send datetime columns through a slow object-dtype reindex
+    return pd.DataFrame(optimized, index=df.index), report
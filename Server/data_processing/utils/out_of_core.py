@@ -0,0 +1,382 @@
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+except ImportError:  # pyarrow is optional; raw chunks are then spilled in the dataset layout
+    pa = None
+
+from .column_statistics import EXACT_DISTINCT_LIMIT, HLL_PRECISION, hash_values, hll_estimate, hll_update
+from .dataset_store import DatasetWriter, open_dataset
+from .infer_data_types import (
+    ALLOWED_TYPES, CATEGORY_UNIQUE_RATIO, DATE_SAMPLE_SIZE, ColumnProfile, choose_numeric_dtype, coerce_numeric,
+    detect_date_format, profile_numeric,
+)
+from .ingestion import collect_statistics, convert_chunk_column
+from .instrumentation import stage, timed_chunks
+
+# Rows parsed first to measure how much memory one row of the file takes
+PROBE_ROWS = 1_000
+
+# Copies of a raw chunk alive at once while it is profiled, spilled or converted; chunks are sized
+# so that this many of them fit into the memory budget
+WORKING_SET_FACTOR = 4
+
+# Memory taken whatever the chunk size: the parser's buffers, and per column the bounded hash sets
+# and samples of its profile and statistics; it is set aside before chunks are sized
+READER_RESERVED_BYTES = 1024 * 1024
+COLUMN_RESERVED_BYTES = 512 * 1024
+
+
+def merge_numeric_profiles(profile, other):
+    """
+    Adds the numeric profile of other rows of the same column to `profile`, in place.
+    """
+    if other.numeric_count:
+        profile.min_value = other.min_value if not profile.numeric_count else min(profile.min_value, other.min_value)
+        profile.max_value = other.max_value if not profile.numeric_count else max(profile.max_value, other.max_value)
+    profile.length += other.length
+    profile.numeric_count += other.numeric_count
+    profile.non_integer_count += other.non_integer_count
+    return profile
+
+
+class RawColumnProfile:
+    """
+    Mergeable summary of a raw column holding what `infer_column` needs to pick its dtype.
+
+    Profiles of separate chunks merge into the profile of the whole column: numeric profiles
+    add up, distinct values are a set of hashes until EXACT_DISTINCT_LIMIT and a HyperLogLog
+    sketch after, and the values date formats are detected from are a bottom-k sample of the
+    text values keyed by random priorities, so every chunk has the same chance to be sampled.
+    """
+
+    def __init__(self, rng=None):
+        self.numeric = ColumnProfile()
+        self.hashes = np.empty(0, dtype='uint64')
+        self.registers = None
+        self.text = np.empty(0, dtype=object)
+        self.priorities = np.empty(0, dtype='float64')
+        # Seeded, so the same file always samples the same values
+        self.rng = rng if rng is not None else np.random.default_rng(0)
+
+    @classmethod
+    def from_series(cls, series, rng=None):
+        profile = cls(rng)
+        profile.numeric = profile_numeric(coerce_numeric(series))
+        valid = series.dropna()
+        profile.add_hashes(hash_values(valid.unique()))
+        if valid.dtype == object and len(valid):
+            profile.add_text(valid.to_numpy(), profile.rng.random(len(valid)))
+        return profile
+
+    def update(self, series):
+        return self.merge(RawColumnProfile.from_series(series, self.rng))
+
+    def merge(self, other):
+        """
+        Adds the profile of other rows of the same column.
+        """
+        merge_numeric_profiles(self.numeric, other.numeric)
+        if other.registers is not None:
+            if self.registers is None:
+                self.registers = np.zeros(1 << HLL_PRECISION, dtype='uint8')
+                hll_update(self.registers, self.hashes)
+                self.hashes = np.empty(0, dtype='uint64')
+            np.maximum(self.registers, other.registers, out=self.registers)
+        else:
+            self.add_hashes(other.hashes)
+        self.add_text(other.text, other.priorities)
+        return self
+
+    def add_hashes(self, hashes):
+        if self.registers is not None:
+            hll_update(self.registers, hashes)
+            return
+        self.hashes = np.union1d(self.hashes, hashes)
+        if len(self.hashes) > EXACT_DISTINCT_LIMIT:
+            self.registers = np.zeros(1 << HLL_PRECISION, dtype='uint8')
+            hll_update(self.registers, self.hashes)
+            self.hashes = np.empty(0, dtype='uint64')
+
+    def add_text(self, values, priorities):
+        text = np.concatenate([self.text, values])
+        priorities = np.concatenate([self.priorities, priorities])
+        if len(text) > DATE_SAMPLE_SIZE:
+            keep = np.argpartition(priorities, DATE_SAMPLE_SIZE)[:DATE_SAMPLE_SIZE]
+            text, priorities = text[keep], priorities[keep]
+        self.text, self.priorities = text, priorities
+
+    def distinct(self):
+        return hll_estimate(self.registers) if self.registers is not None else len(self.hashes)
+
+    def spec(self, threshold=0.5):
+        """
+        Picks the column's schema entry with the rules of `infer_column`: numbers if at least
+        `threshold` of the values parse as numbers, then dates if a date format fits the
+        sampled text, then category or object by the share of distinct values.
+
+        Returns:
+        - dict: The schema entry, as in `schema_from_frame`.
+        """
+        if self.numeric.numeric_count and self.numeric.numeric_ratio >= threshold:
+            return {'type': choose_numeric_dtype(self.numeric)}
+        if len(self.text):
+            date_format = detect_date_format(pd.Series(self.text, dtype=object))
+            if date_format is not None:
+                return {'type': 'datetime', 'format': date_format}
+        if self.numeric.length and self.distinct() / self.numeric.length < CATEGORY_UNIQUE_RATIO:
+            return {'type': 'category'}
+        return {'type': 'object'}
+
+
+def budget_chunk_rows(probe, memory_budget):
+    """
+    Returns the number of rows per chunk that keeps WORKING_SET_FACTOR raw chunks, plus the
+    reserved memory, within `memory_budget` bytes. Chunks never get smaller than the probe, so
+    a budget below the reserved memory is exceeded rather than parsed row by row.
+
+    Args:
+    - probe (pd.DataFrame): The first rows of the file, as parsed.
+    - memory_budget (int): Bytes the upload may take at once.
+    """
+    row_bytes = probe.memory_usage(deep=True, index=False).sum() / max(len(probe), 1)
+    available = memory_budget - READER_RESERVED_BYTES - COLUMN_RESERVED_BYTES * len(probe.columns)
+    return max(PROBE_ROWS, int(available // (max(row_bytes, 1) * WORKING_SET_FACTOR)))
+
+
+def iter_csv_budgeted(file, memory_budget):
+    """
+    Parses a CSV with the C parser in chunks sized to a memory budget.
+
+    The first PROBE_ROWS rows are parsed on their own to measure the in-memory size of a row;
+    every later chunk holds as many rows as `budget_chunk_rows` allows for that size.
+
+    Args:
+    - file (file-like or str): The CSV to read.
+    - memory_budget (int): Bytes the upload may take at once.
+
+    Yields:
+    - pd.DataFrame: The next raw rows of the file.
+    """
+    with pd.read_csv(file, chunksize=PROBE_ROWS) as reader:
+        probe = reader.get_chunk(PROBE_ROWS)
+        yield probe
+        rows = budget_chunk_rows(probe, memory_budget)
+        del probe
+        while True:
+            try:
+                yield reader.get_chunk(rows)
+            except StopIteration:
+                return
+
+
+def normalize_raw_chunk(chunk):
+    """
+    Turns values other than text in object columns (booleans next to blanks, say) into text,
+    the form in which the scratch store gives them back, so profiles and conversion agree.
+    """
+    chunk = chunk.rename(columns=str)
+    for col in chunk.columns:
+        series = chunk[col]
+        if series.dtype == object and pd.api.types.infer_dtype(series, skipna=True) not in ('string', 'empty'):
+            chunk[col] = series.where(series.isna(), series.astype(str))
+    return chunk
+
+
+class ScratchStore:
+    """
+    Raw chunks spilled to local disk and read back one at a time.
+
+    With pyarrow, each chunk is written as an Arrow IPC file, which moves text columns in bulk;
+    without it, the chunks are written as the segments of a dataset with `DatasetWriter`.
+    """
+
+    def __init__(self, root):
+        os.makedirs(root, exist_ok=True)
+        self.path = tempfile.mkdtemp(prefix='scratch-', dir=root)
+        self.chunks = 0
+        self.writer = DatasetWriter(self.path) if pa is None else None
+
+    def _chunk_path(self, index):
+        return os.path.join(self.path, f'{index}.arrow')
+
+    def append(self, chunk):
+        if self.writer is not None:
+            self.writer.append(chunk)
+        else:
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            with pa.OSFile(self._chunk_path(self.chunks), 'wb') as sink:
+                with pa.ipc.new_file(sink, table.schema) as ipc_writer:
+                    ipc_writer.write_table(table)
+        self.chunks += 1
+
+    def __iter__(self):
+        if self.writer is not None:
+            self.writer.close()
+            yield from iter_segments(open_dataset(self.path, self.writer.dataset_id))
+            return
+        for index in range(self.chunks):
+            with pa.memory_map(self._chunk_path(index)) as source:
+                chunk = pa.ipc.open_file(source).read_all().to_pandas()
+            yield chunk
+            del chunk
+
+    def remove(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+def spill_chunks(chunks, scratch):
+    """
+    Writes raw chunks to a scratch store while profiling their columns.
+
+    Args:
+    - chunks (iterable): Raw DataFrames with the same columns, in row order.
+    - scratch (ScratchStore): Where the chunks are spilled.
+
+    Returns:
+    - dict: Column name to the RawColumnProfile of all chunks.
+    """
+    profiles = None
+    for chunk in timed_chunks(chunks):
+        chunk = normalize_raw_chunk(chunk)
+        if profiles is None:
+            profiles = {col: RawColumnProfile() for col in chunk.columns}
+        with stage('profile', rows=len(chunk)):
+            for col, profile in profiles.items():
+                profile.update(chunk[col])
+        with stage('spill', rows=len(chunk)):
+            scratch.append(chunk)
+        del chunk
+    return profiles
+
+
+def infer_schema(profiles, column_types=None, threshold=0.5):
+    """
+    Builds the schema of an upload from the merged profiles of its columns.
+
+    Args:
+    - profiles (dict): Column name to RawColumnProfile.
+    - column_types (dict, optional): User-defined types, as accepted by `infer_and_convert_data_types`.
+    - threshold (float, optional): The minimum proportion of valid numeric values required to convert a column.
+
+    Returns:
+    - dict: Column name to schema entry.
+    """
+    schema = {}
+    for col, profile in profiles.items():
+        dtype = (column_types or {}).get(col)
+        if isinstance(dtype, dict):
+            schema[col] = dict(dtype)
+        elif dtype in ALLOWED_TYPES:
+            schema[col] = {'type': 'datetime', 'format': None} if dtype == 'datetime' else {'type': dtype}
+        else:
+            with stage('infer', column=col):
+                schema[col] = profile.spec(threshold)
+    return schema
+
+
+def iter_segments(dataset):
+    """
+    Yields a stored dataset one segment at a time, as DataFrames.
+    """
+    names = [entry['name'] for entry in dataset.columns]
+    for segment_index in range(len(dataset.manifest['segments'])):
+        yield pd.DataFrame({name: dataset.read_segment(name, segment_index) for name in names})
+
+
+def write_converted(chunks, schema, writer, threshold=0.5, statistics=None, progress=None):
+    """
+    Converts chunks into the schema dtypes and appends each one to `writer` before the next is read.
+
+    Args:
+    - chunks (iterable): Raw DataFrames with the schema's columns.
+    - schema (dict): Schema entries; widened in place where values do not fit.
+    - writer (DatasetWriter): Where the converted chunks are written.
+    - threshold (float, optional): The minimum proportion of valid numeric values required to keep a column numeric.
+    - statistics (FrameStatistics, optional): Collects column statistics from the converted chunks.
+    - progress (callable, optional): Called with the number of rows written so far after each chunk.
+
+    Returns:
+    - int: The number of rows written.
+    """
+    counts = {col: {'rows': 0, 'numeric': 0} for col in schema}
+    rows = 0
+    for chunk in chunks:
+        missing = set(chunk.columns) ^ set(schema)
+        if missing:
+            raise ValueError(f"Columns do not match the schema: {', '.join(sorted(map(str, missing)))}")
+        with stage('convert', rows=len(chunk)):
+            converted = pd.DataFrame({
+                col: convert_chunk_column(chunk[col], schema[col], counts[col], threshold=threshold)
+                for col in chunk.columns
+            })
+        del chunk
+        collect_statistics(statistics, converted)
+        with stage('store', rows=len(converted)):
+            writer.append(converted, schema)
+        rows += len(converted)
+        del converted
+        if progress:
+            progress(rows)
+    return rows
+
+
+def read_csv_out_of_core(file, root, scratch_root, memory_budget, column_types=None, threshold=0.5, schema=None,
+                         compression=None, statistics=None, progress=None, **metadata):
+    """
+    Parses, infers and stores a CSV of any size while holding only a budgeted number of rows at a time.
+
+    Without a schema, the file is read twice over: the first pass spills the raw chunks to a
+    columnar `ScratchStore` under `scratch_root` and merges per-column profiles of them, from
+    which the schema is picked as if the whole column had been inferred at once; the second pass
+    reads the scratch store chunk by chunk, converts each chunk and writes it to the final
+    dataset. With a schema, e.g. of an earlier upload of the same feed, the chunks are
+    converted as they are parsed. The scratch store is removed before returning.
+
+    Args:
+    - file (file-like or str): The CSV to read.
+    - root (str): Directory holding all stored datasets.
+    - scratch_root (str): Directory the scratch store is created in.
+    - memory_budget (int): Bytes the upload may take at once; sizes the chunks.
+    - column_types (dict, optional): A dictionary specifying user-defined types for columns.
+    - threshold (float, optional): The minimum proportion of valid numeric values required to convert a column.
+    - schema (dict, optional): A previously inferred schema used to parse the file without inference.
+    - compression (str, optional): Segment compression of the stored dataset, one of `COMPRESSIONS`.
+    - statistics (FrameStatistics, optional): Collects column statistics from the converted chunks.
+    - progress (callable, optional): Called with the number of rows written so far after each chunk.
+    - **metadata: Extra JSON-serializable fields kept in the manifest.
+
+    Returns:
+    - Dataset: The stored dataset; its `schema` holds the final types and date formats.
+    """
+    chunks = iter_csv_budgeted(file, memory_budget)
+    scratch = None
+    writer = DatasetWriter(root, compression=compression)
+    try:
+        if schema is None:
+            scratch = ScratchStore(scratch_root)
+            profiles = spill_chunks(chunks, scratch)
+            schema = infer_schema(profiles, column_types, threshold)
+            chunks = iter(scratch)
+            # The profiles covered every row, so the schema is final and no column falls back to object
+            threshold = 0
+        else:
+            schema = {col: dict(spec) for col, spec in schema.items()}
+            for col, dtype in (column_types or {}).items():
+                if isinstance(dtype, dict) and col in schema:
+                    schema[col] = dict(dtype)
+            chunks = (normalize_raw_chunk(chunk) for chunk in timed_chunks(chunks))
+        write_converted(chunks, schema, writer, threshold, statistics, progress)
+        dataset_id = writer.close(**metadata)
+    except Exception:
+        writer.abort()
+        raise
+    finally:
+        if scratch is not None:
+            scratch.remove()
+    return open_dataset(root, dataset_id)
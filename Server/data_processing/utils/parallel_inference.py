@@ -0,0 +1,136 @@
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from .infer_data_types import (
+    cache_date_format, get_cached_date_format, infer_column, infer_column_from_sample,
+)
+
+try:
+    import pyarrow as pa
+except ImportError:  # pyarrow is optional; object columns are then sent as NumPy arrays
+    pa = None
+
+# Number of column groups handed out per worker, so a slow column does not leave other workers idle
+GROUPS_PER_WORKER = 2
+
+_executor = None
+_executor_workers = None
+_executor_lock = threading.Lock()
+
+
+def get_executor(max_workers):
+    """
+    Returns a process pool with `max_workers` workers, reusing it across requests.
+
+    Workers are spawned rather than forked so they never inherit the server's threads or locks.
+    """
+    global _executor, _executor_workers
+    with _executor_lock:
+        if _executor is None or _executor_workers != max_workers:
+            if _executor is not None:
+                _executor.shutdown(wait=False)
+            _executor = ProcessPoolExecutor(max_workers=max_workers,
+                                            mp_context=multiprocessing.get_context('spawn'))
+            _executor_workers = max_workers
+        return _executor
+
+
+def encode_column(series):
+    """
+    Packs a column into a buffer-backed array that pickles without per-value overhead.
+
+    Numeric, datetime and categorical columns already wrap NumPy buffers. Object columns
+    are converted to Arrow arrays when pyarrow is available.
+    """
+    if pa is not None and pd.api.types.is_object_dtype(series.dtype):
+        try:
+            return pa.array(series.to_numpy(), from_pandas=True)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            pass  # Mixed Python types; fall back to the NumPy object array
+    return series.array
+
+
+def decode_column(payload, name):
+    if pa is not None and isinstance(payload, pa.Array):
+        return pd.Series(payload.to_numpy(zero_copy_only=False), name=name, dtype=object)
+    return pd.Series(payload, name=name)
+
+
+def infer_column_group(columns, threshold, sample_size, head_size, seed):
+    """
+    Infers a group of columns inside a worker process.
+
+    Args:
+    - columns (list): (name, encoded column, cache key, cached date format) tuples.
+    - threshold (float): The minimum proportion of valid numeric values required to convert a column.
+    - sample_size (int or None): Sample size for sample-then-verify inference, or None to profile every row.
+    - head_size (int): Number of leading rows included in the sample.
+    - seed (int): Seed for the random sample.
+
+    Returns:
+    - list: (name, converted array or None if the column stays object, detected date format) tuples.
+    """
+    results = []
+    for name, payload, cache_key, date_format in columns:
+        if date_format is not None:
+            cache_date_format(cache_key, date_format)
+        series = decode_column(payload, name)
+        if sample_size:
+            converted = infer_column_from_sample(series, threshold=threshold, head_size=head_size,
+                                                 sample_size=sample_size, seed=seed, cache_key=cache_key)
+        else:
+            converted = infer_column(series, threshold=threshold, cache_key=cache_key)
+        # Object results are identical to the input, so the parent keeps its own copy
+        array = None if pd.api.types.is_object_dtype(converted.dtype) else converted.array
+        results.append((name, array, get_cached_date_format(cache_key)))
+    return results
+
+
+def infer_columns_parallel(df, columns, cache_keys, max_workers, threshold=0.5, sample_size=None,
+                           head_size=1000, seed=0):
+    """
+    Infers and converts columns across a process pool and writes them back in their original order.
+
+    Args:
+    - df (pd.DataFrame): The DataFrame to be processed; converted columns are assigned in place.
+    - columns (list): The columns to infer.
+    - cache_keys (dict): Date format cache key for each column.
+    - max_workers (int): Number of worker processes.
+    - threshold (float, optional): The minimum proportion of valid numeric values required to convert a column.
+    - sample_size (int, optional): Sample size for sample-then-verify inference.
+    - head_size (int, optional): Number of leading rows included in the sample.
+    - seed (int, optional): Seed for the random sample.
+
+    Returns:
+    - pd.DataFrame: The DataFrame with converted columns.
+    """
+    group_count = min(len(columns), max_workers * GROUPS_PER_WORKER)
+    groups = [columns[start::group_count] for start in range(group_count)]
+
+    executor = get_executor(max_workers)
+    futures = [
+        executor.submit(
+            infer_column_group,
+            [(col, encode_column(df[col]), cache_keys[col], get_cached_date_format(cache_keys[col]))
+             for col in group],
+            threshold, sample_size, head_size, seed,
+        )
+        for group in groups
+    ]
+
+    converted = {}
+    for future in futures:
+        for name, array, date_format in future.result():
+            converted[name] = array
+            if date_format is not None:
+                cache_date_format(cache_keys[name], date_format)
+
+    for col in columns:
+        if converted[col] is None:
+            df[col] = df[col].astype('object')
+        else:
+            df[col] = pd.Series(converted[col], index=df.index, name=col)
+    return df
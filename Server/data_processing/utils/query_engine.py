@@ -0,0 +1,397 @@
+import glob
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from .instrumentation import stage
+
+# Sidecar files kept next to a dataset's segments; both are rebuilt when missing or stale
+STATS_FILE_NAME = 'stats.json'
+ORDER_FILE_PATTERN = 'order-{rows}-{key}.npy'
+
+# Comparison operators of filters; nulls never match them
+COMPARISONS = {
+    '=': lambda series, value: series == value,
+    '!=': lambda series, value: series != value,
+    '<': lambda series, value: series < value,
+    '<=': lambda series, value: series <= value,
+    '>': lambda series, value: series > value,
+    '>=': lambda series, value: series >= value,
+    'in': lambda series, value: series.isin(value),
+    'not_in': lambda series, value: ~series.isin(value),
+    'contains': lambda series, value: series.str.contains(value, case=False, regex=False),
+}
+NULL_TESTS = {
+    'is_null': lambda series: series.isna(),
+    'not_null': lambda series: series.notna(),
+}
+
+AGGREGATES = ('count', 'sum', 'mean', 'median', 'min', 'max', 'nunique')
+
+
+def parse_query(query, dataset):
+    """
+    Validates a query against a dataset's columns and normalizes it.
+
+    A query is a dict with any of these keys:
+    - filters (list): {'column', 'op', 'value'} dicts, combined with AND; `op` is one of
+      `COMPARISONS` or `NULL_TESTS`, 'in'/'not_in' take a list and 'contains' needs a text or
+      category column.
+    - columns (list): Columns to return; all columns by default.
+    - group_by (list): Columns to group the filtered rows by.
+    - aggregates (list): {'column', 'func', 'as'} dicts with `func` one of `AGGREGATES`;
+      'count' without a column counts rows.
+    - sort (list): {'column', 'descending'} dicts; with group_by, aggregate names can be sorted on.
+    - offset, limit (int): The page of the result to return.
+
+    Returns:
+    - dict: The normalized query.
+
+    Raises:
+    - ValueError: If the query is malformed.
+    - KeyError: If it names a column the dataset does not have.
+    """
+    if not isinstance(query, dict):
+        raise ValueError('The query must be a JSON object')
+    entries = {entry['name']: entry for entry in dataset.columns}
+
+    def check_column(name):
+        if name not in entries:
+            raise KeyError(f"Unknown columns: {name}")
+        return name
+
+    filters = []
+    for spec in query.get('filters') or []:
+        op = spec.get('op')
+        column = check_column(spec.get('column'))
+        if op in NULL_TESTS:
+            filters.append({'column': column, 'op': op})
+            continue
+        if op not in COMPARISONS:
+            raise ValueError(f"Unsupported filter operator: {op}")
+        if op in ('in', 'not_in') and not isinstance(spec.get('value'), list):
+            raise ValueError(f"'{op}' filters take a list of values")
+        if op == 'contains' and entries[column]['kind'] not in ('text', 'category'):
+            raise ValueError(f"'contains' filters only apply to text columns, not {column}")
+        filters.append({'column': column, 'op': op, 'value': coerce_value(spec.get('value'), entries[column], op)})
+
+    group_by = [check_column(name) for name in query.get('group_by') or []]
+    aggregates = []
+    for spec in query.get('aggregates') or []:
+        func = spec.get('func')
+        if func not in AGGREGATES:
+            raise ValueError(f"Unsupported aggregate: {func}")
+        column = spec.get('column')
+        if column is None and func != 'count':
+            raise ValueError(f"'{func}' needs a column")
+        if column is not None:
+            check_column(column)
+        aggregates.append({'column': column, 'func': func,
+                           'as': spec.get('as') or (f'{func}_{column}' if column else func)})
+
+    grouped = bool(group_by or aggregates)
+    result_columns = group_by + [spec['as'] for spec in aggregates] if grouped else None
+    columns = query.get('columns')
+    if grouped:
+        columns = result_columns
+    elif columns is not None:
+        columns = [check_column(name) for name in columns]
+
+    sort = []
+    for spec in query.get('sort') or []:
+        column = spec.get('column')
+        if grouped and column not in result_columns:
+            raise ValueError(f"Cannot sort grouped results on {column}")
+        sort.append({'column': column if grouped else check_column(column),
+                     'descending': bool(spec.get('descending', False))})
+
+    try:
+        offset = max(int(query.get('offset', 0)), 0)
+        limit = query.get('limit')
+        limit = None if limit is None else max(int(limit), 0)
+    except (TypeError, ValueError):
+        raise ValueError('offset and limit must be integers')
+    return {'filters': filters, 'columns': columns, 'group_by': group_by, 'aggregates': aggregates,
+            'grouped': grouped, 'sort': sort, 'offset': offset, 'limit': limit}
+
+
+def coerce_value(value, entry, op):
+    """
+    Converts a filter value from JSON to the column's type, so it compares like the stored values.
+    """
+    if op in ('in', 'not_in'):
+        return [coerce_value(item, entry, '=') for item in value]
+    if op == 'contains':
+        return str(value)
+    try:
+        if entry['kind'] == 'datetime':
+            timestamp = pd.Timestamp(value)
+            if entry['tz'] and timestamp.tz is None:
+                return timestamp.tz_localize(entry['tz'])
+            if not entry['tz'] and timestamp.tz is not None:
+                return timestamp.tz_convert('UTC').tz_localize(None)
+            return timestamp
+        if entry['kind'] in ('numeric', 'masked') and not entry['type'].lower().startswith('bool'):
+            return float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid value for column {entry['name']}: {value}")
+    return value if isinstance(value, bool) or entry['kind'] in ('numeric', 'masked') else str(value)
+
+
+def comparable(series, entry):
+    """
+    Returns a column in a form every filter operator handles, with pd.NA for missing values.
+    """
+    if entry['kind'] in ('text', 'category'):
+        return series.astype('string')
+    return series
+
+
+def filter_mask(series, entry, spec):
+    series = comparable(series, entry)
+    if spec['op'] in NULL_TESTS:
+        return NULL_TESTS[spec['op']](series).to_numpy(dtype=bool)
+    mask = COMPARISONS[spec['op']](series, spec['value'])
+    return (mask.fillna(False).to_numpy(dtype=bool)) & series.notna().to_numpy()
+
+
+def stats_value(value, entry):
+    """
+    Converts a value to the number block statistics are kept as: floats, or nanoseconds for dates.
+    """
+    if entry['kind'] == 'datetime':
+        timestamp = pd.Timestamp(value)
+        if timestamp.tz is not None:
+            timestamp = timestamp.tz_convert('UTC').tz_localize(None)
+        return float(timestamp.value)
+    return float(value)
+
+
+def has_range_stats(entry):
+    return entry['kind'] == 'datetime' or (entry['kind'] in ('numeric', 'masked')
+                                           and not entry['type'].lower().startswith('bool'))
+
+
+def block_stats(series, entry):
+    """
+    Summarizes one segment of a column for pruning: its row and null counts, and min/max when ordered.
+    """
+    nulls = int(series.isna().sum())
+    stats = {'kind': entry['kind'], 'rows': len(series), 'nulls': nulls}
+    if has_range_stats(entry) and nulls < len(series):
+        stats['min'] = stats_value(series.min(), entry)
+        stats['max'] = stats_value(series.max(), entry)
+    return stats
+
+
+def block_may_match(stats, entry, spec):
+    """
+    Tells from a segment's statistics whether any of its rows could pass a filter.
+    """
+    op = spec['op']
+    if op == 'is_null':
+        return stats['nulls'] > 0
+    if stats['nulls'] == stats['rows']:
+        return False
+    if op == 'not_null' or 'min' not in stats or op not in ('=', '<', '<=', '>', '>=', 'in'):
+        return True
+    low, high = stats['min'], stats['max']
+    if op == 'in':
+        return any(low <= stats_value(value, entry) <= high for value in spec['value'])
+    value = stats_value(spec['value'], entry)
+    return {
+        '=': low <= value <= high,
+        '<': low < value,
+        '<=': low <= value,
+        '>': high > value,
+        '>=': high >= value,
+    }[op]
+
+
+class BlockStats:
+    """
+    Per-segment statistics of a dataset's columns, computed as segments are first scanned.
+
+    Segments are never rewritten once stored, so statistics stay valid across appends;
+    they are kept in the dataset's directory and only new segments are ever summarized.
+    """
+
+    def __init__(self, dataset):
+        self.dataset = dataset
+        self.path = os.path.join(dataset.path, STATS_FILE_NAME)
+        self.changed = False
+        try:
+            with open(self.path) as stats_file:
+                self.stats = json.load(stats_file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.stats = {}
+
+    def get(self, column, segment_index, entry):
+        stats = self.stats.get(column, {}).get(str(segment_index))
+        return stats if stats is not None and stats['kind'] == entry['kind'] else None
+
+    def put(self, column, segment_index, stats):
+        self.stats.setdefault(column, {})[str(segment_index)] = stats
+        self.changed = True
+
+    def save(self):
+        if not self.changed:
+            return
+        with open(self.path + '.tmp', 'w') as stats_file:
+            json.dump(self.stats, stats_file)
+        os.replace(self.path + '.tmp', self.path)
+        self.changed = False
+
+
+def match_rows(dataset, filters):
+    """
+    Evaluates filters over a whole dataset, one segment at a time.
+
+    Segments whose statistics rule out a match are skipped without being read; segments
+    read for the first time have their statistics recorded for later queries.
+
+    Returns:
+    - np.ndarray: Boolean mask over all rows, or None when there are no filters.
+    """
+    if not filters:
+        return None
+    entries = {entry['name']: entry for entry in dataset.columns}
+    block_stats_cache = BlockStats(dataset)
+    mask = np.zeros(dataset.row_count, dtype=bool)
+    with stage('filter', rows=dataset.row_count):
+        for segment_index, rows in enumerate(dataset.manifest['segments']):
+            known = [block_stats_cache.get(spec['column'], segment_index, entries[spec['column']]) for spec in filters]
+            if any(stats is not None and not block_may_match(stats, entries[spec['column']], spec)
+                   for stats, spec in zip(known, filters)):
+                continue
+            segment_mask = np.ones(rows, dtype=bool)
+            segment_columns = {}
+            for spec, stats in zip(filters, known):
+                column = spec['column']
+                if column not in segment_columns:
+                    segment_columns[column] = dataset.read_segment(column, segment_index)
+                    if stats is None:
+                        block_stats_cache.put(column, segment_index,
+                                              block_stats(segment_columns[column], entries[column]))
+                segment_mask &= filter_mask(segment_columns[column], entries[column], spec)
+            start = dataset.segment_starts[segment_index]
+            mask[start:start + rows] = segment_mask
+        block_stats_cache.save()
+    return mask
+
+
+def sort_key(series, entry):
+    # Categories of different segments are merged unordered, so sort on their values
+    return series.astype(object) if entry['kind'] == 'category' else series
+
+
+def sort_order(dataset, sort):
+    """
+    Returns the permutation ordering all rows of a dataset by `sort`, nulls last.
+
+    Orders are cached in the dataset's directory by sort keys and row count, so repeated
+    queries sorting the same way only filter the cached order; an append makes a new row
+    count and the stale orders are removed when the new one is written.
+    """
+    key = hashlib.sha256(json.dumps(sort, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+    path = os.path.join(dataset.path, ORDER_FILE_PATTERN.format(rows=dataset.row_count, key=key))
+    try:
+        return np.load(path, mmap_mode='r')
+    except (FileNotFoundError, ValueError):
+        pass
+
+    entries = {entry['name']: entry for entry in dataset.columns}
+    with stage('sort', rows=dataset.row_count):
+        columns = [spec['column'] for spec in sort]
+        frame = dataset.read(columns=columns)
+        frame = pd.DataFrame({f'k{i}': sort_key(frame[column], entries[column])
+                              for i, column in enumerate(columns)})
+        order = frame.sort_values(list(frame.columns), ascending=[not spec['descending'] for spec in sort],
+                                  na_position='last', kind='stable').index.to_numpy(dtype='int64')
+
+    for stale in glob.glob(os.path.join(dataset.path, ORDER_FILE_PATTERN.format(rows='*', key='*'))):
+        if not os.path.basename(stale).startswith(f'order-{dataset.row_count}-'):
+            os.remove(stale)
+    np.save(path + '.tmp.npy', order)
+    os.replace(path + '.tmp.npy', path)
+    return order
+
+
+def read_matching(dataset, mask, columns):
+    """
+    Reads the given columns of the rows selected by `mask`, skipping segments without any.
+    """
+    if mask is None:
+        return dataset.read(columns=columns).reset_index(drop=True)
+    return dataset.take(np.flatnonzero(mask), columns).reset_index(drop=True)
+
+
+def aggregate(frame, query):
+    """
+    Groups and aggregates the filtered rows.
+    """
+    with stage('group', rows=len(frame)):
+        if query['group_by']:
+            groups = frame.groupby(query['group_by'], dropna=False, observed=True, sort=True)
+            result = groups.size().rename('__rows__').to_frame()
+            for spec in query['aggregates']:
+                if spec['column'] is None:
+                    result[spec['as']] = result['__rows__']
+                else:
+                    result[spec['as']] = groups[spec['column']].agg(spec['func'])
+            return result.drop(columns='__rows__').reset_index()
+
+        values = {}
+        for spec in query['aggregates']:
+            if spec['column'] is None:
+                values[spec['as']] = [len(frame)]
+            else:
+                values[spec['as']] = [frame[spec['column']].agg(spec['func'])]
+        return pd.DataFrame(values)
+
+
+def run_query(dataset, query):
+    """
+    Runs a filter/sort/group query over a stored dataset and returns one page of the result.
+
+    Only the columns a query needs are read. Filters prune whole segments using their
+    min/max statistics, sorts reuse cached row orders, and rows are fetched for the
+    requested page alone unless the query groups them.
+
+    Args:
+    - dataset (Dataset): The stored dataset.
+    - query (dict): A query as accepted by `parse_query`.
+
+    Returns:
+    - tuple: (pd.DataFrame with the page of results, total number of result rows).
+
+    Raises:
+    - ValueError: If the query is malformed.
+    - KeyError: If it names a column the dataset does not have.
+    """
+    query = parse_query(query, dataset)
+    mask = match_rows(dataset, query['filters'])
+    stop = None if query['limit'] is None else query['offset'] + query['limit']
+
+    if query['grouped']:
+        needed = list(dict.fromkeys(query['group_by'] + [spec['column'] for spec in query['aggregates']
+                                                         if spec['column'] is not None]))
+        result = aggregate(read_matching(dataset, mask, needed), query)
+        if query['sort']:
+            result = result.sort_values([spec['column'] for spec in query['sort']],
+                                        ascending=[not spec['descending'] for spec in query['sort']],
+                                        na_position='last', kind='stable')
+        return result.iloc[query['offset']:stop].reset_index(drop=True), len(result)
+
+    if query['sort']:
+        positions = np.asarray(sort_order(dataset, query['sort']))
+        if mask is not None:
+            positions = positions[mask[positions]]
+    else:
+        positions = np.arange(dataset.row_count) if mask is None else np.flatnonzero(mask)
+    page = positions[query['offset']:stop]
+    with stage('fetch', rows=len(page)):
+        return dataset.take(page, query['columns']).reset_index(drop=True), len(positions)
@@ -0,0 +1,203 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import uuid
+
+from .column_statistics import FrameStatistics
+from .dataset_store import MANIFEST_NAME, DatasetNotFound, DatasetWriter, open_dataset
+
+# The memory optimizer's report of a cached upload, kept so hits can return it too
+MEMORY_REPORT_FILE_NAME = 'memory.json'
+
+
+def hash_content(chunks):
+    """
+    Computes the SHA-256 of an upload.
+
+    Args:
+    - chunks (iterable): The file contents as a sequence of byte strings, read one at a time.
+
+    Returns:
+    - str: Hex SHA-256 digest of the bytes.
+    """
+    digest = hashlib.sha256()
+    for chunk in chunks:
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def hash_upload(content_hash, params):
+    """
+    Computes a cache key from the digest of the uploaded bytes and the inference parameters.
+
+    Args:
+    - content_hash (str): Hex SHA-256 of the upload, as returned by `hash_content`; datasets
+      store the same digest, so it is computed once per upload.
+    - params (dict): JSON-serializable parameters that change the inference result.
+
+    Returns:
+    - str: Hex SHA-256 digest.
+    """
+    digest = hashlib.sha256(json.dumps(params, sort_keys=True, default=str).encode('utf-8'))
+    digest.update(b'\0')
+    digest.update(content_hash.encode('ascii'))
+    return digest.hexdigest()
+
+
+def load_memory_report(directory):
+    """
+    Reads the memory report kept with a cache entry, or returns None if it has none.
+    """
+    try:
+        with open(os.path.join(directory, MEMORY_REPORT_FILE_NAME)) as report_file:
+            return json.load(report_file)
+    except FileNotFoundError:
+        return None
+
+
+def directory_size(path):
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+
+class ResultCache:
+    """
+    On-disk cache of processed uploads keyed by content hash, evicted least recently used first.
+
+    Entries are stored in the same columnar layout as datasets, so a hit returns the typed
+    columns without parsing or inference. The manifest's modification time records the
+    last access and drives eviction.
+
+    An entry is written under a temporary name with all of its files and published by a
+    rename; eviction renames it aside before deleting it. Readers therefore see whole
+    entries only, and can tell whether one was evicted while they read it.
+    """
+
+    def __init__(self, root, max_bytes):
+        self.root = str(root)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def _record(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def _open(self, key):
+        try:
+            dataset = open_dataset(self.root, key)
+        except DatasetNotFound:
+            return None
+        try:
+            os.utime(os.path.join(dataset.path, MANIFEST_NAME))
+        except FileNotFoundError:
+            pass  # Evicted concurrently; the open dataset's files may still be read
+        return dataset
+
+    def get(self, key):
+        """
+        Looks up a processed upload.
+
+        Returns:
+        - Dataset or None: The cached dataset, or None on a miss.
+        """
+        dataset = self._open(key)
+        self._record(dataset is not None)
+        return dataset
+
+    def load(self, key):
+        """
+        Reads a processed upload together with the statistics and memory report kept with it.
+
+        Returns:
+        - tuple or None: (DataFrame, schema, FrameStatistics or None, memory report or None), or
+          None on a miss, including an entry evicted while it was read.
+        """
+        dataset = self._open(key)
+        result = None
+        if dataset is not None:
+            try:
+                result = (dataset.read(), dataset.schema, FrameStatistics.load(dataset.path),
+                          load_memory_report(dataset.path))
+            except FileNotFoundError:
+                pass
+            # Eviction moves an entry aside first, so a manifest still in place means every file was read whole
+            if not os.path.exists(os.path.join(dataset.path, MANIFEST_NAME)):
+                result = None
+        self._record(result is not None)
+        return result
+
+    def put(self, key, df, schema=None, statistics=None, memory_report=None):
+        """
+        Stores a processed upload and evicts the least recently used entries beyond `max_bytes`.
+
+        Column statistics and the memory optimizer's report, when given, are kept with the
+        entry and returned by `load`.
+        """
+        try:
+            writer = DatasetWriter(self.root, key)
+        except OSError:
+            return  # Another request is storing the same upload
+        try:
+            writer.append(df, schema)
+            # The side files go in before the entry is published, so a hit always finds them
+            if statistics is not None:
+                statistics.save(writer.tmp_path)
+            if memory_report is not None:
+                with open(os.path.join(writer.tmp_path, MEMORY_REPORT_FILE_NAME), 'w') as report_file:
+                    json.dump(memory_report, report_file)
+            writer.close()
+        except OSError:
+            writer.abort()
+            return  # Another request has stored the same upload
+        except Exception:
+            writer.abort()
+            raise
+        self.evict()
+
+    def entries(self):
+        if not os.path.isdir(self.root):
+            return []
+        entries = []
+        for name in os.listdir(self.root):
+            # Entries being written or evicted carry a suffix
+            if '.' in name:
+                continue
+            try:
+                manifest = os.path.join(self.root, name, MANIFEST_NAME)
+                entries.append((os.path.getmtime(manifest), name, directory_size(os.path.join(self.root, name))))
+            except FileNotFoundError:
+                continue  # Evicted while it was listed
+        return entries
+
+    def evict(self):
+        entries = sorted(self.entries())
+        total = sum(size for _, _, size in entries)
+        for _, name, size in entries:
+            if total <= self.max_bytes:
+                break
+            evicted = os.path.join(self.root, f'{name}.{uuid.uuid4().hex}.evicted')
+            try:
+                os.replace(os.path.join(self.root, name), evicted)
+            except FileNotFoundError:
+                continue  # Evicted by another request
+            shutil.rmtree(evicted, ignore_errors=True)
+            total -= size
+
+    def stats(self):
+        entries = self.entries()
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'entries': len(entries),
+                'bytes': sum(size for _, _, size in entries),
+                'max_bytes': self.max_bytes,
+            }
@@ -1,15 +1,31 @@
+import gzip
+import json
+import os
+import tempfile
+import uuid
+
+from django.conf import settings
 from django.shortcuts import render
-from django.http import JsonResponse
+from django.http import FileResponse, HttpResponse, JsonResponse, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
-from django.contrib.auth.models import User
-from django.contrib.auth import authenticate
-from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import IsAuthenticated, AllowAny
-from rest_framework.authtoken.models import Token
-from rest_framework import status
-from rest_framework.response import Response
-import pandas as pd
-from .utils.infer_data_types import infer_and_convert_data_types
+from django.views.decorators.http import require_GET, require_http_methods
+from rest_framework.exceptions import AuthenticationFailed
+from .async_upload import process_spooled_upload, stream_upload_options
+from .authentication import CachedTokenAuthentication
+from .batch_upload import BatchTooLarge, process_batch
+from .jobs import QueueFull, enqueue_upload
+from .models import UploadedData, UploadJob
+from .pipeline import (column_statistics, get_result_cache, optimize_upload, read_upload, read_upload_sheets,
+                       use_out_of_core)
+from .storage import (RAW_FILE_NAME, append_upload, dataset_path, delete_dataset, find_stored_dataset,
+                      open_uploaded_data, store_dataset, store_upload_out_of_core)
+from .utils.arrow_stream import ARROW_STREAM_CONTENT_TYPE, iter_arrow, negotiate
+from .utils.dataset_store import DatasetNotFound
+from .utils.ingestion import SheetNotFound, available_csv_engines
+from .utils.instrumentation import metrics, stage
+from .utils.json_stream import NDJSON_CONTENT_TYPE, frame_to_records, iter_json, iter_ndjson
+from .utils.query_engine import run_query
+from .utils.result_cache import hash_content, hash_upload
 
 # View for handling file upload
 @csrf_exempt
@@ -23,76 +39,566 @@ def upload(request):
         return JsonResponse({'error': 'File not found in request'}, status=400)
 
     file = request.FILES['file']
+    if negotiate(request.headers.get('Accept')) is None:
+        return not_acceptable()
+
+    # Queue the file for background processing and return immediately if the client asked for it
+    if request.GET.get('async') in ('1', 'true'):
+        if not file.name.endswith(('.csv', '.xlsx')):
+            return JsonResponse({'error': 'Unsupported file type'}, status=400)
+        try:
+            job = enqueue_upload(file, owner=request_owner(request))
+        except QueueFull:
+            response = JsonResponse({'error': 'Too many uploads in progress, try again later'}, status=503)
+            response['Retry-After'] = '30'
+            return response
+        return JsonResponse(job_payload(job), status=202)
+
+    try:
+        options = upload_options(request)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    if not file.name.endswith(('.csv', '.xlsx')):
+        return JsonResponse({'error': 'Unsupported file type'}, status=400)
+    out_of_core = request.GET.get('out_of_core') in ('1', 'true')
+    if out_of_core and not file.name.endswith('.csv'):
+        return JsonResponse({'error': 'Out-of-core processing reads CSV files only'}, status=400)
+
     try:
-        # Read the uploaded file into a DataFrame
-        if file.name.endswith('.csv'):
-            df = pd.read_csv(file)
-        elif file.name.endswith('.xlsx'):
-            df = pd.read_excel(file)
+        # Process files larger than memory chunk by chunk and return the first page of the stored rows
+        if use_out_of_core(file.name, file.size, out_of_core):
+            uploaded = store_upload_out_of_core(file, file.name, owner=request_owner(request),
+                                                column_types=options['column_types'],
+                                                threshold=options['threshold'], schema=options['schema'])
+            return stored_upload_response(request, uploaded)
+
+        # Read several worksheets side by side if the client asked for more than one
+        if file.name.endswith('.xlsx') and (options['sheet'] is None or isinstance(options['sheet'], list)):
+            sheets = read_upload_sheets(file, options['sheet'], column_types=options['column_types'],
+                                        threshold=options['threshold'])
+            return JsonResponse({'sheets': {
+                name: {'data': frame_to_records(df), 'data_types': df.dtypes.apply(lambda x: str(x)).to_dict()}
+                for name, (df, schema) in sheets.items()
+            }})
+
+        # Reuse the processed result of an identical earlier upload if there is one
+        cache_key, cached, content_hash = None, None, None
+        if settings.UPLOAD_CACHE_ENABLED:
+            with stage('cache'):
+                # The digest of the bytes is also the stored dataset's content hash
+                content_hash = hash_content(file.chunks())
+                cache_key = hash_upload(content_hash, {'extension': os.path.splitext(file.name)[1],
+                                                       'optimize': settings.UPLOAD_OPTIMIZE_MEMORY,
+                                                       'arrow_strings': settings.UPLOAD_ARROW_STRINGS, **options})
+                cached = get_result_cache().load(cache_key)
+            file.seek(0)
+
+        if cached is not None:
+            processed_df, schema, statistics, memory_report = cached
+            if not settings.UPLOAD_COLUMN_STATISTICS:
+                statistics = None
         else:
-            return JsonResponse({'error': 'Unsupported file type'}, status=400)
+            # Read the uploaded file into a DataFrame, infer its data types and shrink them losslessly
+            statistics = column_statistics()
+            processed_df, schema = read_upload(file, file.name, statistics=statistics, **options)
+            processed_df, schema, memory_report = optimize_upload(processed_df, schema)
+            if cache_key is not None:
+                get_result_cache().put(cache_key, processed_df, schema, statistics, memory_report)
+
+        # Keep the processed upload so it can be reopened without uploading the file again
+        uploaded = None
+        if settings.DATASET_PERSIST_UPLOADS or request.GET.get('paginate') in ('1', 'true'):
+            owner = request_owner(request)
+            # Uploading the same file again returns the dataset stored the first time
+            if content_hash is not None:
+                uploaded = find_stored_dataset(owner, content_hash, schema, len(processed_df))
+            if uploaded is None:
+                uploaded = store_dataset(processed_df, schema, file.name, owner=owner, raw_file=file,
+                                         statistics=statistics, content_hash=content_hash)
+
+        response = upload_response(request, processed_df, uploaded, memory_report,
+                                   statistics.result() if statistics is not None else None)
+        if cache_key is not None:
+            response['X-Upload-Cache'] = 'HIT' if cached is not None else 'MISS'
+        return response
+
+    except SheetNotFound as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    # Handle any exceptions during the process
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+
+def sheet_option(value):
+    return int(value) if value.isdigit() else value
+
+def upload_options(request):
+    """
+    Reads the optional inference parameters of an upload from the form data.
+
+    The CSV parser comes from `parser` (query string or form data), defaulting to
+    CSV_PARSER_BACKEND, and `schema_from` names a stored dataset whose schema is used to
+    parse the file straight into known dtypes. For Excel files, `sheet` picks the worksheet by
+    name or 0-based position; repeating it or passing '*' reads several sheets at once.
+
+    Raises:
+    - ValueError: If `threshold` is not a number, `column_types` is not a JSON object,
+      `parser` is not an available engine or `schema_from` is not a stored dataset.
+    """
+    options = {'column_types': None, 'threshold': 0.5, 'schema': None, 'sheet': 0}
+    sheets = request.GET.getlist('sheet') or request.POST.getlist('sheet')
+    if sheets == ['*']:
+        options['sheet'] = None
+    elif len(sheets) == 1:
+        options['sheet'] = sheet_option(sheets[0])
+    elif sheets:
+        options['sheet'] = [sheet_option(sheet) for sheet in sheets]
+    options['engine'] = request.GET.get('parser') or request.POST.get('parser') or settings.CSV_PARSER_BACKEND
+    if options['engine'] not in available_csv_engines():
+        raise ValueError(f"parser must be one of: {', '.join(available_csv_engines())}")
+    schema_from = request.GET.get('schema_from') or request.POST.get('schema_from')
+    if schema_from:
+        try:
+            options['schema'] = get_uploaded_data(request, uuid.UUID(schema_from)).schema
+        except (ValueError, DatasetNotFound):
+            raise ValueError('schema_from must be the ID of a stored dataset')
+    if request.POST.get('threshold'):
+        try:
+            options['threshold'] = float(request.POST['threshold'])
+        except ValueError:
+            raise ValueError('threshold must be a number')
+    if request.POST.get('column_types'):
+        try:
+            options['column_types'] = json.loads(request.POST['column_types'])
+        except json.JSONDecodeError:
+            options['column_types'] = None
+        if not isinstance(options['column_types'], dict):
+            raise ValueError('column_types must be a JSON object')
+    return options
 
-        # Process the DataFrame using the data type inference function
-        processed_df = infer_and_convert_data_types(df)
+def not_acceptable():
+    return JsonResponse({'error': f'{ARROW_STREAM_CONTENT_TYPE} responses need pyarrow, which is not installed'},
+                        status=406)
 
+def arrow_response(df, data_types, extra=None):
+    """
+    Streams rows as Arrow IPC record batches, with the other response fields in the schema metadata.
+    """
+    return StreamingHttpResponse(
+        iter_arrow(df, data_types, batch_size=settings.UPLOAD_RESPONSE_BATCH_ROWS, extra=extra),
+        content_type=ARROW_STREAM_CONTENT_TYPE,
+    )
+
+def upload_response(request, processed_df, uploaded=None, memory_report=None, statistics=None):
+    """
+    Builds the upload response in the shape the client asked for.
+
+    When the upload was stored, its ID is returned as `dataset_id`, or in the X-Dataset-Id
+    header of streamed responses. JSON responses also carry the memory optimizer's
+    per-column report as `memory` when it ran. Column statistics, when collected, are
+    returned as `statistics` next to `data_types` in every response shape. Clients accepting
+    Arrow IPC streams get the typed columns as record batches, with the other fields as
+    JSON-encoded schema metadata.
+    """
+    # Get inferred data types for each column
+    data_types = processed_df.dtypes.apply(lambda x: str(x)).to_dict()
+    dataset_id = str(uploaded.id) if uploaded is not None else None
+    extra = {'statistics': statistics} if statistics is not None else {}
+
+    # Send typed record batches instead of JSON if the client accepts an Arrow stream
+    if negotiate(request.headers.get('Accept')) == 'arrow':
+        if request.GET.get('paginate') in ('1', 'true'):
+            extra['row_count'] = len(processed_df)
+            processed_df = processed_df.head(settings.UPLOAD_PREVIEW_ROWS)
+        if memory_report is not None:
+            extra['memory'] = memory_report
+        response = arrow_response(processed_df, data_types, extra)
+        if dataset_id:
+            response['X-Dataset-Id'] = dataset_id
+        return response
+
+    # Return only the first page of the stored rows if the client asked for pagination
+    if request.GET.get('paginate') in ('1', 'true'):
+        body = {
+            'dataset_id': dataset_id,
+            'row_count': len(processed_df),
+            'data_types': data_types,
+            **extra,
+            'data': frame_to_records(processed_df.head(settings.UPLOAD_PREVIEW_ROWS)),
+        }
+        if memory_report is not None:
+            body['memory'] = memory_report
+        return JsonResponse(body)
+
+    # Stream the rows in batches if the client asked for a streamed or NDJSON response
+    response = None
+    response_format = request.GET.get('format')
+    if response_format == 'ndjson' or NDJSON_CONTENT_TYPE in request.headers.get('Accept', ''):
+        response = StreamingHttpResponse(
+            iter_ndjson(processed_df, data_types, batch_size=settings.UPLOAD_RESPONSE_BATCH_ROWS, extra=extra),
+            content_type=NDJSON_CONTENT_TYPE,
+        )
+    elif request.GET.get('stream') in ('1', 'true'):
+        response = StreamingHttpResponse(
+            iter_json(processed_df, data_types, batch_size=settings.UPLOAD_RESPONSE_BATCH_ROWS, extra=extra),
+            content_type='application/json',
+        )
+    if response is not None:
+        if dataset_id:
+            response['X-Dataset-Id'] = dataset_id
+        return response
+
+    with stage('encode', rows=len(processed_df)):
         # Convert the processed DataFrame to JSON format
         data = processed_df.to_dict(orient='records')
 
-        # Get inferred data types for each column
-        data_types = processed_df.dtypes.apply(lambda x: str(x)).to_dict()
-
         # Return the data and inferred data types as JSON response
-        return JsonResponse({
-            'data': data,
-            'data_types': data_types
-        }, safe=False)
+        body = {'data': data, 'data_types': data_types, **extra}
+        if dataset_id:
+            body['dataset_id'] = dataset_id
+        if memory_report is not None:
+            body['memory'] = memory_report
+        return JsonResponse(body, safe=False)
 
-    # Handle any exceptions during the process
+def stored_upload_response(request, uploaded):
+    """
+    Returns the first page of a stored upload, the response of uploads processed out of core.
+
+    The body has the shape of paginated uploads (?paginate=1); clients accepting Arrow IPC
+    streams get the page as record batches with `row_count` and `statistics` in the metadata.
+    """
+    dataset = open_uploaded_data(uploaded)
+    page = dataset.read(limit=settings.UPLOAD_PREVIEW_ROWS)
+    extra = {'row_count': dataset.row_count}
+    if uploaded.statistics:
+        extra['statistics'] = uploaded.statistics
+    if negotiate(request.headers.get('Accept')) == 'arrow':
+        response = arrow_response(page, dataset.data_types, extra)
+        response['X-Dataset-Id'] = str(uploaded.id)
+        return response
+    return JsonResponse({
+        'dataset_id': str(uploaded.id),
+        'data_types': dataset.data_types,
+        **extra,
+        'data': frame_to_records(page),
+    })
+
+# View taking the raw file as the request body; under ASGI the streaming application in
+# async_upload serves this path instead, so this is the WSGI fallback
+@csrf_exempt
+@require_http_methods(['POST'])
+def upload_stream(request):
+    try:
+        options = stream_upload_options(request.META.get('QUERY_STRING', ''))
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    response_format = negotiate(request.headers.get('Accept'))
+    if response_format is None:
+        return not_acceptable()
+
+    os.makedirs(settings.UPLOAD_JOB_SPOOL_DIR, exist_ok=True)
+    fd, path = tempfile.mkstemp(suffix=os.path.splitext(options['name'])[1], dir=settings.UPLOAD_JOB_SPOOL_DIR)
+    try:
+        with os.fdopen(fd, 'wb') as spool_file:
+            for chunk in iter(lambda: request.read(1024 * 1024), b''):
+                spool_file.write(chunk)
+        processed_df, uploaded, extra = process_spooled_upload(path, options, request_owner(request))
+    except (ValueError, SheetNotFound) as e:
+        return JsonResponse({'error': str(e)}, status=400)
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
+    finally:
+        os.remove(path)
+
+    data_types = processed_df.dtypes.apply(lambda x: str(x)).to_dict()
+    if response_format == 'arrow':
+        response = arrow_response(processed_df, data_types, extra)
+    elif options['format'] == 'ndjson':
+        response = StreamingHttpResponse(
+            iter_ndjson(processed_df, data_types, batch_size=settings.UPLOAD_RESPONSE_BATCH_ROWS, extra=extra),
+            content_type=NDJSON_CONTENT_TYPE,
+        )
+    else:
+        response = StreamingHttpResponse(
+            iter_json(processed_df, data_types, batch_size=settings.UPLOAD_RESPONSE_BATCH_ROWS, extra=extra),
+            content_type='application/json',
+        )
+    if uploaded is not None:
+        response['X-Dataset-Id'] = str(uploaded.id)
+    return response
+
+# View processing several files, or zip/tar.gz archives of them, in one request
+@csrf_exempt
+@require_http_methods(['POST'])
+def upload_batch(request):
+    files = request.FILES.getlist('files') + request.FILES.getlist('file')
+    if not files:
+        return JsonResponse({'error': 'File not found in request'}, status=400)
+    try:
+        options = upload_options(request)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    if options['sheet'] is None or isinstance(options['sheet'], list):
+        return JsonResponse({'error': 'Batch uploads read one sheet per workbook'}, status=400)
 
-# API endpoint for user registration
-@api_view(['POST'])
-@permission_classes([AllowAny])
-def register(request):
-    username = request.data.get('username')
-    password = request.data.get('password')
-
-    # Check if the username already exists
-    if User.objects.filter(username=username).exists():
-        return JsonResponse({'error': 'Username already exists'}, status=400)
-
-    # Create a new user and generate an authentication token
-    user = User.objects.create_user(username=username, password=password)
-    token = Token.objects.create(user=user)
-    return Response({'token': token.key}, status=status.HTTP_201_CREATED)
-
-# API endpoint for user login
-@api_view(['POST'])
-@permission_classes([AllowAny])
-def login(request):
-    username = request.data.get('username')
-    password = request.data.get('password')
-
-    # Authenticate the user with provided credentials
-    user = authenticate(username=username, password=password)
-    if user:
-        # Generate or get the existing token for the user
-        token, _ = Token.objects.get_or_create(user=user)
-        return JsonResponse({'token': token.key}, status=200)
-
-    # Return error if credentials are invalid
-    return Response({'error': 'Invalid credentials'}, status=status.HTTP_401_UNAUTHORIZED)
-
-# API endpoint for user logout
-@api_view(['POST'])
-def logout(request):
-    token = request.auth
-
-    # Check if the token is valid and delete it
-    if token:
-        token.delete()
-        return Response({'message': 'Logged out successfully'}, status=status.HTTP_200_OK)
-
-    # Return error if the token is invalid
-    return Response({'error': 'Invalid token'}, status=status.HTTP_400_BAD_REQUEST)
+    merge = (request.GET.get('merge') or request.POST.get('merge')) in ('1', 'true')
+    try:
+        body = process_batch(files, options, owner=request_owner(request), merge=merge)
+    except BatchTooLarge as e:
+        return JsonResponse({'error': str(e)}, status=413)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+    return JsonResponse(body)
+
+# View returning the request and stage latency histograms, to local clients only
+@require_GET
+def metrics_view(request):
+    if request.META.get('REMOTE_ADDR') not in settings.METRICS_ALLOWED_IPS:
+        return JsonResponse({'error': 'Metrics are only available locally'}, status=403)
+    if request.GET.get('format') == 'prometheus':
+        return HttpResponse(metrics.prometheus(), content_type='text/plain; version=0.0.4')
+    return JsonResponse(metrics.snapshot())
+
+# View returning statistics of the processed upload cache
+@require_GET
+def cache_stats(request):
+    return JsonResponse(get_result_cache().stats())
+
+def request_owner(request):
+    """
+    Returns the user making the request, authenticated by session or by API token, or None.
+
+    The lean settings profile has no session middleware, so `request.user` may be missing.
+    """
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return user
+    try:
+        authenticated = CachedTokenAuthentication().authenticate(request)
+    except AuthenticationFailed:
+        return None
+    return authenticated[0] if authenticated else None
+
+def get_uploaded_data(request, dataset_id):
+    """
+    Looks up a stored dataset visible to the requesting user.
+
+    Raises:
+    - DatasetNotFound: If the dataset does not exist or belongs to another user.
+    """
+    uploaded = UploadedData.objects.filter(pk=dataset_id).first()
+    if uploaded is None or (uploaded.owner_id is not None and uploaded.owner != request_owner(request)):
+        raise DatasetNotFound(str(dataset_id))
+    return uploaded
+
+def get_upload_job(request, job_id):
+    """
+    Looks up a background upload visible to the requesting user.
+
+    Returns:
+    - UploadJob or None: The job, or None if it does not exist or belongs to another user.
+    """
+    job = UploadJob.objects.filter(pk=job_id).first()
+    if job is None or (job.owner_id is not None and job.owner != request_owner(request)):
+        return None
+    return job
+
+def dataset_payload(uploaded, dataset):
+    return {
+        'dataset_id': str(uploaded.id),
+        'file_name': uploaded.file_name,
+        'row_count': dataset.row_count,
+        'data_types': dataset.data_types,
+        'content_hash': uploaded.content_hash,
+        'size_bytes': uploaded.size_bytes,
+        'created_at': uploaded.created_at,
+    }
+
+# View listing the stored datasets of the requesting user
+@require_GET
+def dataset_list(request):
+    owner = request_owner(request)
+    # Anonymous uploads have no owner to list them for, so they are only reachable by id
+    if owner is None:
+        return JsonResponse({'datasets': []})
+    datasets = []
+    for uploaded in UploadedData.objects.filter(owner=owner):
+        try:
+            datasets.append(dataset_payload(uploaded, open_uploaded_data(uploaded)))
+        except DatasetNotFound:
+            continue  # Files removed from disk; the row is left for the admin to clean up
+    return JsonResponse({'datasets': datasets})
+
+# View returning the schema of a stored dataset, or deleting it
+@csrf_exempt
+@require_http_methods(['GET', 'DELETE'])
+def dataset_schema(request, dataset_id):
+    try:
+        uploaded = get_uploaded_data(request, dataset_id)
+        dataset = open_uploaded_data(uploaded)
+    except DatasetNotFound:
+        return JsonResponse({'error': 'Dataset not found'}, status=404)
+
+    if request.method == 'DELETE':
+        delete_dataset(uploaded)
+        return HttpResponse(status=204)
+    # Statistics come from the row, so summaries never read the stored columns
+    return JsonResponse({**dataset_payload(uploaded, dataset), 'statistics': uploaded.statistics})
+
+# View returning the original file of a stored dataset
+@require_GET
+def dataset_raw(request, dataset_id):
+    try:
+        uploaded = get_uploaded_data(request, dataset_id)
+    except DatasetNotFound:
+        return JsonResponse({'error': 'Dataset not found'}, status=404)
+    raw_path = os.path.join(dataset_path(uploaded.id), RAW_FILE_NAME)
+    if not os.path.exists(raw_path):
+        return JsonResponse({'error': 'The original file was not kept'}, status=404)
+    return FileResponse(gzip.open(raw_path, 'rb'), as_attachment=True, filename=uploaded.file_name)
+
+# View appending the rows of a new file to a stored dataset, reusing its schema
+@csrf_exempt
+@require_http_methods(['POST'])
+def dataset_append(request, dataset_id):
+    try:
+        uploaded = get_uploaded_data(request, dataset_id)
+    except DatasetNotFound:
+        return JsonResponse({'error': 'Dataset not found'}, status=404)
+    if 'file' not in request.FILES:
+        return JsonResponse({'error': 'File not found in request'}, status=400)
+    file = request.FILES['file']
+    if not file.name.endswith(('.csv', '.xlsx')):
+        return JsonResponse({'error': 'Unsupported file type'}, status=400)
+
+    try:
+        options = upload_options(request)
+        rows_appended, widened = append_upload(uploaded, file, file.name, threshold=options['threshold'],
+                                               engine=options['engine'])
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+
+    return JsonResponse({
+        **dataset_payload(uploaded, open_uploaded_data(uploaded)),
+        'rows_appended': rows_appended,
+        'widened': widened,
+    })
+
+# View returning a slice of rows (and optionally a subset of columns) of a stored dataset
+@require_GET
+def dataset_rows(request, dataset_id):
+    response_format = negotiate(request.headers.get('Accept'))
+    if response_format is None:
+        return not_acceptable()
+    try:
+        dataset = open_uploaded_data(get_uploaded_data(request, dataset_id))
+        offset = int(request.GET.get('offset', 0))
+        limit = min(int(request.GET.get('limit', settings.UPLOAD_PREVIEW_ROWS)), settings.DATASET_PAGE_MAX_ROWS)
+        columns = request.GET.get('columns')
+        columns = columns.split(',') if columns else None
+        page = dataset.read(offset=offset, limit=max(limit, 0), columns=columns)
+    except DatasetNotFound:
+        return JsonResponse({'error': 'Dataset not found'}, status=404)
+    except ValueError:
+        return JsonResponse({'error': 'offset and limit must be integers'}, status=400)
+    except KeyError as e:
+        return JsonResponse({'error': e.args[0]}, status=400)
+
+    data_types = {col: dataset.data_types[col] for col in page.columns}
+    if response_format == 'arrow':
+        return arrow_response(page, data_types, {'dataset_id': dataset.dataset_id, 'row_count': dataset.row_count,
+                                                 'offset': page.index.start})
+    return JsonResponse({
+        'dataset_id': dataset.dataset_id,
+        'row_count': dataset.row_count,
+        'offset': page.index.start,
+        'data_types': data_types,
+        'data': frame_to_records(page),
+    })
+
+# View running a filter/sort/group query over a stored dataset and returning one page of the result
+@csrf_exempt
+@require_http_methods(['POST'])
+def dataset_query(request, dataset_id):
+    response_format = negotiate(request.headers.get('Accept'))
+    if response_format is None:
+        return not_acceptable()
+    try:
+        dataset = open_uploaded_data(get_uploaded_data(request, dataset_id))
+        query = json.loads(request.body or b'{}')
+        if not isinstance(query, dict):
+            raise ValueError('The query must be a JSON object')
+        limit = query.get('limit', settings.UPLOAD_PREVIEW_ROWS)
+        query['limit'] = min(int(limit), settings.DATASET_PAGE_MAX_ROWS)
+        page, total = run_query(dataset, query)
+    except DatasetNotFound:
+        return JsonResponse({'error': 'Dataset not found'}, status=404)
+    except json.JSONDecodeError:
+        return JsonResponse({'error': 'The query must be valid JSON'}, status=400)
+    except (TypeError, ValueError) as e:
+        return JsonResponse({'error': str(e) or 'Invalid query'}, status=400)
+    except KeyError as e:
+        return JsonResponse({'error': e.args[0]}, status=400)
+
+    data_types = page.dtypes.apply(lambda x: str(x)).to_dict()
+    if response_format == 'arrow':
+        return arrow_response(page, data_types, {'dataset_id': dataset.dataset_id, 'row_count': total,
+                                                 'offset': query.get('offset', 0)})
+    return JsonResponse({
+        'dataset_id': dataset.dataset_id,
+        'row_count': total,
+        'offset': query.get('offset', 0),
+        'data_types': data_types,
+        'data': frame_to_records(page),
+    })
+
+def job_payload(job):
+    return {
+        'job_id': str(job.id),
+        'file_name': job.file_name,
+        'status': job.status,
+        'stage': job.stage,
+        'rows_processed': job.rows_processed,
+        'dataset_id': job.dataset_id or None,
+        'error': job.error or None,
+    }
+
+# View reporting the progress of a background upload
+@require_GET
+def job_status(request, job_id):
+    job = get_upload_job(request, job_id)
+    if job is None:
+        return JsonResponse({'error': 'Job not found'}, status=404)
+    return JsonResponse(job_payload(job))
+
+# View returning the result of a finished background upload
+@require_GET
+def job_result(request, job_id):
+    response_format = negotiate(request.headers.get('Accept'))
+    if response_format is None:
+        return not_acceptable()
+    job = get_upload_job(request, job_id)
+    if job is None:
+        return JsonResponse({'error': 'Job not found'}, status=404)
+    if job.status == UploadJob.STATUS_FAILED:
+        return JsonResponse(job_payload(job), status=500)
+    if job.status != UploadJob.STATUS_SUCCEEDED:
+        return JsonResponse(job_payload(job), status=202)
+
+    try:
+        dataset = open_uploaded_data(get_uploaded_data(request, job.dataset_id))
+    except DatasetNotFound:
+        return JsonResponse({'error': 'Dataset not found'}, status=404)
+    if response_format == 'arrow':
+        return arrow_response(dataset.read(limit=settings.UPLOAD_PREVIEW_ROWS), dataset.data_types,
+                              {**job_payload(job), 'row_count': dataset.row_count})
+    return JsonResponse({
+        **job_payload(job),
+        'row_count': dataset.row_count,
+        'data_types': dataset.data_types,
+        'data': frame_to_records(dataset.read(limit=settings.UPLOAD_PREVIEW_ROWS)),
+    })